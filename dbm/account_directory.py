@@ -0,0 +1,41 @@
+# dbm/account_directory.py
+from bisect import bisect_left
+
+# Most names a picker shows at once; typing more narrows the list
+PICKER_LIMIT = 500
+
+class AccountDirectory:
+    """id <-> AccountName maps plus a sorted, case-insensitive prefix index.
+
+    Built from one two-column query and kept until an account is added,
+    renamed or deleted, so pickers never re-read the Accounts table.
+    """
+
+    def __init__(self, rows=()):
+        self.id_to_name = {}
+        self.name_to_id = {}
+        for acc_id, name in rows:
+            self.id_to_name[acc_id] = name
+            self.name_to_id[name] = acc_id
+        # Parallel lists sorted by folded name; bisect finds a prefix's block
+        entries = sorted((name.casefold(), name) for name in self.name_to_id)
+        self._keys = [key for key, _ in entries]
+        self.names = [name for _, name in entries]
+
+    @classmethod
+    def from_connection(cls, conn):
+        return cls(conn.execute("SELECT id, AccountName FROM Accounts").fetchall())
+
+    def __len__(self):
+        return len(self.names)
+
+    def matching(self, prefix, limit=PICKER_LIMIT):
+        """Names starting with prefix (any case), in sorted order: O(log n + limit)."""
+        key = prefix.casefold()
+        start = bisect_left(self._keys, key)
+        result = []
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(key) or (limit is not None and len(result) >= limit):
+                break
+            result.append(self.names[i])
+        return result
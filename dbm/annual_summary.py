@@ -0,0 +1,73 @@
+# dbm/annual_summary.py
+from .frozen_years import frozen_years, trusted_prefix
+
+def annual_summary(conn):
+    """Annual limits and transaction totals per year, one dict per year from
+    the first to the last year present (gaps filled with zeros).
+
+    Closed years come straight from FrozenYear (with their stored
+    'carryover'); only the years after them are aggregated. Every dict has
+    'closed' and 'edited' flags.
+    """
+    cursor = conn.cursor()
+
+    # 0. Closed years that still match their checksum are used as stored
+    frozen = frozen_years(conn)
+    trusted, edited = trusted_prefix(conn, frozen)
+    after = trusted[-1][0] if trusted else -1
+    closed = {row[0] for row in frozen}
+
+    # 1. Get New Room limits from NewRoomPerYear
+    cursor.execute("SELECT RoomYear, NewRoom FROM NewRoomPerYear WHERE RoomYear > ?", (after,))
+    room_limits = {str(row[0]): row[1] for row in cursor.fetchall()}
+
+    # 2. Get Transaction totals from Transactions (walks the TRANSYEAR index)
+    cursor.execute("""
+        SELECT TransYear,
+               SUM(CASE WHEN TransType = 'Deposit' THEN Amount ELSE 0 END) as deposits,
+               SUM(CASE WHEN TransType = 'Withdrawal' THEN Amount ELSE 0 END) as withdrawals
+        FROM Transactions
+        WHERE TransYear > ?
+        GROUP BY TransYear
+    """, (after,))
+    trans_totals = {str(row[0]): (row[1], row[2]) for row in cursor.fetchall()}
+
+    # Archived years: stored per-account totals, added to any live rows of the year
+    cursor.execute("SELECT Year, SUM(DepositCents), SUM(WithdrawalCents) FROM ArchivedYearTotals "
+                   "WHERE Year > ? GROUP BY Year", (after,))
+    for year, dep, wd in cursor.fetchall():
+        live_dep, live_wd = trans_totals.get(str(year), (0.0, 0.0))
+        trans_totals[str(year)] = (live_dep + dep / 100, live_wd + wd / 100)
+
+    stored = {str(year): (room / 100, dep / 100, wd / 100, carry / 100)
+              for year, room, dep, wd, carry, _, _ in trusted}
+
+    # 3. Determine the full range of years present in the database
+    all_keys = list(stored.keys()) + list(room_limits.keys()) + list(trans_totals.keys())
+    if not all_keys:
+        return []
+
+    years_int = [int(y) for y in all_keys]
+    min_year = min(years_int)
+    max_year = max(years_int)
+
+    results = []
+    for y_int in range(min_year, max_year + 1):
+        y_str = str(y_int)
+        if y_str in stored:
+            new_room, dep, wd, carry = stored[y_str]
+            results.append({'year': y_str, 'new_room': new_room, 'deposits': dep, 'withdrawals': wd,
+                            'carryover': carry, 'closed': True, 'edited': False})
+            continue
+        new_room = room_limits.get(y_str, 0.0)
+        dep, wd = trans_totals.get(y_str, (0.0, 0.0))
+
+        results.append({
+            'year': y_str,
+            'new_room': new_room,
+            'deposits': dep,
+            'withdrawals': wd,
+            'closed': y_int in closed,
+            'edited': y_int in edited
+        })
+    return results
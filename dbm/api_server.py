@@ -0,0 +1,253 @@
+# dbm/api_server.py
+"""Read-only JSON API over a TFSAid database, for dashboards.
+
+    python -m dbm.api_server path/to/file.db [--port 8765]
+
+Listens on 127.0.0.1 only. Routes (GET or HEAD):
+
+    /accounts
+    /transactions?limit=100&after=<cursor>&year=2024
+    /annual-summary
+    /cra-report?year=2024          detail rows, subtotals and total
+    /cra-report/totals?year=2024   subtotals and total only
+
+Listings and detail rows include archived transactions (negative ids) when
+the archive file is present; when it is not, requests that reach archived
+years get 409 instead of silently incomplete data.
+
+Every response carries an ETag built from the ChangeCounter (bumped by
+triggers on every commit, from any connection). Clients that send it back
+in If-None-Match get an empty 304 until the data changes.
+"""
+import json
+import asyncio
+import argparse
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from .database_manager import DatabaseManager
+from .pool import READER_POOL_SIZE
+from .snapshot import current_fingerprint
+from .annual_summary import annual_summary
+from .archive import ArchiveUnavailable, detail_source
+from .cra_report import iter_cra_report, cra_subtotals, year_range
+
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_HEADER_BYTES = 16 * 1024
+
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+
+class BadRequest(Exception):
+    """Invalid query parameter; answered with 400 and the message."""
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return f"{value:.2f}" # Keep exact cents, like write_json
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+def _int_param(params, name, default=None):
+    value = params.get(name, [None])[0]
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer.")
+
+def _date_range(params):
+    year = _int_param(params, "year")
+    return None if year is None else year_range(year)
+
+# --- Route handlers: run on a worker thread with a pooled reader connection ---
+def _accounts(conn, params):
+    cursor = conn.execute("""SELECT id, AccountName, AccountNameCRA, AccountType,
+                                    Institution, AccountNumber, OpeningDate, CloseDate
+                             FROM Accounts ORDER BY AccountName""")
+    keys = ("id", "name", "name_cra", "type", "institution", "number", "opening_date", "close_date")
+    return [dict(zip(keys, row)) for row in cursor]
+
+def _transactions(conn, params):
+    """Keyset pagination on (TransDate, id): every page is an index seek, however deep."""
+    limit = min(max(_int_param(params, "limit", PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    where, args = [], []
+    date_range = _date_range(params)
+    if date_range:
+        where.append("T.TransDate BETWEEN ? AND ?")
+        args += date_range
+    after = params.get("after", [None])[0]
+    if after:
+        try:
+            after_date, after_id = after.rsplit(",", 1)
+            args += [after_date, after_date, int(after_id)]
+        except ValueError:
+            raise BadRequest("'after' must be the 'next' cursor of a previous page.")
+        where.append("(T.TransDate > ? OR (T.TransDate = ? AND T.id > ?))")
+
+    sql = f"""SELECT T.id, T.Account_id, A.AccountName, T.TransDate, T.TransType, T.Amount, T.Notes
+              FROM {detail_source(conn, date_range)} T JOIN Accounts A ON T.Account_id = A.id
+              {"WHERE " + " AND ".join(where) if where else ""}
+              ORDER BY T.TransDate, T.id
+              LIMIT ?"""
+    rows = conn.execute(sql, args + [limit + 1]).fetchall()
+    keys = ("id", "account_id", "account", "date", "type", "amount", "notes")
+    items = [dict(zip(keys, row)) for row in rows[:limit]]
+    next_cursor = f"{items[-1]['date']},{items[-1]['id']}" if len(rows) > limit else None
+    return {'items': items, 'next': next_cursor}
+
+def _annual_summary(conn, params):
+    return annual_summary(conn)
+
+def _cra_report(conn, params):
+    date_range = _date_range(params)
+    return [row._asdict() for row in iter_cra_report(conn, date_range, detail_source(conn, date_range))]
+
+def _cra_totals(conn, params):
+    return [row._asdict() for row in cra_subtotals(conn, _date_range(params))]
+
+ROUTES = {
+    "/accounts": _accounts,
+    "/transactions": _transactions,
+    "/annual-summary": _annual_summary,
+    "/cra-report": _cra_report,
+    "/cra-report/totals": _cra_totals,
+}
+
+class ReadAPIServer:
+    """asyncio HTTP/1.1 server; queries run on a thread pool, each thread
+    borrowing a reader connection from the DatabaseManager's pool."""
+
+    def __init__(self, db_path, host=API_HOST, port=API_PORT):
+        self.db = DatabaseManager()
+        self.db.connect(db_path) # Migrates and creates the ChangeCounter if needed
+        self.host = host
+        self.port = port
+        self._executor = ThreadPoolExecutor(max_workers=READER_POOL_SIZE)
+        self._bodies = {} # request target -> encoded body, for the fingerprint below
+        self._bodies_fingerprint = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'cached': 0, 'queries': 0}
+
+    # --- Blocking parts (worker threads) ---
+    def _fingerprint(self):
+        with self.db.reader() as conn:
+            return current_fingerprint(conn)
+
+    def _query(self, handler, params):
+        with self.db.reader() as conn:
+            # One read transaction so the body matches the fingerprint it is stored under
+            conn.execute("BEGIN")
+            try:
+                fingerprint = current_fingerprint(conn)
+                body = json.dumps(handler(conn, params), default=_json_default).encode()
+            finally:
+                conn.execute("COMMIT")
+        return fingerprint, body
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Request handling (event loop) ---
+    async def _respond(self, method, target, headers):
+        url = urlsplit(target)
+        handler = ROUTES.get(url.path.rstrip("/") or "/")
+        if handler is None:
+            return 404, {}, json.dumps({'error': f"No route {url.path}"}).encode()
+        if method not in ("GET", "HEAD"):
+            return 405, {'Allow': "GET, HEAD"}, b""
+
+        self.stats['requests'] += 1
+        fingerprint = await self._run(self._fingerprint)
+        etag = f'"{fingerprint}"'
+        if headers.get("if-none-match") == etag:
+            self.stats['not_modified'] += 1
+            return 304, {'ETag': etag}, b""
+
+        if self._bodies_fingerprint != fingerprint:
+            self._bodies.clear()
+            self._bodies_fingerprint = fingerprint
+        body = self._bodies.get(target)
+        if body is not None:
+            self.stats['cached'] += 1
+        else:
+            try:
+                query_fingerprint, body = await self._run(self._query, handler, parse_qs(url.query))
+            except BadRequest as e:
+                return 400, {}, json.dumps({'error': str(e)}).encode()
+            except ArchiveUnavailable as e:
+                return 409, {}, json.dumps({'error': str(e)}).encode()
+            self.stats['queries'] += 1
+            etag = f'"{query_fingerprint}"'
+            if query_fingerprint == self._bodies_fingerprint:
+                self._bodies[target] = body
+        return 200, {'ETag': etag, 'Content-Type': "application/json"}, body
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                try:
+                    status, extra, body = await self._respond(method, target, headers)
+                except Exception as e:
+                    status, extra, body = 500, {}, json.dumps({'error': str(e)}).encode()
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                out = [f"HTTP/1.1 {status} {_REASONS[status]}",
+                       f"Content-Length: {len(body)}",
+                       "Cache-Control: no-cache",
+                       f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                out += [f"{name}: {value}" for name, value in extra.items()]
+                writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def serve(self, ready=None):
+        """Serves until cancelled. `ready`, if given, is called with the bound port."""
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = server.sockets[0].getsockname()[1] # Resolves port 0
+        if ready:
+            ready(self.port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only JSON API over a TFSAid database (localhost only).")
+    parser.add_argument("database")
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    server = ReadAPIServer(args.database, port=args.port)
+    try:
+        asyncio.run(server.serve(ready=lambda port: print(f"Serving {args.database} on http://{API_HOST}:{port}/")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
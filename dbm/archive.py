@@ -0,0 +1,302 @@
+# dbm/archive.py
+import os
+import uuid
+import sqlite3
+
+ARCHIVE_SUFFIX = "-archive.db"
+
+# Temp view over live and archived rows. Archived rows carry negative ids,
+# so they can never be mistaken for (or edited as) a live transaction; sort
+# by abs(id) for entry order.
+ALL_TRANSACTIONS = "AllTransactions"
+
+# Batch is the archive run that copied the row; SourceId its id in the main file
+_ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.Transactions (
+      id integer PRIMARY KEY,
+      Account_id integer NOT NULL,
+      TransDate date NOT NULL,
+      TransType varchar(32) NOT NULL,
+      Amount decimal(20, 2) NOT NULL DEFAULT 0,
+      Notes varchar(512),
+      Batch integer NOT NULL,
+      SourceId integer NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS archive.ARCH_TRANSDATE ON Transactions (TransDate);
+    CREATE INDEX IF NOT EXISTS archive.ARCH_BATCH ON Transactions (Batch);
+    CREATE TABLE IF NOT EXISTS archive.ArchiveOwner (
+      id integer PRIMARY KEY CHECK (id = 1),
+      ArchiveId varchar(32) NOT NULL,
+      Completed integer NOT NULL DEFAULT 0
+    );
+"""
+
+# An archive belongs to one main file: both store the same ArchiveId, and
+# the archive remembers the last batch its owner completed. A copy of the
+# main file that still points at the same archive (Save As or a backup
+# made by hand) gets 'foreign' instead of attaching, so it can never
+# delete rows the owner archived after the copy was made.
+
+_VIEW_SQL = f"""
+    CREATE TEMP VIEW IF NOT EXISTS {ALL_TRANSACTIONS} AS
+    SELECT id, Account_id, TransDate, TransType, Amount, Notes, TransYear FROM main.Transactions
+    UNION ALL
+    SELECT -id, Account_id, TransDate, TransType, Amount, Notes, CAST(substr(TransDate, 1, 4) AS integer)
+    FROM archive.Transactions
+"""
+
+class ArchiveUnavailable(Exception):
+    """Individual archived transactions were needed but the archive is not attached."""
+
+def default_archive_path(db_path):
+    return os.path.splitext(db_path)[0] + ARCHIVE_SUFFIX
+
+def new_archive_id():
+    return uuid.uuid4().hex
+
+def archive_info(conn):
+    """(archive file name, last archived year, last completed batch, archive id), or None."""
+    return conn.execute("SELECT Path, ThroughYear, Batch, ArchiveId FROM ArchiveInfo WHERE id = 1").fetchone()
+
+def _owner(conn):
+    """(ArchiveId, last completed batch) recorded in an archive file, or None."""
+    try:
+        return conn.execute("SELECT ArchiveId, Completed FROM archive.ArchiveOwner WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None # Archive written before it recorded its owner
+
+def _resolve(db_path, stored):
+    # Stored relative to the main file, so the pair can be moved together
+    return stored if os.path.isabs(stored) else os.path.join(os.path.dirname(os.path.abspath(db_path)), stored)
+
+def _is_attached(conn):
+    return any(row[1] == "archive" for row in conn.execute("PRAGMA database_list"))
+
+def _discard_unfinished(conn, batch):
+    # Rows of a run that never reached its second commit are still live.
+    # Only called once the attached archive is known to be conn's own.
+    conn.execute("DELETE FROM archive.Transactions WHERE Batch > ?", (batch,))
+    conn.execute("UPDATE archive.ArchiveOwner SET Completed = ? WHERE id = 1", (batch,))
+    conn.commit()
+
+def _claim(conn, info):
+    """Records the owner in an archive written before archives had one.
+    Main file first: if the second commit is lost, the next attach claims again."""
+    archive_id = info[3] or new_archive_id()
+    with conn:
+        conn.execute("UPDATE ArchiveInfo SET ArchiveId = ? WHERE id = 1", (archive_id,))
+    conn.executescript(_ARCHIVE_SCHEMA)
+    with conn:
+        conn.execute("INSERT INTO archive.ArchiveOwner (id, ArchiveId, Completed) VALUES (1, ?, ?)",
+                     (archive_id, info[2]))
+
+def attach_archive(conn, db_path):
+    """Attaches the archive named in ArchiveInfo and creates the AllTransactions
+    view. Returns 'attached', 'missing' (archive file not found), 'foreign'
+    (the file found belongs to another database, or holds batches this file
+    has not seen) or None."""
+    try:
+        info = archive_info(conn)
+    except sqlite3.OperationalError:
+        return None # Not initialized yet (new database)
+    if info is None:
+        return None
+    path = _resolve(db_path, info[0])
+    if not os.path.exists(path):
+        return 'missing'
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    owner = _owner(conn)
+    if owner is None:
+        try:
+            _claim(conn, info) # Nothing is discarded: unfinished runs cannot be told apart here
+        except sqlite3.Error:
+            pass # Read-only archive: attach as it is
+    elif owner[0] != info[3] or info[2] < owner[1]:
+        conn.execute("DETACH DATABASE archive")
+        return 'foreign'
+    else:
+        try:
+            _discard_unfinished(conn, info[2])
+        except sqlite3.Error:
+            pass # Read-only archive: nothing to clean up from here
+    conn.execute(_VIEW_SQL)
+    return 'attached'
+
+def attached_path(conn):
+    """File of the archive attached to conn, or None."""
+    return next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "archive"), None)
+
+def attach_reader(conn, path):
+    """Attaches an owner-checked archive to a reader connection (no cleanup,
+    no writes) and creates its AllTransactions view."""
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.execute(_VIEW_SQL)
+
+def detail_source(conn, date_range=None):
+    """Table or view holding the individual rows of `date_range` (None: all
+    history) on conn: AllTransactions when the archive is attached, else
+    Transactions. Raises ArchiveUnavailable when archived years are in range
+    but their rows cannot be read, rather than leaving them out silently."""
+    if conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = ?", (ALL_TRANSACTIONS,)).fetchone():
+        return ALL_TRANSACTIONS
+    try:
+        info = archive_info(conn)
+    except sqlite3.OperationalError:
+        info = None # Not initialized yet
+    if info and (date_range is None or int(date_range[0][:4]) <= info[1]):
+        raise ArchiveUnavailable(f"Transactions up to {info[1]} are in the archive file, which is not "
+                                 "available. Put it back next to the database and reopen it.")
+    return "Transactions"
+
+def attach_archive_of(conn, schema, db_path, alias):
+    """Attaches, as `alias`, the archive of the database attached as `schema`
+    (whose file is db_path), e.g. a file being merged. Returns that file's
+    last completed batch (archive rows above it are still live there), or
+    None when it never archived. Raises ArchiveUnavailable when it did but
+    its archive is missing or belongs to another file."""
+    try:
+        info = conn.execute(f"SELECT Path, ThroughYear, Batch, ArchiveId FROM {schema}.ArchiveInfo WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        try: # Written before archives were bound to their owner
+            info = conn.execute(f"SELECT Path, ThroughYear, Batch, NULL FROM {schema}.ArchiveInfo WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None # Older than archiving
+    if info is None:
+        return None
+    path = _resolve(db_path, info[0])
+    message = (f"Transactions up to {info[1]} of {os.path.basename(db_path)} are in its archive file, "
+               "which is not available.")
+    if not os.path.exists(path):
+        raise ArchiveUnavailable(message)
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+    try:
+        owner = conn.execute(f"SELECT ArchiveId, Completed FROM {alias}.ArchiveOwner WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        owner = None
+    if owner and (owner[0] != info[3] or info[2] < owner[1]):
+        conn.execute(f"DETACH DATABASE {alias}")
+        raise ArchiveUnavailable(message)
+    return info[2]
+
+def detach_archive(conn):
+    conn.execute(f"DROP VIEW IF EXISTS temp.{ALL_TRANSACTIONS}")
+    conn.execute("DETACH DATABASE archive")
+
+def archive_through(conn, db_path, year):
+    """Moves every transaction dated in `year` or earlier to the archive file.
+
+    Per-account yearly totals of the moved rows are added to
+    ArchivedYearTotals in the main file, so summaries never need the
+    archive. SQLite does not commit a WAL database and an attached one
+    atomically, so this takes two commits: rows are first copied under a new
+    batch number, then the main file deletes exactly those rows and records
+    the batch. A run interrupted in between is discarded on the next attach.
+    """
+    year = int(year)
+    info = archive_info(conn)
+    path = default_archive_path(db_path) if info is None else _resolve(db_path, info[0])
+    batch = (info[2] if info else 0) + 1
+    archive_id = info[3] if info else None
+    if info is None:
+        if not _is_attached(conn): # Already attached when an interrupted first run is repeated
+            conn.execute("ATTACH DATABASE ? AS archive", (path,)) # Creates the file
+        conn.executescript(_ARCHIVE_SCHEMA)
+        owner = _owner(conn)
+        if owner and owner[1] > 0:
+            conn.execute("DETACH DATABASE archive")
+            raise ValueError(f"{path} already holds the archive of another database.")
+        archive_id = owner[0] if owner else new_archive_id()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO archive.ArchiveOwner (id, ArchiveId, Completed) VALUES (1, ?, 0)",
+                         (archive_id,))
+        _discard_unfinished(conn, 0) # Leftovers of a first run that never finished
+        conn.execute(_VIEW_SQL)
+
+    try:
+        # 1. Copy (archive file only). Rows left by an earlier attempt of this
+        # batch are replaced, so a run retried after step 2 failed copies nothing twice.
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM archive.Transactions WHERE Batch = ?", (batch,))
+        moved = conn.execute("""
+            INSERT INTO archive.Transactions (Account_id, TransDate, TransType, Amount, Notes, Batch, SourceId)
+            SELECT Account_id, TransDate, TransType, Amount, Notes, ?, id
+            FROM main.Transactions WHERE TransYear <= ?
+            ORDER BY TransDate, id""", (batch, year)).rowcount # Keeps same-day order
+        conn.commit()
+
+        # 2. Totals, delete and bookkeeping (main file only)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            INSERT INTO ArchivedYearTotals (Account_id, Year, DepositCents, WithdrawalCents, Rows)
+            SELECT Account_id, CAST(substr(TransDate, 1, 4) AS integer),
+                   SUM(CASE WHEN TransType = 'Deposit' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END),
+                   SUM(CASE WHEN TransType = 'Withdrawal' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END),
+                   COUNT(*)
+            FROM archive.Transactions WHERE Batch = ?
+            GROUP BY 1, 2
+            ON CONFLICT (Account_id, Year) DO UPDATE SET
+              DepositCents = DepositCents + excluded.DepositCents,
+              WithdrawalCents = WithdrawalCents + excluded.WithdrawalCents,
+              Rows = Rows + excluded.Rows
+        """, (batch,))
+        conn.execute("DELETE FROM main.Transactions WHERE id IN "
+                     "(SELECT SourceId FROM archive.Transactions WHERE Batch = ?)", (batch,))
+        stored = os.path.basename(path) if os.path.dirname(os.path.abspath(path)) == \
+            os.path.dirname(os.path.abspath(db_path)) else path
+        conn.execute("""INSERT INTO ArchiveInfo (id, Path, ThroughYear, Batch, ArchiveId) VALUES (1, ?, ?, ?, ?)
+                        ON CONFLICT (id) DO UPDATE SET ThroughYear = MAX(ThroughYear, excluded.ThroughYear),
+                                                       Batch = excluded.Batch""",
+                     (stored, year, batch, archive_id))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    # 3. Owner's completed batch (archive file). If lost, the next attach records it.
+    try:
+        with conn:
+            conn.execute("UPDATE archive.ArchiveOwner SET Completed = ? WHERE id = 1", (batch,))
+    except sqlite3.Error:
+        pass
+    return {'moved': moved, 'path': path, 'through': max(year, info[1]) if info else year}
+
+def copy_archive(dest_conn, source_db_path, dest_db_path, pages=-1):
+    """Gives a copy of a database its own copy of the archive.
+
+    dest_conn is the copied main file; the archive it names (resolved
+    against source_db_path) is copied to a '.part' file for dest_db_path,
+    trimmed to the batches the copy has completed and bound to the copy
+    under a new ArchiveId. Returns the '.part' path, for the caller to move
+    into place next to the copy, or None when there is no archive to copy.
+    """
+    try:
+        info = archive_info(dest_conn)
+    except sqlite3.OperationalError:
+        return None
+    if info is None:
+        return None
+    source = _resolve(source_db_path, info[0])
+    if not os.path.exists(source):
+        return None
+
+    tmp_path = default_archive_path(dest_db_path) + ".part"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    archive_id = new_archive_id()
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst, pages=pages)
+        dst.executescript(_ARCHIVE_SCHEMA.replace("archive.", "main.")) # Adds ArchiveOwner to older archives
+        with dst:
+            # Batches the source finished after the main file was copied are still live in the copy
+            dst.execute("DELETE FROM Transactions WHERE Batch > ?", (info[2],))
+            dst.execute("INSERT OR REPLACE INTO ArchiveOwner (id, ArchiveId, Completed) VALUES (1, ?, ?)",
+                        (archive_id, info[2]))
+    finally:
+        dst.close()
+        src.close()
+    with dest_conn:
+        dest_conn.execute("UPDATE ArchiveInfo SET Path = ?, ArchiveId = ? WHERE id = 1",
+                          (os.path.basename(default_archive_path(dest_db_path)), archive_id))
+    return tmp_path
@@ -0,0 +1,122 @@
+# dbm/backup.py
+import os
+import glob
+import sqlite3
+import datetime
+import threading
+from .archive import ARCHIVE_SUFFIX, copy_archive, default_archive_path
+
+# Pages copied per backup step. Between steps the source is unlocked,
+# so other connections can keep writing while a large file is copied.
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.005
+
+# Defaults for scheduled rolling snapshots
+SNAPSHOT_INTERVAL_MINUTES = 30
+SNAPSHOT_KEEP = 10
+
+class BackupWorker(threading.Thread):
+    """Copies a database file to dest_path on a background thread.
+
+    Uses Connection.backup() in page-sized steps. The copy is written to a
+    temporary '.part' file first and renamed only when complete, so an
+    interrupted backup never leaves a half-written database behind. An
+    archive file (see archive.py) is copied next to the copy and bound to it.
+
+    NOTE: progress and done callbacks run on the worker thread. Tk widgets
+    must not be touched from them directly (hand the values to the UI thread).
+    """
+
+    def __init__(self, source_path, dest_path, progress=None, done=None,
+                 pages=BACKUP_PAGES_PER_STEP):
+        super().__init__(daemon=True)
+        self.source_path = source_path
+        self.dest_path = dest_path
+        self.progress = progress
+        self.done = done
+        self.pages = pages
+        self.error = None
+
+    def run(self):
+        tmp_path = self.dest_path + ".part"
+        archive_tmp = None
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+            # Each thread needs its own connections (sqlite3 objects are thread-bound)
+            src = sqlite3.connect(self.source_path)
+            dst = sqlite3.connect(tmp_path)
+            try:
+                src.backup(dst, pages=self.pages, progress=self._on_progress,
+                           sleep=BACKUP_STEP_SLEEP)
+                archive_tmp = copy_archive(dst, self.source_path, self.dest_path, pages=self.pages)
+            finally:
+                dst.close()
+                src.close()
+
+            if archive_tmp:
+                os.replace(archive_tmp, default_archive_path(self.dest_path))
+            os.replace(tmp_path, self.dest_path)
+        except Exception as e:
+            self.error = e
+            for path in (tmp_path, archive_tmp):
+                if path and os.path.exists(path):
+                    os.remove(path)
+        finally:
+            if self.done:
+                self.done(self)
+
+    def _on_progress(self, status, remaining, total):
+        if self.progress:
+            self.progress(total - remaining, total)
+
+class RollingSnapshots:
+    """Timestamped snapshots of a database, keeping only the newest `keep` files."""
+
+    def __init__(self, db_path, keep=SNAPSHOT_KEEP, directory=None):
+        self.db_path = db_path
+        self.keep = keep
+        # Default: '<name>_snapshots' folder next to the database file
+        stem = os.path.splitext(os.path.basename(db_path))[0]
+        self.stem = stem
+        self.directory = directory or os.path.join(os.path.dirname(db_path), f"{stem}_snapshots")
+
+    def next_path(self):
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        return os.path.join(self.directory, f"{self.stem}-{stamp}.db")
+
+    def existing(self):
+        """Returns snapshot files, oldest first (timestamps sort lexically)."""
+        return sorted(path for path in glob.glob(os.path.join(self.directory, f"{self.stem}-*.db"))
+                      if not path.endswith(ARCHIVE_SUFFIX))
+
+    def take(self, progress=None, done=None):
+        """Starts a background snapshot and prunes old ones once it finishes."""
+        os.makedirs(self.directory, exist_ok=True)
+
+        def _finished(worker):
+            if worker.error is None:
+                self.prune()
+            if done:
+                done(worker)
+
+        worker = BackupWorker(self.db_path, self.next_path(), progress=progress, done=_finished)
+        worker.start()
+        return worker
+
+    def prune(self):
+        """Deletes the oldest snapshots (and their archive copies) beyond the `keep` limit."""
+        files = self.existing()
+        removed = []
+        for path in files[:max(len(files) - self.keep, 0)]:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                continue
+            try:
+                os.remove(default_archive_path(path))
+            except OSError:
+                pass # No archive
+        return removed
@@ -0,0 +1,158 @@
+# dbm/cra_report.py
+import json
+from collections import namedtuple
+from decimal import Decimal
+
+# kind is 'transaction', 'subtotal' (one per AccountNameCRA) or 'total' (whole report).
+# Amounts are Decimals; account/date are None where they do not apply.
+CRAReportRow = namedtuple("CRAReportRow", "kind account date deposit withdrawal net")
+
+_KINDS = {0: 'transaction', 1: 'subtotal', 2: 'total'}
+
+# Amounts are summed as integer cents
+_DEP_CENTS = "CASE WHEN T.TransType = 'Deposit' THEN CAST(ROUND(T.Amount * 100) AS INTEGER) ELSE 0 END"
+_WD_CENTS = "CASE WHEN T.TransType = 'Withdrawal' THEN CAST(ROUND(T.Amount * 100) AS INTEGER) ELSE 0 END"
+
+# Optional date scope. TransDate is indexed (TRANSDATE), so a one-year
+# report reads only that year's rows.
+_RANGE = "T.TransDate BETWEEN ? AND ?"
+_YEAR_RANGE = "Y.Year BETWEEN CAST(substr(?, 1, 4) AS integer) AND CAST(substr(?, 1, 4) AS integer)"
+
+# Detail queries read {transactions}: the Transactions table, or the
+# AllTransactions view when an archive file is attached (see archive.py).
+
+# One ordered pass: detail rows, per-account rollups and the grand total come
+# back from SQLite already interleaved.
+CRA_REPORT_SQL = f"""
+    WITH Detail AS (
+        SELECT A.AccountNameCRA AS name, T.TransDate AS date,
+               {_DEP_CENTS} AS dep,
+               {_WD_CENTS} AS wd
+        FROM {{transactions}} T
+        JOIN Accounts A ON T.Account_id = A.id
+        {{where}}
+    )
+    SELECT 0 AS is_grand, name, 0 AS level, date, dep, wd FROM Detail
+    UNION ALL
+    SELECT 0, name, 1, NULL, SUM(dep), SUM(wd) FROM Detail GROUP BY name
+    UNION ALL
+    SELECT 1, NULL, 2, NULL, SUM(dep), SUM(wd) FROM Detail HAVING COUNT(*) > 0
+    ORDER BY is_grand, name, level, date
+"""
+
+# Collapsed view: one line per CRA account, details fetched on expand.
+# Archived years come from their stored yearly totals, never the archive file.
+CRA_SUBTOTALS_SQL = f"""
+    SELECT name, SUM(dep), SUM(wd) FROM (
+        SELECT A.AccountNameCRA AS name, {_DEP_CENTS} AS dep, {_WD_CENTS} AS wd
+        FROM Transactions T
+        JOIN Accounts A ON T.Account_id = A.id
+        {{where}}
+        UNION ALL
+        SELECT A.AccountNameCRA, Y.DepositCents, Y.WithdrawalCents
+        FROM ArchivedYearTotals Y
+        JOIN Accounts A ON Y.Account_id = A.id
+        {{year_where}}
+    )
+    GROUP BY name
+    ORDER BY name
+"""
+
+CRA_DETAILS_SQL = f"""
+    SELECT T.TransDate, {_DEP_CENTS}, {_WD_CENTS}
+    FROM {{transactions}} T
+    JOIN Accounts A ON T.Account_id = A.id
+    WHERE A.AccountNameCRA = ? {{and_range}}
+    ORDER BY T.TransDate
+"""
+
+def year_range(year):
+    """(first day, last day) of a tax year, as a date_range argument."""
+    return (f"{int(year):04d}-01-01", f"{int(year):04d}-12-31")
+
+def _scoped(sql, date_range, transactions="Transactions"):
+    """Fills the placeholders of one of the queries above; returns (sql, params)."""
+    if date_range is None:
+        return sql.format(where="", and_range="", year_where="", transactions=transactions), ()
+    return sql.format(where=f"WHERE {_RANGE}", and_range=f"AND {_RANGE}", year_where=f"WHERE {_YEAR_RANGE}",
+                      transactions=transactions), tuple(date_range)
+
+def _money(cents):
+    return Decimal(cents).scaleb(-2)
+
+def iter_cra_report(conn, date_range=None, transactions="Transactions"):
+    """Yields CRAReportRow in display order straight from the cursor.
+
+    date_range is an inclusive ('YYYY-MM-DD', 'YYYY-MM-DD') pair, or None
+    for all history.
+    """
+    cursor = conn.cursor()
+    cursor.execute(*_scoped(CRA_REPORT_SQL, date_range, transactions))
+    for _, name, level, date, dep, wd in cursor:
+        yield CRAReportRow(_KINDS[level], name, date, _money(dep), _money(wd), _money(dep - wd))
+
+def cra_subtotals(conn, date_range=None):
+    """Per-account subtotal rows followed by the grand total (no detail rows).
+
+    Archived years are counted whole, so a range should span whole years.
+    """
+    sql, params = _scoped(CRA_SUBTOTALS_SQL, date_range)
+    cursor = conn.cursor()
+    cursor.execute(sql, params * 2) # Live rows, then archived totals
+    rows = [CRAReportRow('subtotal', name, None, _money(dep), _money(wd), _money(dep - wd))
+            for name, dep, wd in cursor.fetchall()]
+    if rows:
+        dep = sum(row.deposit for row in rows)
+        wd = sum(row.withdrawal for row in rows)
+        rows.append(CRAReportRow('total', None, None, dep, wd, dep - wd))
+    return rows
+
+def cra_details(conn, account_name_cra, date_range=None, transactions="Transactions"):
+    """Transaction rows of a single CRA account, by date."""
+    sql, params = _scoped(CRA_DETAILS_SQL, date_range, transactions)
+    cursor = conn.cursor()
+    cursor.execute(sql, (account_name_cra,) + params)
+    return [CRAReportRow('transaction', account_name_cra, date, _money(dep), _money(wd), _money(dep - wd))
+            for date, dep, wd in cursor.fetchall()]
+
+# --- Sinks ---
+def write_csv(rows, writer):
+    """Writes the semicolon CSV layout used by File > Export (no grand total line)."""
+    writer.writerow(["CRA Account", "Date", "Deposit", "Withdrawal", "Net Change"])
+    pending_spacer = False
+
+    for row in rows:
+        if row.kind == 'transaction':
+            if pending_spacer:
+                writer.writerow([]) # Spacer row between account groups
+                pending_spacer = False
+            writer.writerow([
+                row.account,
+                row.date,
+                f"{row.deposit:.2f}" if row.deposit else "",
+                f"{row.withdrawal:.2f}" if row.withdrawal else "",
+                ""
+            ])
+        elif row.kind == 'subtotal':
+            writer.writerow([
+                f"TOTAL: {row.account}",
+                "",
+                f"{row.deposit:.2f}",
+                f"{row.withdrawal:.2f}",
+                f"{row.net:.2f}"
+            ])
+            pending_spacer = True
+
+def write_json(rows, f):
+    """Writes the report as a JSON list; amounts are strings to keep exact cents."""
+    json.dump([
+        {
+            'kind': row.kind,
+            'account': row.account,
+            'date': row.date,
+            'deposit': f"{row.deposit:.2f}",
+            'withdrawal': f"{row.withdrawal:.2f}",
+            'net': f"{row.net:.2f}"
+        }
+        for row in rows
+    ], f, indent=2)
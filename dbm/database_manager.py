@@ -1,36 +1,317 @@
 # dbm/database_manager.py
 import sqlite3
 import os
+from .backup import BackupWorker
+from .room_ledger import RoomLedger
+from .annual_summary import annual_summary
+from .penalty import compute_penalties, summarize_by_year
+from .cra_report import iter_cra_report, cra_subtotals, cra_details
+from .replica import MemoryReplica
+from .pool import ConnectionPool, BUSY_TIMEOUT_MS
+from .retry import RetryPolicy, retry_on_busy
+from .maintenance import Maintenance
+from .migrations import migrate
+from .account_directory import AccountDirectory
+from .merge import merge_database
+from .recurring import generate_recurring
+from .forecast import forecast, FORECAST_YEARS, DEFAULT_INFLATION
+from .archive import (attach_archive, archive_through, detach_archive, attached_path,
+                      attach_reader, detail_source)
+from .frozen_years import close_years_through, reopen_years_from, verify_frozen_years, frozen_years
+from .snapshot import ensure_snapshot_schema, reset_snapshot, current_fingerprint, load_snapshot, save_snapshot
 
 class DatabaseManager:
-    def __init__(self):
-        self.conn = None
+    def __init__(self, busy_timeout_ms=BUSY_TIMEOUT_MS, retry_policy=None):
+        self.busy_timeout_ms = busy_timeout_ms
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.conn = None # Writer connection (UI thread)
+        self.pool = None # ConnectionPool: the writer plus thread-confined readers
+        self.maintenance = None # Maintenance: ANALYZE / optimize / incremental vacuum
+        self.current_path = None
+        self._ledger = None # RoomLedger, built on first room_as_of() call
+        self._directory = None # AccountDirectory for pickers, dropped only on account writes
+        self._cache = {} # Computed reports, dropped on every write
+        self._cache_fingerprint = None # Data fingerprint the cache was computed at
+        self.snapshot_stale = False # True if the views were painted from an outdated snapshot
+        self.replica_enabled = False # Serve report queries from an in-memory copy
+        self._replica = None
+        self._pending_writes = [] # (sql, params) executed since the last commit
+        self._data_version = None # Last seen PRAGMA data_version of the writer
+        self.archive_state = None # 'attached', 'missing', 'foreign' or None (see archive.attach_archive)
+        self.edited_closed_years = [] # Closed years whose rows changed since, found on open
 
     def connect(self, db_path):
         if self.conn:
             self.close()
-        self.conn = sqlite3.connect(db_path)
+        self.pool = ConnectionPool(db_path, busy_timeout_ms=self.busy_timeout_ms)
+        self.conn = self.pool.writer
+        self.maintenance = Maintenance(self.conn)
+        self.current_path = db_path
+        self._ledger = None
+        self._directory = None
+        self._cache.clear()
+        self._pending_writes.clear()
+        migrate(self.conn)
+        self.archive_state = attach_archive(self.conn, db_path)
+        self._share_archive()
+        self.edited_closed_years = self._verify_closed_years()
+        self._data_version = self.data_version()
+        self._load_snapshot()
+        if self.replica_enabled:
+            self._replica = MemoryReplica(self.conn)
 
     def close(self):
+        if self._replica:
+            self._replica.close()
+            self._replica = None
         if self.conn:
-            self.conn.close()
+            self.save_snapshot()
+            self.maintenance.optimize()
+            self.pool.close() # Also closes the writer
+            self.pool = None
             self.conn = None
+            self.maintenance = None
+        self.current_path = None
+        self.archive_state = None
+        self._ledger = None
+        self._directory = None
+        self._cache.clear()
+
+    def _execute_write(self, cursor, sql, params=()):
+        """Executes a data-changing statement and remembers it for the replica."""
+        try:
+            cursor.execute(sql, params)
+        except sqlite3.Error:
+            # Don't leave a half-done write (and its lock) open
+            self.conn.rollback()
+            self._pending_writes.clear()
+            raise
+        self._pending_writes.append((sql, params))
+
+    def _data_changed(self):
+        """Called after every committed write; cached reports are now stale."""
+        self._cache.clear()
+        if self._replica:
+            self._replica.replay(self._pending_writes)
+        self._pending_writes.clear()
+
+    def reader(self):
+        """Context manager lending a read-only connection to the calling thread.
+
+        For worker threads: `with db.reader() as conn:` and use conn only
+        inside the block.
+        """
+        if not self.pool:
+            raise RuntimeError("No database connected.")
+        return self.pool.reader()
+
+    def run_maintenance(self):
+        """One bounded idle-time maintenance step (ANALYZE if due, incremental vacuum)."""
+        if not self.conn:
+            return None
+        return self.maintenance.run()
+
+    def compact_database(self):
+        """Full VACUUM; also switches older files to incremental auto-vacuum."""
+        if not self.conn:
+            raise RuntimeError("No database connected.")
+        return self.maintenance.enable_incremental_vacuum()
+
+    # --- In-memory reporting replica ---
+    def set_replica_enabled(self, enabled):
+        """Turns the ':memory:' report replica on or off (kept across file opens)."""
+        self.replica_enabled = enabled
+        if enabled and self.conn and not self._replica:
+            self._replica = MemoryReplica(self.conn)
+        elif not enabled and self._replica:
+            self._replica.close()
+            self._replica = None
+        self._ledger = None # Reads closed years from the report connection on demand
+
+    def _report_conn(self):
+        """Connection for read-only report queries: the replica when it is current."""
+        if self._replica:
+            if not self._replica.is_current(self.conn):
+                self._replica.resync(self.conn)
+            return self._replica.conn
+        return self.conn
+
+    # --- Closed (frozen) years ---
+    def _verify_closed_years(self):
+        try:
+            return verify_frozen_years(self.conn)
+        except sqlite3.Error:
+            return [] # Not initialized yet, or a read-only file
+
+    def get_closed_years(self):
+        """FrozenYear rows, oldest first (see frozen_years.frozen_years)."""
+        if not self.conn:
+            return []
+        return frozen_years(self.conn)
+
+    @retry_on_busy
+    def close_years_through(self, year):
+        """Freezes the totals and carryover of every open year up to `year`."""
+        if not self.conn:
+            raise RuntimeError("No database connected.")
+        self.edited_closed_years = verify_frozen_years(self.conn)
+        closed = close_years_through(self.conn, year)
+        self._closed_years_changed()
+        return closed
+
+    @retry_on_busy
+    def reopen_years_from(self, year):
+        """Unfreezes `year` and every later closed year."""
+        if not self.conn:
+            raise RuntimeError("No database connected.")
+        reopened = reopen_years_from(self.conn, year)
+        self.edited_closed_years = [y for y in self.edited_closed_years if y < int(year)]
+        self._closed_years_changed()
+        return reopened
+
+    def _closed_years_changed(self):
+        if self._replica:
+            self._replica.stale = True
+        self._data_changed()
+        self._ledger = None # Now starts from a different carryover
+
+    # --- Archived years ---
+    def _share_archive(self):
+        # Pooled readers attach the same archive (read-only: they run with query_only)
+        path = attached_path(self.conn) if self.archive_state == 'attached' else None
+        self.pool.set_reader_setup((lambda conn: attach_reader(conn, path)) if path else None)
+
+    def _detail_conn(self):
+        """Connection for queries over individual rows. Only the writer has the
+        archive attached; yearly totals live in the main file, so summaries
+        can keep using the replica."""
+        return self.conn if self.archive_state == 'attached' else self._report_conn()
+
+    def archive_through(self, year):
+        """Moves transactions of `year` and earlier to the archive file (see archive.archive_through).
+
+        Not @retry_on_busy: the move commits twice (archive file, then main
+        file), so it cannot be re-run as one transaction.
+        """
+        if not self.conn:
+            raise RuntimeError("No database connected.")
+        if self.archive_state in ('missing', 'foreign'):
+            raise RuntimeError("The archive file of this database is not available.")
+        result = archive_through(self.conn, self.current_path, year)
+        if self.archive_state != 'attached':
+            self.archive_state = 'attached'
+            self._share_archive()
+        if self._replica:
+            self._replica.stale = True
+        self._data_changed()
+        self._ledger = None
+        self.maintenance.note_bulk_change()
+        return result
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            if not self._cache:
+                self._cache_fingerprint = current_fingerprint(self.conn)
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    # --- Changes made by other connections ---
+    def data_version(self):
+        """PRAGMA data_version: changes only when another connection commits."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def check_external_change(self):
+        """One integer read. If another process or instance committed since the
+        last check, drops everything derived from the old data and returns True."""
+        if not self.conn:
+            return False
+        version = self.data_version()
+        if version == self._data_version:
+            return False
+        self._data_version = version
+        self._cache.clear()
+        self._ledger = None
+        self._directory = None
+        return True
+
+    # --- Persisted summary snapshot (instant first paint on reopen) ---
+    def _load_snapshot(self):
+        """Primes the cache from the stored snapshot, even if it is outdated.
+
+        The caller checks snapshot_stale and calls refresh_snapshot() once
+        the first paint is done.
+        """
+        self.snapshot_stale = False
+        try:
+            if not ensure_snapshot_schema(self.conn):
+                return # Not initialized yet (new database)
+            entries, fresh = load_snapshot(self.conn)
+        except sqlite3.Error:
+            return # e.g. a read-only file: just start cold
+        self._cache.update(entries)
+        self._cache_fingerprint = current_fingerprint(self.conn) if fresh else None
+        self.snapshot_stale = bool(entries) and not fresh
+
+    def refresh_snapshot(self):
+        """Drops outdated snapshot values; the next reads recompute them."""
+        self._cache.clear()
+        self.snapshot_stale = False
+
+    def save_snapshot(self):
+        """Writes whatever summaries are cached and known to be current."""
+        if not self.conn or not self._cache or self._cache_fingerprint is None:
+            return 0
+        if self._cache_fingerprint != current_fingerprint(self.conn):
+            return 0 # Someone else wrote since we computed these
+        try:
+            return save_snapshot(self.conn, self._cache, self._cache_fingerprint)
+        except sqlite3.Error:
+            return 0
+
+    def start_backup(self, dest_path, progress=None, done=None):
+        """Copies the open database to dest_path on a background thread."""
+        if not self.conn or not self.current_path:
+            raise RuntimeError("No database connected.")
+        if os.path.abspath(dest_path) == os.path.abspath(self.current_path):
+            raise ValueError("Backup destination is the open database itself.")
+
+        # Everything is committed after each write, so the file on disk is current
+        worker = BackupWorker(self.current_path, dest_path, progress=progress, done=done)
+        worker.start()
+        return worker
 
     def initialize_schema(self, db_path, schema_path):
         with open(schema_path, 'r') as f:
             sql_script = f.read()
         self.connect(db_path)
+        if self.archive_state == 'attached':
+            detach_archive(self.conn)
+        self.archive_state = None
+        self._share_archive()
         self.conn.executescript(sql_script)
         self.conn.commit()
+        # New files reclaim space in idle time instead of growing forever
+        self.maintenance.enable_incremental_vacuum()
+        # Tables were dropped and recreated: any cached summary is meaningless
+        reset_snapshot(self.conn)
+        self.refresh_snapshot()
+        self._ledger = None
+        self._directory = None
+        if self._replica:
+            self._replica.resync(self.conn)
 
+    @retry_on_busy
     def save_account(self, data):
         sql = """INSERT INTO Accounts 
                  (AccountName, AccountNameCRA, AccountType, Institution, AccountNumber, OpeningDate, CloseDate, Notes) 
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
         cursor = self.conn.cursor()
-        cursor.execute(sql, data)
+        self._execute_write(cursor, sql, data)
         self.conn.commit()
+        self._data_changed()
+        self._directory = None
 
+    @retry_on_busy
     def update_account(self, account_id, data):
         """Updates an existing account record."""
         sql = """UPDATE Accounts
@@ -40,23 +321,40 @@ class DatabaseManager:
                 WHERE id = ?"""
         cursor = self.conn.cursor()
         # Combine the form data and the ID into one tuple
-        cursor.execute(sql, data + (account_id,))
+        self._execute_write(cursor, sql, data + (account_id,))
         self.conn.commit()
+        self._data_changed()
+        self._directory = None
 
     def get_account_map(self):
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id, AccountName FROM Accounts ORDER BY AccountName")
-        return {name: acc_id for acc_id, name in cursor.fetchall()}
+        return dict(self.get_account_directory().name_to_id)
+
+    def get_account_directory(self):
+        """AccountDirectory (id/name maps + prefix index) for account pickers.
+
+        Transaction and room writes leave it alone; only account writes drop it.
+        """
+        if self._directory is None:
+            self._directory = AccountDirectory.from_connection(self.conn)
+        return self._directory
 
     def get_accounts(self):
         """Modified to include the 'id' as the first element."""
+        return self.get_accounts_cursor().fetchall()
+
+    def get_accounts_cursor(self):
+        """Same rows as get_accounts(), left on the cursor for fetchmany()."""
         cursor = self.conn.cursor()
         # We fetch 'id' but we will hide it in the UI
         sql = """SELECT id, AccountName, AccountNameCRA, AccountType,
                         Institution, AccountNumber, OpeningDate
                  FROM Accounts ORDER BY AccountName"""
         cursor.execute(sql)
-        return cursor.fetchall()
+        return cursor
+
+    def count_accounts(self):
+        return self._cached('account_count',
+                            lambda: self.conn.execute("SELECT COUNT(*) FROM Accounts").fetchone()[0])
 
     def get_account_by_id(self, account_id):
         """Fetches a single account record by its ID for the edit form."""
@@ -64,60 +362,166 @@ class DatabaseManager:
         cursor.execute("SELECT * FROM Accounts WHERE id = ?", (account_id,))
         return cursor.fetchone()
 
+    @retry_on_busy
     def delete_account(self, account_id):
         """Deletes an account and all its associated transactions."""
         cursor = self.conn.cursor()
         try:
             # Delete linked transactions first (Foreign Key safety)
-            cursor.execute("DELETE FROM Transactions WHERE Account_id = ?", (account_id,))
+            self._execute_write(cursor, "DELETE FROM Transactions WHERE Account_id = ?", (account_id,))
+            self._execute_write(cursor, "DELETE FROM ArchivedYearTotals WHERE Account_id = ?", (account_id,))
+            self._execute_write(cursor, "DELETE FROM RecurringTransaction WHERE Account_id = ?", (account_id,))
 
             # Delete the account itself
-            cursor.execute("DELETE FROM Accounts WHERE id = ?", (account_id,))
+            self._execute_write(cursor, "DELETE FROM Accounts WHERE id = ?", (account_id,))
 
             self.conn.commit()
+            self._data_changed()
+            self._ledger = None # Cascaded delete: rebuild on next use
+            self._directory = None
+            self.maintenance.note_bulk_change()
             return True
         except sqlite3.Error as e:
             self.conn.rollback()
+            self._pending_writes.clear()
             raise e
 
+    @retry_on_busy
     def save_transaction(self, account_id, date, t_type, amount, notes):
         cursor = self.conn.cursor()
-        cursor.execute("""INSERT INTO Transactions (Account_id, TransDate, TransType, Amount, Notes)
+        self._execute_write(cursor, """INSERT INTO Transactions (Account_id, TransDate, TransType, Amount, Notes)
                           VALUES (?, ?, ?, ?, ?)""", (account_id, date, t_type, amount, notes))
         self.conn.commit()
+        self._data_changed()
+        if self._ledger:
+            self._ledger.apply_transaction(date, t_type, amount)
 
+    @retry_on_busy
     def delete_transaction(self, trans_id):
         """Deletes a specific transaction record."""
+        old = self._get_ledger_row(trans_id)
         cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM Transactions WHERE id = ?", (trans_id,))
+        self._execute_write(cursor, "DELETE FROM Transactions WHERE id = ?", (trans_id,))
         self.conn.commit()
+        self._data_changed()
+        if self._ledger and old:
+            self._ledger.apply_transaction(*old, sign=-1)
 
-    def get_transactions(self):
-        """Fetches transactions with ID for UI management."""
-        sql = """SELECT T.id, A.AccountName, T.TransDate, T.TransType, T.Amount, T.Notes
-                FROM Transactions T JOIN Accounts A ON T.Account_id = A.id
+    @retry_on_busy
+    def import_transactions(self, rows):
+        """Bulk insert of prepared statement rows (see importer.prepare_import)
+        plus their fingerprints, all in one transaction."""
+        if not rows:
+            return 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany("""INSERT INTO Transactions (Account_id, TransDate, TransType, Amount, Notes)
+                                  VALUES (?, ?, ?, ?, ?)""", [row[:5] for row in rows])
+            cursor.executemany("INSERT INTO ImportFingerprint (Hash) VALUES (?)", [(row[5],) for row in rows])
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        # Too many statements to replay: copy the replica afresh on its next read
+        if self._replica:
+            self._replica.stale = True
+        self._data_changed()
+        self._ledger = None
+        self.maintenance.note_bulk_change()
+        return len(rows)
+
+    @retry_on_busy
+    def merge_database(self, other_path):
+        """Merges another TFSAid file into this one (see merge.merge_database)."""
+        if os.path.realpath(other_path) == os.path.realpath(self.current_path):
+            raise ValueError("Cannot merge a database into itself.")
+        report = merge_database(self.conn, other_path)
+        if self._replica:
+            self._replica.stale = True
+        self._data_changed()
+        self._ledger = None
+        self._directory = None
+        self.maintenance.note_bulk_change()
+        return report
+
+    def get_transactions(self, date_range=None):
+        """Fetches transactions with ID for UI management.
+
+        date_range: inclusive ('YYYY-MM-DD', 'YYYY-MM-DD') pair, None for all.
+        """
+        return self.get_transactions_cursor(date_range).fetchall()
+
+    def get_transactions_cursor(self, date_range=None):
+        """Same rows as get_transactions(), left on the cursor for fetchmany().
+
+        Like every detail query, raises archive.ArchiveUnavailable when the
+        range reaches archived years and the archive file is not attached.
+        """
+        where, params = self._date_filter(date_range)
+        sql = f"""SELECT T.id, A.AccountName, T.TransDate, T.TransType, T.Amount, T.Notes
+                FROM {detail_source(self.conn, date_range)} T JOIN Accounts A ON T.Account_id = A.id
+                {where}
                 ORDER BY T.TransDate"""
         cursor = self.conn.cursor()
-        cursor.execute(sql)
-        return cursor.fetchall()
+        cursor.execute(sql, params)
+        return cursor
+
+    def count_transactions(self, date_range=None):
+        where, params = self._date_filter(date_range)
+        return self.conn.execute(f"SELECT COUNT(*) FROM {detail_source(self.conn, date_range)} T {where}",
+                                 params).fetchone()[0]
+
+    @staticmethod
+    def _date_filter(date_range):
+        # Plain BETWEEN on the indexed column, so SQLite seeks to the range
+        if date_range is None:
+            return "", ()
+        return "WHERE T.TransDate BETWEEN ? AND ?", tuple(date_range)
+
+    def get_transaction_years(self):
+        """Years that have transactions, live or archived, newest first."""
+        if not self.conn:
+            return []
+        return [row[0] for row in
+                self.conn.execute("""SELECT TransYear FROM Transactions
+                                     UNION SELECT Year FROM ArchivedYearTotals
+                                     ORDER BY 1 DESC""")]
 
     def get_transaction_by_id(self, trans_id):
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM Transactions WHERE id = ?", (trans_id,))
         return cursor.fetchone()
 
+    @retry_on_busy
     def update_transaction(self, trans_id, account_id, date, t_type, amount, notes):
+        old = self._get_ledger_row(trans_id)
         cursor = self.conn.cursor()
         sql = """UPDATE Transactions
                  SET Account_id=?, TransDate=?, TransType=?, Amount=?, Notes=?
                  WHERE id = ?"""
-        cursor.execute(sql, (account_id, date, t_type, amount, notes, trans_id))
+        self._execute_write(cursor, sql, (account_id, date, t_type, amount, notes, trans_id))
         self.conn.commit()
+        self._data_changed()
+        if self._ledger and old:
+            self._ledger.apply_transaction(*old, sign=-1)
+            self._ledger.apply_transaction(date, t_type, amount)
 
+    def _get_ledger_row(self, trans_id):
+        """(TransDate, TransType, Amount) of a row about to change, for the room ledger."""
+        if not self._ledger:
+            return None
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT TransDate, TransType, Amount FROM Transactions WHERE id = ?", (trans_id,))
+        return cursor.fetchone()
+
+    @retry_on_busy
     def save_room_year(self, date, amount):
         cursor = self.conn.cursor()
-        cursor.execute("INSERT INTO NewRoomPerYear (YearFirstDay, NewRoom) VALUES (?, ?)", (date, amount))
+        self._execute_write(cursor, "INSERT INTO NewRoomPerYear (YearFirstDay, NewRoom) VALUES (?, ?)", (date, amount))
         self.conn.commit()
+        self._data_changed()
+        if self._ledger:
+            self._ledger.apply(date, room=amount)
 
     def get_room_years(self):
         """Fetches all room per year entries sorted by year."""
@@ -125,62 +529,152 @@ class DatabaseManager:
         cursor.execute("SELECT id, YearFirstDay, NewRoom FROM NewRoomPerYear ORDER BY YearFirstDay DESC")
         return cursor.fetchall()
 
+    @retry_on_busy
     def delete_room_year(self, room_id):
         """Deletes a specific year room entry."""
         cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM NewRoomPerYear WHERE id = ?", (room_id,))
+        cursor.execute("SELECT YearFirstDay, NewRoom FROM NewRoomPerYear WHERE id = ?", (room_id,))
+        old = cursor.fetchone()
+        self._execute_write(cursor, "DELETE FROM NewRoomPerYear WHERE id = ?", (room_id,))
+        self.conn.commit()
+        self._data_changed()
+        if self._ledger and old:
+            self._ledger.apply(old[0], room=-old[1])
+
+    # --- Recurring transactions ---
+    @retry_on_busy
+    def save_recurring(self, account_id, t_type, amount, cadence, start_date, end_date, notes):
+        cursor = self.conn.cursor()
+        self._execute_write(cursor, """INSERT INTO RecurringTransaction
+                                         (Account_id, TransType, Amount, Cadence, StartDate, EndDate, Notes)
+                                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                            (account_id, t_type, amount, cadence, start_date, end_date or None, notes))
+        self.conn.commit()
+        self._data_changed()
+
+    def get_recurring(self):
+        """Templates with their account name, for the Recurring view."""
+        cursor = self.conn.cursor()
+        cursor.execute("""SELECT R.id, A.AccountName, R.TransType, R.Amount, R.Cadence,
+                                 R.StartDate, R.EndDate, R.Notes, R.NextIndex
+                          FROM RecurringTransaction R JOIN Accounts A ON R.Account_id = A.id
+                          ORDER BY A.AccountName, R.StartDate""")
+        return cursor.fetchall()
+
+    @retry_on_busy
+    def delete_recurring(self, recurring_id):
+        """Deletes a template; transactions it already generated are kept."""
+        cursor = self.conn.cursor()
+        self._execute_write(cursor, "DELETE FROM RecurringTransaction WHERE id = ?", (recurring_id,))
         self.conn.commit()
+        self._data_changed()
 
-    def get_cra_report_data(self):
+    @retry_on_busy
+    def generate_recurring(self, through):
+        """Books every template occurrence due on or before `through` (see recurring.py)."""
+        result = generate_recurring(self.conn, through)
+        if self._replica:
+            self._replica.stale = True
+        self._data_changed()
+        if result['created']:
+            self._ledger = None
+            self.maintenance.note_bulk_change()
+        return result
+
+    def get_cra_report_data(self, date_range=None):
         """Fetches transactions ordered for the CRA report."""
-        sql = """SELECT A.AccountNameCRA, T.TransDate, T.TransType, T.Amount, T.Notes
-                FROM Transactions T
+        where, params = self._date_filter(date_range)
+        sql = f"""SELECT A.AccountNameCRA, T.TransDate, T.TransType, T.Amount, T.Notes
+                FROM {detail_source(self.conn, date_range)} T
                 JOIN Accounts A ON T.Account_id = A.id
+                {where}
                 ORDER BY A.AccountNameCRA ASC, T.TransDate ASC"""
-        cursor = self.conn.cursor()
-        cursor.execute(sql)
+        cursor = self._detail_conn().cursor()
+        cursor.execute(sql, params)
         return cursor.fetchall()
 
+    def get_cra_report_rows(self, date_range=None):
+        """CRA report as CRAReportRow tuples (details, per-account subtotals, grand total).
+
+        Shared by the report view and the exports; computed once per data
+        version and date range. Raises archive.ArchiveUnavailable when the
+        range reaches archived years and the archive file is not attached.
+        """
+        if not self.conn:
+            return []
+        key = 'cra_report' if date_range is None else ('cra_report',) + tuple(date_range)
+        return self._cached(key, lambda: list(iter_cra_report(self._detail_conn(), date_range,
+                                                              detail_source(self.conn, date_range))))
+
+    def get_cra_subtotals(self, date_range=None):
+        """One subtotal row per CRA account plus the grand total, for the collapsed report."""
+        if not self.conn:
+            return []
+        key = 'cra_subtotals' if date_range is None else ('cra_subtotals',) + tuple(date_range)
+        return self._cached(key, lambda: cra_subtotals(self._report_conn(), date_range))
+
+    def get_cra_account_rows(self, account_name_cra, date_range=None):
+        """Detail rows for one CRA account, fetched when its report node is expanded."""
+        if not self.conn:
+            return []
+        return cra_details(self._detail_conn(), account_name_cra, date_range, detail_source(self.conn, date_range))
+
     def get_annual_summary_data(self):
         """Fetches annual limits and transaction totals grouped by year."""
         if not self.conn:
             return []
+        return self._cached('annual_summary', self._compute_annual_summary)
 
-        cursor = self.conn.cursor()
+    def _compute_annual_summary(self):
+        return annual_summary(self._report_conn())
 
-        # 1. Get New Room limits from NewRoomPerYear
-        cursor.execute("SELECT strftime('%Y', YearFirstDay), NewRoom FROM NewRoomPerYear")
-        room_limits = {row[0]: row[1] for row in cursor.fetchall()}
+    def get_room_forecast(self, years=FORECAST_YEARS, inflation=DEFAULT_INFLATION, annual_deposit=0.0):
+        """Projected Annual Summary rows for the years after the data (see forecast.py)."""
+        if not self.conn:
+            return []
+        summary = self.get_annual_summary_data()
+        key = ('forecast', years, inflation, annual_deposit)
+        return self._cached(key, lambda: forecast(self._report_conn(), summary, years, inflation, annual_deposit))
 
-        # 2. Get Transaction totals from Transactions
-        cursor.execute("""
-            SELECT strftime('%Y', TransDate) as year,
-                   SUM(CASE WHEN TransType = 'Deposit' THEN Amount ELSE 0 END) as deposits,
-                   SUM(CASE WHEN TransType = 'Withdrawal' THEN Amount ELSE 0 END) as withdrawals
-            FROM Transactions
-            GROUP BY year
-        """)
-        trans_totals = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+    def get_penalty_report(self, through=None):
+        """Monthly over-contribution penalties and their per-year totals.
 
-        # 3. Determine the full range of years present in the database
-        all_keys = list(room_limits.keys()) + list(trans_totals.keys())
-        if not all_keys:
-            return []
+        Needs every transaction: raises archive.ArchiveUnavailable when the
+        archive file is not attached.
+        """
+        if not self.conn:
+            return [], []
+
+        source = detail_source(self.conn)
+        cursor = self._detail_conn().cursor()
+        cursor.execute("SELECT RoomYear, SUM(NewRoom) FROM NewRoomPerYear GROUP BY RoomYear")
+        room_grants = {str(row[0]): row[1] for row in cursor.fetchall()}
+
+        cursor.execute(f"SELECT TransDate, TransType, Amount FROM {source} ORDER BY TransDate, abs(id)")
+        months = compute_penalties(cursor.fetchall(), room_grants, through)
+        return months, summarize_by_year(months)
+
+    # --- Room on a given date (prefix-sum ledger) ---
+    def _get_ledger(self):
+        if self._ledger is None:
+            self._ledger = RoomLedger.from_connection(self._report_conn())
+        return self._ledger
+
+    def room_as_of(self, date, inclusive=False):
+        """Contribution room on 'YYYY-MM-DD'. By default excludes deposits made that day."""
+        return self._get_ledger().room_as_of(date, inclusive)
+
+    def room_as_of_many(self, dates, inclusive=False):
+        """Batch variant of room_as_of; results follow the order of `dates`."""
+        return self._get_ledger().room_as_of_many(list(dates), inclusive)
+
+    def deposit_headroom(self, date, trans_id=None):
+        """Largest deposit that can be made on `date` without an over-contribution
+        on that day or any later one. When editing, pass the transaction's id so
+        its current amount is not counted twice."""
+        exclude = None
+        if trans_id:
+            exclude = self.conn.execute("SELECT TransDate, TransType, Amount FROM Transactions WHERE id = ?",
+                                        (trans_id,)).fetchone()
+        return self._get_ledger().deposit_headroom(date, exclude)
 
-        years_int = [int(y) for y in all_keys]
-        min_year = min(years_int)
-        max_year = max(years_int)
-
-        results = []
-        for y_int in range(min_year, max_year + 1):
-            y_str = str(y_int)
-            new_room = room_limits.get(y_str, 0.0)
-            dep, wd = trans_totals.get(y_str, (0.0, 0.0))
-
-            results.append({
-                'year': y_str,
-                'new_room': new_room,
-                'deposits': dep,
-                'withdrawals': wd
-            })
-        return results
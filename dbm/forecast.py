@@ -0,0 +1,126 @@
+# dbm/forecast.py
+"""Room projection beyond the last year of data.
+
+Future annual limits follow CRA's indexing: the limit grows with inflation
+and is rounded to the nearest $500. Planned contributions come from the
+recurring templates (occurrences not generated yet) plus an optional flat
+yearly deposit.
+
+Templates are not expanded occurrence by occurrence: each one's count per
+projected year is worked out arithmetically, and templates with the same
+schedule are summed first, so the cost is (distinct schedules x years).
+"""
+import datetime
+import calendar
+from .recurring import CADENCES
+from .room_ledger import to_cents
+
+FORECAST_YEARS = 10
+DEFAULT_INFLATION = 0.02 # per year
+LIMIT_STEP_CENTS = 50000 # limits are rounded to the nearest $500
+
+def indexed_limits(base_cents, years, inflation=DEFAULT_INFLATION):
+    """Limits for the `years` years after the base year, in cents.
+
+    The unrounded amount compounds; only the published limit is rounded,
+    so rounding never accumulates.
+    """
+    limits = []
+    unrounded = base_cents
+    for _ in range(years):
+        unrounded *= 1 + inflation
+        limits.append(int((unrounded + LIMIT_STEP_CENTS / 2) // LIMIT_STEP_CENTS) * LIMIT_STEP_CENTS)
+    return limits
+
+def _parse(date_str):
+    return datetime.date.fromisoformat(date_str)
+
+def _year_bounds(first_year, years):
+    """Per projected year: (first, last) month index and (first, last) day ordinal."""
+    months = [(y * 12, y * 12 + 11) for y in range(first_year, first_year + years)]
+    days = [(datetime.date(y, 1, 1).toordinal(), datetime.date(y, 12, 31).toordinal())
+            for y in range(first_year, first_year + years)]
+    return months, days
+
+def _yearly_counts(schedule, bounds):
+    """Occurrences of one schedule in each projected year.
+
+    Occurrence k falls on origin + k * step (a month index or a day
+    ordinal), so each year's count is the width of an index interval.
+    """
+    cadence, start, end, next_index = schedule
+    months, days = CADENCES[cadence]
+    start = _parse(start)
+    end = _parse(end) if end else None
+
+    if months:
+        step, origin = months, start.year * 12 + start.month - 1
+        year_bounds = bounds[0]
+        last = None
+        if end:
+            last = (end.year * 12 + end.month - 1 - origin) // step
+            # Same month as the end date: the (clamped) start day may fall after it
+            month = origin + last * step
+            day = min(start.day, calendar.monthrange(month // 12, month % 12 + 1)[1])
+            if month == end.year * 12 + end.month - 1 and day > end.day:
+                last -= 1
+    else:
+        step, origin = days, start.toordinal()
+        year_bounds = bounds[1]
+        last = (end.toordinal() - origin) // step if end else None
+
+    counts = []
+    for lo, hi in year_bounds:
+        k_first = -((origin - lo) // step)
+        if k_first < next_index:
+            k_first = next_index
+        k_last = (hi - origin) // step
+        if last is not None and k_last > last:
+            k_last = last
+        counts.append(k_last - k_first + 1 if k_last >= k_first else 0)
+    return counts
+
+def planned_by_year(conn, first_year, years):
+    """(deposits, withdrawals) in cents per projected year from the recurring templates."""
+    # Templates sharing a schedule are summed in SQL, then counted once
+    cursor = conn.execute("""SELECT Cadence, StartDate, EndDate, NextIndex,
+                                    SUM(CASE WHEN TransType = 'Deposit' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END),
+                                    SUM(CASE WHEN TransType = 'Withdrawal' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END)
+                             FROM RecurringTransaction
+                             WHERE EndDate IS NULL OR EndDate >= ?
+                             GROUP BY Cadence, StartDate, EndDate, NextIndex""", (f"{first_year:04d}-01-01",))
+    bounds = _year_bounds(first_year, years)
+    deposits = [0] * years
+    withdrawals = [0] * years
+    for cadence, start, end, next_index, dep, wd in cursor:
+        counts = _yearly_counts((cadence, start, end, next_index), bounds)
+        if dep:
+            deposits = [total + count * dep for total, count in zip(deposits, counts)]
+        if wd:
+            withdrawals = [total + count * wd for total, count in zip(withdrawals, counts)]
+    return deposits, withdrawals
+
+def forecast(conn, summary_rows, years=FORECAST_YEARS, inflation=DEFAULT_INFLATION, annual_deposit=0.0):
+    """Projected rows for the `years` years after the last summary row, in
+    the same shape as annual_summary() rows plus 'projected': True."""
+    if not summary_rows or years <= 0:
+        return []
+    first_year = int(summary_rows[-1]['year']) + 1
+    # Index from the latest year with a limit entered; years between it and
+    # the last data year are compounded through, then left out
+    base_row = next((r for r in reversed(summary_rows) if r['new_room']), None)
+    base = to_cents(base_row['new_room']) if base_row else 0
+    gap = first_year - int(base_row['year']) - 1 if base_row else 0
+
+    limits = indexed_limits(base, gap + years, inflation)[gap:]
+    deposits, withdrawals = planned_by_year(conn, first_year, years)
+    extra = to_cents(annual_deposit)
+    return [{
+        'year': str(first_year + i),
+        'new_room': limits[i] / 100,
+        'deposits': (deposits[i] + extra) / 100,
+        'withdrawals': withdrawals[i] / 100,
+        'closed': False,
+        'edited': False,
+        'projected': True
+    } for i in range(years)]
@@ -0,0 +1,128 @@
+# dbm/frozen_years.py
+"""Closed (filed) tax years.
+
+Closing a year stores its totals and the room carried into the next year
+in FrozenYear, so summaries and the room ledger only aggregate the open
+years after it. Years are closed in order, so the frozen years are always
+a prefix of the timeline.
+
+Triggers flag a frozen year Dirty whenever one of its transactions or its
+room entry is written. A dirty year is only treated as edited if its
+checksum (per-account totals, row counts and new room) no longer matches:
+note edits, date moves within the year and archiving keep it valid.
+Clearing that flag changes no summary, so FrozenYear is not one of the
+snapshot's tracked tables; closing and reopening bump ChangeCounter
+themselves.
+"""
+import hashlib
+import datetime
+import sqlite3
+
+# Per-account totals of one year: live rows plus archived yearly totals
+_YEAR_TOTALS_SQL = """
+    SELECT Account_id, SUM(dep), SUM(wd), SUM(n) FROM (
+        SELECT Account_id,
+               CASE WHEN TransType = 'Deposit' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END AS dep,
+               CASE WHEN TransType = 'Withdrawal' THEN CAST(ROUND(Amount * 100) AS INTEGER) ELSE 0 END AS wd,
+               1 AS n
+        FROM Transactions WHERE TransYear = ?
+        UNION ALL
+        SELECT Account_id, DepositCents, WithdrawalCents, Rows FROM ArchivedYearTotals WHERE Year = ?
+    )
+    GROUP BY Account_id
+    ORDER BY Account_id
+"""
+
+def year_totals(conn, year):
+    """(new room, deposits, withdrawals, checksum) of one year, amounts in cents."""
+    accounts = conn.execute(_YEAR_TOTALS_SQL, (year, year)).fetchall()
+    room = conn.execute("SELECT COALESCE(CAST(ROUND(SUM(NewRoom) * 100) AS INTEGER), 0) "
+                        "FROM NewRoomPerYear WHERE RoomYear = ?", (year,)).fetchone()[0]
+    key = f"{year}|{room}|" + ";".join(f"{acc}:{dep}:{wd}:{n}" for acc, dep, wd, n in accounts)
+    checksum = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big", signed=True)
+    return room, sum(a[1] for a in accounts), sum(a[2] for a in accounts), checksum
+
+def frozen_years(conn):
+    """FrozenYear rows as (Year, NewRoomCents, DepositCents, WithdrawalCents,
+    CarryoverCents, Checksum, Dirty), oldest first."""
+    return conn.execute("""SELECT Year, NewRoomCents, DepositCents, WithdrawalCents,
+                                  CarryoverCents, Checksum, Dirty
+                           FROM FrozenYear ORDER BY Year""").fetchall()
+
+def _changed(conn, row):
+    # Dirty only means "written since"; the checksum decides
+    return bool(row[6]) and year_totals(conn, row[0])[3] != row[5]
+
+def trusted_prefix(conn, rows=None):
+    """(frozen rows that can be used as stored, edited years).
+
+    Everything from the first edited year on must be recomputed; the last
+    trusted row's carryover is where room computation starts.
+    """
+    rows = frozen_years(conn) if rows is None else rows
+    for i, row in enumerate(rows):
+        if _changed(conn, row):
+            return rows[:i], [r[0] for r in rows[i:] if _changed(conn, r)]
+    return rows, []
+
+def _first_year(conn):
+    return conn.execute("""SELECT MIN(y) FROM (SELECT MIN(TransYear) AS y FROM Transactions
+                                               UNION ALL SELECT MIN(RoomYear) FROM NewRoomPerYear
+                                               UNION ALL SELECT MIN(Year) FROM ArchivedYearTotals)""").fetchone()[0]
+
+def _bump_counter(conn):
+    # Cached and snapshotted summaries change with the set of closed years
+    conn.execute("UPDATE ChangeCounter SET Counter = Counter + 1 WHERE id = 1")
+
+def close_years_through(conn, year):
+    """Freezes every open year up to and including `year`; returns the years closed."""
+    year = int(year)
+    rows = frozen_years(conn)
+    trusted, edited = trusted_prefix(conn, rows)
+    if edited:
+        raise ValueError(f"Year {edited[0]} was edited after it was closed; reopen it first.")
+    if rows:
+        first, carry = rows[-1][0] + 1, rows[-1][4]
+    else:
+        first, carry = _first_year(conn), 0
+    if first is None or first > year:
+        return []
+
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    closed = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for y in range(first, year + 1):
+            room, dep, wd, checksum = year_totals(conn, y)
+            # Same rules as the Annual Summary: withdrawals come back next year
+            carry = carry + room - dep + wd
+            conn.execute("""INSERT INTO FrozenYear (Year, NewRoomCents, DepositCents, WithdrawalCents,
+                                                    CarryoverCents, Checksum, FrozenAt)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)""", (y, room, dep, wd, carry, checksum, now))
+            closed.append(y)
+        _bump_counter(conn)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return closed
+
+def reopen_years_from(conn, year):
+    """Unfreezes `year` and every later year; returns how many were reopened."""
+    with conn:
+        reopened = conn.execute("DELETE FROM FrozenYear WHERE Year >= ?", (int(year),)).rowcount
+        _bump_counter(conn)
+    return reopened
+
+def verify_frozen_years(conn):
+    """Clears the Dirty flag of years whose checksum still matches; returns the edited years."""
+    edited = []
+    with conn:
+        for row in frozen_years(conn):
+            if not row[6]:
+                continue
+            if _changed(conn, row):
+                edited.append(row[0])
+            else:
+                conn.execute("UPDATE FrozenYear SET Dirty = 0 WHERE Year = ?", (row[0],))
+    return edited
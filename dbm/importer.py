@@ -0,0 +1,237 @@
+# dbm/importer.py
+"""Statement import: OFX/QFX (SGML 1.x or XML 2.x) and generic bank CSV.
+
+Files are read as a stream and turned into StatementLine tuples. Lines are
+then checked in batches: validation.py rules, statement account mapped to
+Accounts.AccountNumber, and a 64-bit hash looked up in ImportFingerprint.
+Only the accepted rows are kept, and DatabaseManager writes them in one
+transaction.
+"""
+import io
+import re
+import csv
+import hashlib
+from collections import namedtuple
+from .validation import validate_transactions
+
+# One statement line as found in the file; amount is the raw signed text
+StatementLine = namedtuple("StatementLine", "account_number date amount memo")
+
+BATCH_ROWS = 5000 # lines validated and looked up per round trip
+_LOOKUP_CHUNK = 500 # hashes per IN (...) query
+_READ_CHUNK = 64 * 1024
+
+# --- OFX / QFX ---
+_OFX_TOKEN = re.compile(r"<(/?)([^<>]+)>([^<]*)")
+_ACCOUNT_BLOCKS = ("BANKACCTFROM", "CCACCTFROM", "INVACCTFROM")
+
+def _ofx_tokens(f):
+    """(closing, TAG, text) triples, read chunk by chunk."""
+    tail = ""
+    while True:
+        chunk = f.read(_READ_CHUNK)
+        data = tail + chunk
+        if not chunk:
+            end = len(data)
+        else:
+            # Keep an unfinished tag (and its text) for the next chunk
+            end = data.rfind("<")
+            if end <= 0:
+                tail = data
+                continue
+        for m in _OFX_TOKEN.finditer(data, 0, end):
+            yield m.group(1) == "/", m.group(2).strip().upper(), m.group(3).strip()
+        if not chunk:
+            return
+        tail = data[end:]
+
+def _ofx_date(value):
+    # DTPOSTED is YYYYMMDD[HHMMSS[.XXX]][[-5:EST]]
+    return f"{value[0:4]}-{value[4:6]}-{value[6:8]}" if len(value) >= 8 else value
+
+def iter_ofx(f):
+    """Yields a StatementLine per <STMTTRN>. Works for bank, credit card and
+    the cash legs (INVBANKTRAN) of brokerage statements."""
+    account = None
+    block = None # Which aggregate the current leaf tag belongs to
+    trn = None
+    for closing, tag, text in _ofx_tokens(f):
+        if tag.startswith("?") or tag.startswith("!"):
+            continue # XML declaration / processing instructions
+        if tag in _ACCOUNT_BLOCKS:
+            block = None if closing else "account"
+        elif tag == "STMTTRN":
+            if closing and trn is not None:
+                memo = trn.get("MEMO") or trn.get("NAME") or ""
+                yield StatementLine(account, _ofx_date(trn.get("DTPOSTED", "")), trn.get("TRNAMT", ""), memo)
+                trn = None
+            elif not closing:
+                trn = {}
+        elif not closing and text:
+            if block == "account" and tag == "ACCTID":
+                account = text
+            elif trn is not None:
+                trn[tag] = text
+
+# --- Generic bank CSV ---
+_CSV_COLUMNS = {
+    'date': ("date", "transaction date", "posted date", "posting date", "trans date"),
+    'amount': ("amount", "transaction amount", "amount (cad)"),
+    'deposit': ("deposit", "deposits", "credit", "credits", "money in"),
+    'withdrawal': ("withdrawal", "withdrawals", "debit", "debits", "money out"),
+    'memo': ("description", "memo", "notes", "details", "payee", "name"),
+    'account': ("account", "account number", "account #", "acct"),
+}
+
+def _find_columns(header):
+    lowered = [h.strip().lower() for h in header]
+    found = {}
+    for key, names in _CSV_COLUMNS.items():
+        for i, h in enumerate(lowered):
+            if h in names:
+                found[key] = i
+                break
+    if 'date' not in found or not ('amount' in found or 'deposit' in found or 'withdrawal' in found):
+        raise ValueError("CSV needs a Date column and an Amount (or Deposit/Withdrawal) column.")
+    return found
+
+_SLASH_DATE = re.compile(r"(\d{4})[/.](\d{1,2})[/.](\d{1,2})")
+
+def _csv_date(value):
+    # ISO and YYYY/MM/DD only; day-first vs month-first dates are ambiguous
+    value = value.strip()
+    m = _SLASH_DATE.fullmatch(value)
+    if m:
+        return f"{m.group(1)}-{int(m.group(2)):02d}-{int(m.group(3)):02d}"
+    if len(value) == 8 and value.isdigit():
+        return _ofx_date(value)
+    return value
+
+def iter_bank_csv(f, account_number=None):
+    """Yields a StatementLine per CSV row. Without an Account column every
+    row is booked to account_number."""
+    sample = f.read(4096)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(f, dialect)
+    header = next(reader, None)
+    if header is None:
+        return
+    cols = _find_columns(header)
+
+    def cell(row, key):
+        i = cols.get(key)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    for row in reader:
+        if not any(row):
+            continue
+        amount = cell(row, 'amount')
+        if not amount:
+            dep, wd = cell(row, 'deposit'), cell(row, 'withdrawal')
+            amount = dep if dep else (f"-{wd.lstrip('-')}" if wd else "")
+        yield StatementLine(cell(row, 'account') or account_number, _csv_date(cell(row, 'date')),
+                            amount, cell(row, 'memo'))
+
+# --- Checking and dedupe ---
+def _split_amount(text):
+    """'-1,234.50' / '($12.00)' / '12,5' -> ('Withdrawal', '1234.50') style pairs."""
+    text = text.strip().replace("$", "").replace(" ", "")
+    negative = text.startswith("-") or (text.startswith("(") and text.endswith(")"))
+    text = text.strip("-+()")
+    comma, dot = text.rfind(","), text.rfind(".")
+    if comma > dot and (dot >= 0 or len(text) - comma <= 3):
+        text = text.replace(".", "").replace(",", ".") # Decimal comma: 1.234,50 / 12,5
+    else:
+        text = text.replace(",", "") # Thousands separators: 1,234.50
+    return ("Withdrawal" if negative else "Deposit"), text
+
+def fingerprint(account_id, date, cents, memo, occurrence):
+    """Signed 64-bit hash; occurrence numbers identical lines within one file
+    so two genuine same-day, same-amount purchases are both kept."""
+    key = f"{account_id}|{date}|{cents}|{memo.strip().lower()}|{occurrence}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big", signed=True)
+
+def _existing_hashes(conn, hashes):
+    found = set()
+    for i in range(0, len(hashes), _LOOKUP_CHUNK):
+        chunk = hashes[i:i + _LOOKUP_CHUNK]
+        placeholders = ", ".join("?" * len(chunk))
+        found.update(row[0] for row in conn.execute(
+            f"SELECT Hash FROM ImportFingerprint WHERE Hash IN ({placeholders})", chunk))
+    return found
+
+def prepare_import(conn, lines, default_account=None):
+    """Checks statement lines in batches without writing anything.
+
+    Returns (rows, report): rows are (account_id, date, type, amount, notes,
+    hash) tuples ready for DatabaseManager.import_transactions(); report
+    counts what was accepted and why the rest was skipped.
+    """
+    accounts = {str(number).strip(): acc_id for acc_id, number in
+                conn.execute("SELECT id, AccountNumber FROM Accounts WHERE AccountNumber IS NOT NULL "
+                             "AND AccountNumber != ''")}
+    report = {'read': 0, 'accepted': 0, 'duplicates': 0, 'unknown_accounts': 0, 'invalid': 0,
+              'unmatched': set(), 'errors': []}
+    rows = []
+    occurrences = {}
+    seen = set() # hashes accepted earlier in this file
+
+    def check(batch):
+        types, amounts = zip(*(_split_amount(line.amount) for line in batch))
+        cents, errors = validate_transactions([line.date for line in batch], types, amounts)
+        candidates = []
+        for line, t_type, amount, error in zip(batch, types, cents, errors):
+            number = (line.account_number or default_account or "").strip()
+            acc_id = accounts.get(number)
+            if acc_id is None:
+                report['unknown_accounts'] += 1
+                report['unmatched'].add(number or "(none)")
+                continue
+            if error:
+                report['invalid'] += 1
+                if len(report['errors']) < 20:
+                    report['errors'].append(f"{line.date} {line.amount}: {error[0][1]}")
+                continue
+            key = (acc_id, line.date, t_type, amount, line.memo)
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            signed = amount if t_type == "Deposit" else -amount
+            candidates.append((acc_id, line.date, t_type, amount / 100, line.memo,
+                               fingerprint(acc_id, line.date, signed, line.memo, occurrence)))
+        existing = _existing_hashes(conn, [c[5] for c in candidates])
+        for row in candidates:
+            if row[5] in existing or row[5] in seen:
+                report['duplicates'] += 1
+            else:
+                seen.add(row[5])
+                rows.append(row)
+
+    batch = []
+    for line in lines:
+        report['read'] += 1
+        batch.append(line)
+        if len(batch) >= BATCH_ROWS:
+            check(batch)
+            batch = []
+    if batch:
+        check(batch)
+    report['accepted'] = len(rows)
+    return rows, report
+
+def read_statement(path, account_number=None):
+    """Opens path with the parser its extension calls for; returns a line iterator."""
+    lower = path.lower()
+    if lower.endswith((".ofx", ".qfx")):
+        # OFX 1.x declares a charset in its header; latin-1 never fails to decode
+        f = io.open(path, "r", encoding="latin-1", newline="")
+        return _closing(f, iter_ofx(f))
+    f = io.open(path, "r", encoding="utf-8-sig", errors="replace", newline="")
+    return _closing(f, iter_bank_csv(f, account_number))
+
+def _closing(f, lines):
+    with f:
+        yield from lines
@@ -0,0 +1,94 @@
+# dbm/loadtest.py
+"""Local multi-process write load test.
+
+    python -m dbm.loadtest [--writers 2 4 8 16 32] [--seconds 5] [--busy-timeout 5000]
+
+Every writer process opens its own DatabaseManager on one scratch database
+and calls save_transaction() in a loop. Reports throughput, per-write
+latency (which is mostly time spent waiting for the lock), retries and
+writes that failed even after retrying.
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from .database_manager import DatabaseManager
+from .pool import BUSY_TIMEOUT_MS
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql', 'initdb.sql')
+
+def _writer(db_path, seconds, busy_timeout_ms, start, results):
+    db = DatabaseManager(busy_timeout_ms=busy_timeout_ms)
+    db.connect(db_path)
+    account_id = db.conn.execute("SELECT MIN(id) FROM Accounts").fetchone()[0]
+    latencies = []
+    failures = 0
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            db.save_transaction(account_id, "2024-01-15", "Deposit", 1.0, "loadtest")
+        except sqlite3.OperationalError:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - t0)
+    retries = db.retry_policy.retries
+    db.conn.close() # Skip close(): no snapshot or optimize per worker
+    results.put((latencies, retries, failures))
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def run(writers, seconds, busy_timeout_ms=BUSY_TIMEOUT_MS):
+    """One round with `writers` processes; returns a result dict."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "loadtest.db")
+        setup = DatabaseManager()
+        setup.initialize_schema(db_path, SCHEMA_PATH)
+        setup.save_account(("Load Test", "Load Test", "TFSA", "", "", "2020-01-01", None, ""))
+        setup.close()
+
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_writer, args=(db_path, seconds, busy_timeout_ms, start, results))
+                 for _ in range(writers)]
+        for p in procs:
+            p.start()
+        start.set()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+    latencies = [lat for lats, _, _ in collected for lat in lats]
+    return {
+        'writers': writers,
+        'writes': len(latencies),
+        'per_second': len(latencies) / seconds,
+        'p50_ms': _percentile(latencies, 50) * 1000,
+        'p95_ms': _percentile(latencies, 95) * 1000,
+        'max_ms': max(latencies, default=0.0) * 1000,
+        'retries': sum(r for _, r, _ in collected),
+        'failures': sum(f for _, _, f in collected),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writer load test for TFSAid databases.")
+    parser.add_argument("--writers", type=int, nargs="+", default=[2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--busy-timeout", type=int, default=BUSY_TIMEOUT_MS, help="milliseconds")
+    args = parser.parse_args()
+
+    print(f"{'writers':>7} {'writes':>8} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'retries':>7} {'failed':>6}")
+    for n in args.writers:
+        r = run(n, args.seconds, args.busy_timeout)
+        print(f"{r['writers']:>7} {r['writes']:>8} {r['per_second']:>9.0f} {r['p50_ms']:>8.2f} "
+              f"{r['p95_ms']:>8.2f} {r['max_ms']:>8.1f} {r['retries']:>7} {r['failures']:>6}")
+
+if __name__ == "__main__":
+    main()
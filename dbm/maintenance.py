@@ -0,0 +1,101 @@
+# dbm/maintenance.py
+import time
+import sqlite3
+
+# Rows changed (per sqlite3 total_changes) before statistics are refreshed
+ANALYZE_CHANGE_THRESHOLD = 1000
+# Free pages handed back per idle maintenance run
+VACUUM_PAGE_BUDGET = 200
+# How often the app looks for an idle moment to run maintenance
+MAINTENANCE_INTERVAL_MS = 60 * 1000
+MAINTENANCE_IDLE_SECONDS = 30
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+class Maintenance:
+    """ANALYZE / PRAGMA optimize / incremental vacuum for the writer connection.
+
+    Every call runs on the writer's thread in a small, bounded step, and the
+    time spent and space reclaimed are added to running totals.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._changes_at_analyze = conn.total_changes
+        self._bulk_change = False
+        self.totals = {'runs': 0, 'analyzes': 0, 'pages_freed': 0, 'bytes_reclaimed': 0, 'seconds': 0.0}
+
+    def _pragma(self, name):
+        return self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def note_bulk_change(self):
+        """Called after cascades and imports: refresh statistics at the next run."""
+        self._bulk_change = True
+
+    def needs_analyze(self):
+        return (self._bulk_change or
+                self.conn.total_changes - self._changes_at_analyze >= ANALYZE_CHANGE_THRESHOLD)
+
+    def run(self, page_budget=VACUUM_PAGE_BUDGET):
+        """One maintenance step; returns what was done."""
+        start = time.perf_counter()
+        report = {'analyzed': False, 'pages_freed': 0, 'bytes_reclaimed': 0}
+
+        if self.needs_analyze():
+            self.conn.execute("ANALYZE")
+            self.conn.commit()
+            self._changes_at_analyze = self.conn.total_changes
+            self._bulk_change = False
+            report['analyzed'] = True
+
+        if self._pragma("auto_vacuum") == AUTO_VACUUM_INCREMENTAL:
+            free_before = self._pragma("freelist_count")
+            if free_before:
+                # executescript steps the pragma to completion; a plain
+                # execute() would free only one page per step
+                self.conn.executescript(f"PRAGMA incremental_vacuum({int(page_budget)});")
+                freed = free_before - self._pragma("freelist_count")
+                report['pages_freed'] = freed
+                report['bytes_reclaimed'] = freed * self._pragma("page_size")
+
+        report['seconds'] = time.perf_counter() - start
+        self._add_to_totals(report)
+        return report
+
+    def optimize(self):
+        """PRAGMA optimize: cheap, meant to run just before closing."""
+        try:
+            self.conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+
+    def enable_incremental_vacuum(self):
+        """Switches the file to auto_vacuum=INCREMENTAL; needs one full VACUUM if tables exist."""
+        start = time.perf_counter()
+        size_before = self._file_bytes()
+        if self._pragma("auto_vacuum") != AUTO_VACUUM_INCREMENTAL:
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("VACUUM")
+        report = {'analyzed': False, 'pages_freed': 0,
+                  'bytes_reclaimed': max(size_before - self._file_bytes(), 0),
+                  'seconds': time.perf_counter() - start}
+        self._add_to_totals(report)
+        return report
+
+    def _file_bytes(self):
+        return self._pragma("page_count") * self._pragma("page_size")
+
+    def _add_to_totals(self, report):
+        self.totals['runs'] += 1
+        self.totals['analyzes'] += int(report['analyzed'])
+        self.totals['pages_freed'] += report['pages_freed']
+        self.totals['bytes_reclaimed'] += report['bytes_reclaimed']
+        self.totals['seconds'] += report['seconds']
+
+    def status(self):
+        """Current file state plus running totals, for the maintenance report."""
+        status = dict(self.totals)
+        status['auto_vacuum'] = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(self._pragma("auto_vacuum"), "?")
+        status['free_pages'] = self._pragma("freelist_count")
+        status['file_bytes'] = self._file_bytes()
+        return status
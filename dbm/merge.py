@@ -0,0 +1,184 @@
+# dbm/merge.py
+import sqlite3
+from .archive import attach_archive_of, detail_source
+
+# Other file's account id -> id of the same account in this file
+_MAP_SQL = """
+    CREATE TEMP TABLE MergeAccountMap (
+      OtherId integer PRIMARY KEY,
+      LocalId integer NOT NULL
+    );
+
+    -- 1. Same CRA name
+    INSERT INTO MergeAccountMap (OtherId, LocalId)
+    SELECT O.id, A.id FROM other.Accounts O JOIN main.Accounts A ON A.AccountNameCRA = O.AccountNameCRA;
+
+    -- 2. Otherwise the same account number
+    INSERT OR IGNORE INTO MergeAccountMap (OtherId, LocalId)
+    SELECT O.id, A.id FROM other.Accounts O JOIN main.Accounts A ON A.AccountNumber = O.AccountNumber
+    WHERE COALESCE(O.AccountNumber, '') != '';
+"""
+
+# Accounts with no match are copied under the names picked by _new_account_names()
+_ADD_ACCOUNTS_SQL = """
+    INSERT INTO main.Accounts (AccountName, AccountNameCRA, AccountType, Institution,
+                               AccountNumber, OpeningDate, CloseDate, Notes)
+    SELECT N.Name, O.AccountNameCRA, O.AccountType, O.Institution, O.AccountNumber, O.OpeningDate, O.CloseDate, O.Notes
+    FROM other.Accounts O JOIN MergeAccountNames N ON N.OtherId = O.id
+"""
+
+_MAP_ADDED_SQL = """
+    INSERT INTO MergeAccountMap (OtherId, LocalId)
+    SELECT O.id, A.id FROM other.Accounts O JOIN main.Accounts A ON A.AccountNameCRA = O.AccountNameCRA
+    WHERE O.id NOT IN (SELECT OtherId FROM MergeAccountMap)
+"""
+
+# The other file's transactions with local account ids. n numbers identical
+# rows, so a row counts as a duplicate only while this file has at least as
+# many copies of it: merging a file into itself adds nothing, but two real
+# same-day deposits of the same amount both survive. {transactions} is
+# other.Transactions, or _OTHER_WITH_ARCHIVE when the other file archived.
+_STAGE_TRANSACTIONS_SQL = """
+    CREATE TEMP TABLE MergeTransactions AS
+    SELECT M.LocalId AS Account_id, T.TransDate, T.TransType, T.Amount, T.Notes,
+           ROW_NUMBER() OVER (PARTITION BY M.LocalId, T.TransDate, T.TransType, T.Amount, T.Notes
+                              ORDER BY T.id) AS n
+    FROM {transactions} T JOIN MergeAccountMap M ON M.OtherId = T.Account_id
+"""
+
+# The other file's archived rows come over as live rows (archived ids
+# negated, as in archive.ALL_TRANSACTIONS); batches it never completed are
+# still live there and are skipped
+_OTHER_WITH_ARCHIVE = """(
+    SELECT id, Account_id, TransDate, TransType, Amount, Notes FROM other.Transactions
+    UNION ALL
+    SELECT -id, Account_id, TransDate, TransType, Amount, Notes FROM other_archive.Transactions
+    WHERE Batch <= ?
+)"""
+
+# How many copies of each staged key this file already has, live or archived
+# ({transactions}, see archive.detail_source), from one grouped pass over the
+# matched accounts, then indexed for the anti-join below
+_EXISTING_COUNTS_SQL = """
+    CREATE TEMP TABLE MergeExisting AS
+    SELECT T.Account_id, T.TransDate, T.TransType, T.Amount, T.Notes, COUNT(*) AS copies
+    FROM {transactions} T
+    WHERE T.Account_id IN (SELECT LocalId FROM MergeAccountMap)
+    GROUP BY T.Account_id, T.TransDate, T.TransType, T.Amount, T.Notes
+"""
+
+_EXISTING_INDEX_SQL = """
+    CREATE INDEX temp.MergeExistingKey ON MergeExisting (Account_id, TransDate, TransType, Amount, Notes)
+"""
+
+_COPY_TRANSACTIONS_SQL = """
+    INSERT INTO main.Transactions (Account_id, TransDate, TransType, Amount, Notes)
+    SELECT X.Account_id, X.TransDate, X.TransType, X.Amount, X.Notes
+    FROM MergeTransactions X
+    LEFT JOIN MergeExisting E
+      ON E.Account_id = X.Account_id AND E.TransDate = X.TransDate
+     AND E.TransType = X.TransType AND E.Amount = X.Amount AND E.Notes IS X.Notes
+    WHERE X.n > COALESCE(E.copies, 0)
+    ORDER BY X.TransDate
+"""
+
+# Years this file has are kept as they are; differing amounts are reported
+_ROOM_CONFLICTS_SQL = """
+    SELECT O.YearFirstDay, L.NewRoom, O.NewRoom
+    FROM other.NewRoomPerYear O JOIN main.NewRoomPerYear L ON L.YearFirstDay = O.YearFirstDay
+    WHERE L.NewRoom != O.NewRoom
+    ORDER BY O.YearFirstDay
+"""
+
+_COPY_ROOM_SQL = """
+    INSERT INTO main.NewRoomPerYear (YearFirstDay, NewRoom)
+    SELECT YearFirstDay, NewRoom FROM other.NewRoomPerYear
+    WHERE YearFirstDay NOT IN (SELECT YearFirstDay FROM main.NewRoomPerYear)
+"""
+
+def merge_database(conn, other_path):
+    """Copies another TFSAid file's accounts, transactions and yearly room
+    into conn's database in one transaction; returns a report dict.
+
+    Accounts are matched by AccountNameCRA, then AccountNumber. All copying
+    is set-based INSERT ... SELECT across the attached file. Archived rows
+    of this file count as existing ones, and the other file's archived rows
+    are copied with its live ones; the merge is refused
+    (archive.ArchiveUnavailable) when either archive cannot be read.
+    """
+    transactions = detail_source(conn)
+    conn.execute("ATTACH DATABASE ? AS other", (other_path,)) # Not allowed inside a transaction
+    other_batch = None
+    try:
+        found = conn.execute("SELECT COUNT(*) FROM other.sqlite_master WHERE type = 'table' "
+                             "AND name IN ('Accounts', 'Transactions', 'NewRoomPerYear')").fetchone()[0]
+        if found < 3:
+            raise ValueError("The selected file is not a TFSAid database.")
+        other_batch = attach_archive_of(conn, "other", other_path, "other_archive")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            report = _merge(conn, transactions, other_batch)
+            conn.execute("DROP TABLE temp.MergeAccountMap")
+            conn.execute("DROP TABLE temp.MergeAccountNames")
+            conn.execute("DROP TABLE temp.MergeTransactions")
+            conn.execute("DROP TABLE temp.MergeExisting")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        if other_batch is not None:
+            conn.execute("DETACH DATABASE other_archive")
+        conn.execute("DETACH DATABASE other")
+    return report
+
+def _new_account_names(conn):
+    """(other id, name) for every unmatched account. A name this file already
+    uses gets ' (merged)', then ' (merged 2)', ' (merged 3)'... so repeated
+    merges never collide."""
+    taken = {row[0] for row in conn.execute("SELECT AccountName FROM main.Accounts")}
+    names = []
+    for other_id, name in conn.execute("""SELECT id, AccountName FROM other.Accounts
+                                          WHERE id NOT IN (SELECT OtherId FROM MergeAccountMap)
+                                          ORDER BY id""").fetchall():
+        candidate, n = name, 1
+        while candidate in taken:
+            candidate = f"{name} (merged)" if n == 1 else f"{name} (merged {n})"
+            n += 1
+        taken.add(candidate)
+        names.append((other_id, candidate))
+    return names
+
+def _merge(conn, transactions, other_batch):
+    report = {}
+    other_accounts = conn.execute("SELECT COUNT(*) FROM other.Accounts").fetchone()[0]
+    for statement in _MAP_SQL.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    report['accounts_matched'] = conn.execute("SELECT COUNT(*) FROM MergeAccountMap").fetchone()[0]
+
+    conn.execute("CREATE TEMP TABLE MergeAccountNames (OtherId integer PRIMARY KEY, Name varchar(256) NOT NULL)")
+    conn.executemany("INSERT INTO MergeAccountNames (OtherId, Name) VALUES (?, ?)", _new_account_names(conn))
+    report['accounts_renamed'] = conn.execute("""SELECT COUNT(*) FROM MergeAccountNames N
+                                                JOIN other.Accounts O ON O.id = N.OtherId
+                                                WHERE N.Name != O.AccountName""").fetchone()[0]
+    report['accounts_added'] = conn.execute(_ADD_ACCOUNTS_SQL).rowcount
+    conn.execute(_MAP_ADDED_SQL)
+    mapped = conn.execute("SELECT COUNT(*) FROM MergeAccountMap").fetchone()[0]
+    if mapped != other_accounts:
+        raise sqlite3.IntegrityError("Some accounts of the other file could not be matched or copied.")
+
+    if other_batch is None:
+        conn.execute(_STAGE_TRANSACTIONS_SQL.format(transactions="other.Transactions"))
+    else:
+        conn.execute(_STAGE_TRANSACTIONS_SQL.format(transactions=_OTHER_WITH_ARCHIVE), (other_batch,))
+    staged = conn.execute("SELECT COUNT(*) FROM MergeTransactions").fetchone()[0]
+    conn.execute(_EXISTING_COUNTS_SQL.format(transactions=transactions))
+    conn.execute(_EXISTING_INDEX_SQL)
+    report['transactions_added'] = conn.execute(_COPY_TRANSACTIONS_SQL).rowcount
+    report['transactions_duplicate'] = staged - report['transactions_added']
+
+    report['room_conflicts'] = conn.execute(_ROOM_CONFLICTS_SQL).fetchall()
+    report['room_years_added'] = conn.execute(_COPY_ROOM_SQL).rowcount
+    return report
@@ -0,0 +1,137 @@
+# dbm/migrations.py
+import sqlite3
+
+# PRAGMA user_version of a file with every migration below applied.
+# sql/initdb.sql creates new files at this version directly.
+SCHEMA_VERSION = 6
+
+def _columns(conn, table):
+    # table_xinfo (unlike table_info) also lists generated columns
+    return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+def _add_year_columns(conn):
+    """Integer year columns computed from the date, plus indexes on them.
+
+    ALTER TABLE can only add VIRTUAL generated columns; the index stores the
+    value, so year-grouped queries still walk the index instead of calling
+    strftime() per row. New files get STORED columns from initdb.sql.
+    """
+    if "TransYear" not in _columns(conn, "Transactions"):
+        conn.execute("ALTER TABLE Transactions ADD COLUMN TransYear integer "
+                     "GENERATED ALWAYS AS (CAST(substr(TransDate, 1, 4) AS integer)) VIRTUAL")
+    if "RoomYear" not in _columns(conn, "NewRoomPerYear"):
+        conn.execute("ALTER TABLE NewRoomPerYear ADD COLUMN RoomYear integer "
+                     "GENERATED ALWAYS AS (CAST(substr(YearFirstDay, 1, 4) AS integer)) VIRTUAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS TRANSYEAR ON Transactions (TransYear, TransType, Amount)")
+    conn.execute("CREATE INDEX IF NOT EXISTS TRANSDATE ON Transactions (TransDate)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ROOMYEAR ON NewRoomPerYear (RoomYear, NewRoom)")
+
+def _add_import_fingerprints(conn):
+    """Hashes of imported statement lines, so re-importing a file adds nothing."""
+    conn.execute("CREATE TABLE IF NOT EXISTS ImportFingerprint (Hash integer PRIMARY KEY)")
+
+def _add_archive_tables(conn):
+    """Yearly totals of archived transactions, and where the archive lives."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS ArchivedYearTotals (
+                      Account_id integer NOT NULL,
+                      Year integer NOT NULL,
+                      DepositCents integer NOT NULL DEFAULT 0,
+                      WithdrawalCents integer NOT NULL DEFAULT 0,
+                      Rows integer NOT NULL DEFAULT 0,
+                      PRIMARY KEY (Account_id, Year)
+                    )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS ArchiveInfo (
+                      id integer PRIMARY KEY CHECK (id = 1),
+                      Path varchar(512) NOT NULL,
+                      ThroughYear integer NOT NULL,
+                      Batch integer NOT NULL DEFAULT 0
+                    )""")
+
+# Flag a closed year whenever one of its rows is written (see frozen_years.py)
+_FROZEN_TRIGGERS = {
+    'Transactions_insert_frozen': ("AFTER INSERT ON Transactions", ["NEW.TransDate"]),
+    'Transactions_update_frozen': ("AFTER UPDATE ON Transactions", ["OLD.TransDate", "NEW.TransDate"]),
+    'Transactions_delete_frozen': ("AFTER DELETE ON Transactions", ["OLD.TransDate"]),
+    'NewRoomPerYear_insert_frozen': ("AFTER INSERT ON NewRoomPerYear", ["NEW.YearFirstDay"]),
+    'NewRoomPerYear_update_frozen': ("AFTER UPDATE ON NewRoomPerYear", ["OLD.YearFirstDay", "NEW.YearFirstDay"]),
+    'NewRoomPerYear_delete_frozen': ("AFTER DELETE ON NewRoomPerYear", ["OLD.YearFirstDay"]),
+}
+
+def _add_frozen_years(conn):
+    """Totals and ending carryover of closed tax years."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS FrozenYear (
+                      Year integer PRIMARY KEY,
+                      NewRoomCents integer NOT NULL,
+                      DepositCents integer NOT NULL,
+                      WithdrawalCents integer NOT NULL,
+                      CarryoverCents integer NOT NULL,
+                      Checksum integer NOT NULL,
+                      Dirty integer NOT NULL DEFAULT 0,
+                      FrozenAt datetime NOT NULL
+                    )""")
+    for name, (event, dates) in _FROZEN_TRIGGERS.items():
+        years = ", ".join(f"CAST(substr({d}, 1, 4) AS integer)" for d in dates)
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {name} {event}
+                         BEGIN
+                           UPDATE FrozenYear SET Dirty = 1 WHERE Year IN ({years});
+                         END""")
+
+def _add_recurring_transactions(conn):
+    """Templates for the recurring transaction generator (see recurring.py)."""
+    conn.execute("""CREATE TABLE IF NOT EXISTS RecurringTransaction (
+                      id integer PRIMARY KEY,
+                      Account_id integer NOT NULL,
+                      TransType varchar(32) CHECK( TransType IN ('Deposit', 'Withdrawal') ) NOT NULL DEFAULT 'Deposit',
+                      Amount decimal(20, 2) NOT NULL,
+                      Cadence varchar(16) CHECK( Cadence IN ('weekly', 'biweekly', 'monthly', 'quarterly', 'annually') ) NOT NULL,
+                      StartDate date NOT NULL,
+                      EndDate date,
+                      Notes varchar(512),
+                      NextIndex integer NOT NULL DEFAULT 0,
+                      FOREIGN KEY (Account_id) REFERENCES Accounts(id)
+                    )""")
+
+def _add_archive_owner(conn):
+    """Id binding a file to its archive (see archive.py)."""
+    if "ArchiveId" not in _columns(conn, "ArchiveInfo"):
+        conn.execute("ALTER TABLE ArchiveInfo ADD COLUMN ArchiveId varchar(32)")
+
+# (version reached, step), applied in order
+MIGRATIONS = [
+    (1, _add_year_columns),
+    (2, _add_import_fingerprints),
+    (3, _add_archive_tables),
+    (4, _add_frozen_years),
+    (5, _add_recurring_transactions),
+    (6, _add_archive_owner),
+]
+
+def migrate(conn):
+    """Brings an existing TFSAid file up to SCHEMA_VERSION.
+
+    Returns the number of steps applied. Files without the TFSAid tables
+    (not initialized yet) are left alone.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return 0
+    found = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' "
+                         "AND name IN ('Transactions', 'NewRoomPerYear')").fetchone()[0]
+    if found < 2:
+        return 0
+
+    applied = 0
+    # sqlite3 runs DDL in autocommit mode; one explicit transaction keeps
+    # the steps and the version bump all-or-nothing
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for target, step in MIGRATIONS:
+            if version < target:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                applied += 1
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return applied
@@ -0,0 +1,83 @@
+# dbm/penalty.py
+import datetime
+from .room_ledger import to_cents
+
+# CRA: 1% per month on the highest excess TFSA amount in that month
+PENALTY_RATE_PERCENT = 1
+
+def _month_index(date_str):
+    return int(date_str[:4]) * 12 + int(date_str[5:7]) - 1
+
+def _month_label(index):
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+def compute_penalties(transactions, room_grants, through=None):
+    """Month-by-month excess timeline and the penalty owed for each month.
+
+    transactions: (TransDate, TransType, Amount) rows sorted by date.
+    room_grants:  {year: new_room} from NewRoomPerYear.
+    through:      last month to report ('YYYY-MM-DD'), default today. An
+                  excess keeps costing 1% a month until it is removed.
+
+    Room follows the Annual Summary rules. A withdrawal first reduces any
+    current excess (CRA's "qualifying portion"); the rest comes back as room
+    on January 1st of the next year, so year-end carryover matches the
+    summary. One sweep over transactions and months: O(T + M).
+    """
+    dates = [t[0] for t in transactions] + [f"{year}-01-01" for year in room_grants]
+    if not dates:
+        return []
+
+    first = _month_index(min(dates))
+    last = _month_index(max(max(dates), through or datetime.date.today().isoformat()))
+
+    grants = {int(year): to_cents(amount) for year, amount in room_grants.items()}
+    room_left = 0        # negative means an excess amount
+    pending_credit = 0   # withdrawals given back next January
+    t = 0
+    months = []
+
+    for month in range(first, last + 1):
+        if month % 12 == 0 or month == first:
+            # New year (or start of data): add this year's room and last year's withdrawals
+            room_left += grants.get(month // 12, 0) + pending_credit
+            pending_credit = 0
+
+        highest = max(-room_left, 0)
+        while t < len(transactions) and _month_index(transactions[t][0]) == month:
+            _, t_type, amount = transactions[t]
+            cents = to_cents(amount)
+            if t_type == 'Deposit':
+                room_left -= cents
+                highest = max(highest, -room_left)
+            else:
+                qualifying = min(cents, max(-room_left, 0))
+                room_left += qualifying
+                pending_credit += cents - qualifying
+            t += 1
+
+        penalty = (highest * PENALTY_RATE_PERCENT + 50) // 100
+        months.append({
+            'month': _month_label(month),
+            'highest_excess': highest / 100,
+            'penalty': penalty / 100
+        })
+    return months
+
+def summarize_by_year(months):
+    """Collapses monthly rows to {'year', 'months_in_excess', 'highest_excess', 'penalty'}."""
+    years = {}
+    for row in months:
+        year = row['month'][:4]
+        entry = years.setdefault(year, {'year': year, 'months_in_excess': 0,
+                                        'highest_excess': 0.0, 'penalty_cents': 0})
+        if row['highest_excess'] > 0:
+            entry['months_in_excess'] += 1
+        entry['highest_excess'] = max(entry['highest_excess'], row['highest_excess'])
+        entry['penalty_cents'] += to_cents(row['penalty'])
+
+    results = []
+    for entry in years.values():
+        entry['penalty'] = entry.pop('penalty_cents') / 100
+        results.append(entry)
+    return results
@@ -0,0 +1,155 @@
+# dbm/pool.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+READER_POOL_SIZE = 4
+READER_CHECKOUT_TIMEOUT = 10 # seconds to wait for a free reader
+BUSY_TIMEOUT_MS = 5000 # how long a statement waits for another writer's lock
+
+class PoolTimeout(Exception):
+    """All reader connections stayed checked out for the whole timeout."""
+
+class ConnectionPool:
+    """One writer connection plus up to `readers` reader connections.
+
+    The writer belongs to the thread that opened the database (the Tk
+    thread) and keeps sqlite3's default same-thread check. Readers are
+    handed out to one thread at a time: take one with `with pool.reader()`
+    and use it only inside that block, on that thread. The file is switched
+    to WAL so readers see the last commit without blocking the writer.
+
+    The writer starts its implicit transactions with BEGIN IMMEDIATE: the
+    write lock is taken up front, so two processes can never both hold a
+    read lock and deadlock trying to upgrade it.
+    """
+
+    def __init__(self, db_path, readers=READER_POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.size = readers
+        self.busy_timeout = busy_timeout_ms / 1000
+        self.writer = sqlite3.connect(db_path, timeout=self.busy_timeout, isolation_level="IMMEDIATE")
+        self.wal = self._enable_wal(self.writer)
+
+        self._idle = queue.LifoQueue() # Most recently used first: its cache is warm
+        self._lock = threading.Lock()
+        self._created = 0
+        self._owners = {} # reader connection -> thread ident holding it
+        self._closed = False
+        self._setup = None # Run on every new reader before it is made read-only
+        self._generation = 0 # Bumped by set_reader_setup(); older readers are replaced
+        self._generations = {} # reader connection -> generation it was opened at
+
+    @staticmethod
+    def _enable_wal(conn):
+        try:
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            return mode.lower() == "wal"
+        except sqlite3.Error:
+            return False # e.g. read-only media: stay in rollback-journal mode
+
+    def _open_reader(self):
+        # Confinement is enforced by checkout/checkin, so sqlite3's own
+        # creator-thread check is relaxed for readers only.
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               check_same_thread=False, isolation_level=None)
+        if self._setup:
+            self._setup(conn)
+        conn.execute("PRAGMA query_only = ON")
+        with self._lock:
+            self._generations[conn] = self._generation
+        return conn
+
+    def set_reader_setup(self, setup):
+        """Sets a callable run on each reader as it is opened (e.g. to attach
+        the archive file); readers opened before are replaced on checkout."""
+        with self._lock:
+            self._setup = setup
+            self._generation += 1
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return not conn.in_transaction
+        except sqlite3.Error:
+            return False
+
+    def checkout(self, timeout=READER_CHECKOUT_TIMEOUT):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed.")
+
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_grow = self._created < self.size
+                if can_grow:
+                    self._created += 1
+            if can_grow:
+                try:
+                    conn = self._open_reader()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"No reader connection free after {timeout}s.")
+
+        # Health check: replace a reader that broke while idle or predates the setup
+        if not self._is_healthy(conn) or self._generations.get(conn) != self._generation:
+            self._forget(conn)
+            conn = self._open_reader()
+
+        with self._lock:
+            self._owners[conn] = threading.get_ident()
+        return conn
+
+    def checkin(self, conn):
+        with self._lock:
+            if self._owners.get(conn) != threading.get_ident():
+                raise RuntimeError("Reader connection returned from a thread that did not check it out.")
+            del self._owners[conn]
+
+        if self._closed or not self._is_healthy(conn):
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _forget(self, conn):
+        conn.close()
+        with self._lock:
+            self._generations.pop(conn, None)
+
+    def _discard(self, conn):
+        self._forget(conn)
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def reader(self, timeout=READER_CHECKOUT_TIMEOUT):
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size, 'open': self._created,
+                    'in_use': len(self._owners), 'idle': self._idle.qsize(), 'wal': self.wal}
+
+    def close(self):
+        """Closes idle readers and the writer; busy readers close on checkin."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        self.writer.close()
@@ -0,0 +1,50 @@
+# dbm/replica.py
+import sqlite3
+from .snapshot import current_fingerprint
+
+class MemoryReplica:
+    """Read-only ':memory:' copy of the open database for report queries.
+
+    Writes made through DatabaseManager are replayed here right after they
+    are committed. Changes from other connections are caught by comparing
+    the ChangeCounter fingerprint, and fixed with a full resync.
+    """
+
+    def __init__(self, source_conn):
+        self.conn = sqlite3.connect(":memory:")
+        self.stale = True
+        self.resync(source_conn)
+
+    def resync(self, source_conn):
+        """Copies the whole source database into memory (backup API)."""
+        self.conn.execute("PRAGMA query_only = OFF")
+        source_conn.backup(self.conn)
+        self.conn.execute("PRAGMA query_only = ON")
+        self.stale = False
+
+    def replay(self, statements):
+        """Applies (sql, params) pairs that were just committed on the source."""
+        if self.stale:
+            return
+        try:
+            self.conn.execute("PRAGMA query_only = OFF")
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            self.stale = True # Resync before the next read
+        finally:
+            self.conn.execute("PRAGMA query_only = ON")
+
+    def is_current(self, source_conn):
+        if self.stale:
+            return False
+        try:
+            return current_fingerprint(self.conn) == current_fingerprint(source_conn)
+        except sqlite3.Error:
+            # No change counter in this file: only our own replayed writes are tracked
+            return True
+
+    def close(self):
+        self.conn.close()
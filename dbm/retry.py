@@ -0,0 +1,55 @@
+# dbm/retry.py
+import time
+import random
+import sqlite3
+import functools
+
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+def is_busy_error(error):
+    """True for 'database is locked' / 'database is busy' style failures."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None) # Python 3.11+
+    if code is not None:
+        return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+class RetryPolicy:
+    """Bounded exponential backoff for writes that lost the lock race.
+
+    SQLite's busy_timeout already waits inside each statement; this covers
+    the cases it cannot (e.g. the timeout ran out under heavy contention).
+    """
+
+    def __init__(self, attempts=5, base_delay=0.05, max_delay=1.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0 # Total retries so far, for diagnostics and load tests
+
+    def delay(self, attempt):
+        # Full jitter keeps competing writers from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+def retry_on_busy(method):
+    """Decorator for DatabaseManager write methods.
+
+    The whole method is re-run after a rollback, so each method must do its
+    reads and writes between its own start and its commit.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        policy = self.retry_policy
+        for attempt in range(policy.attempts):
+            try:
+                return method(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == policy.attempts - 1:
+                    raise
+                self.conn.rollback()
+                policy.retries += 1
+                time.sleep(policy.delay(attempt))
+    return wrapper
@@ -0,0 +1,239 @@
+# dbm/room_ledger.py
+import bisect
+from .frozen_years import trusted_prefix
+
+def to_cents(amount):
+    """Money is summed as integer cents so prefix sums never drift."""
+    return int(round((amount or 0) * 100))
+
+class RoomLedger:
+    """Date-indexed cumulative ledger of deposits, withdrawals and room grants.
+
+    `dates` is a sorted list of distinct 'YYYY-MM-DD' strings. The three
+    prefix lists hold running totals in cents: prefix[i] is the sum of all
+    entries dated before dates[i] (so prefix[0] is always 0 and each list
+    is one longer than `dates`).
+
+    Room on a date follows the same rules as the Annual Summary:
+      - a year's new room is granted on its YearFirstDay,
+      - deposits use up room immediately,
+      - withdrawals are given back on January 1st of the following year.
+
+    With closed years (see frozen_years.py) the lists cover the open years
+    only, starting from the stored carryover. Dates inside closed years are
+    answered by a second ledger over those years, read on first use.
+    """
+
+    def __init__(self):
+        self.dates = []
+        self.dep = [0]
+        self.wd = [0]
+        self.room = [0]
+        self.start_year = None # First open year when built from a closed-year carryover
+        self._conn = None # Source of the closed-years ledger and of rebuilds
+        self._frozen = [] # Trusted FrozenYear rows the open years start after
+        self._closed = None # RoomLedger over the closed years, built on first use
+        self._year_ends = None # (first year, room at each year end), rebuilt after a change
+
+    @classmethod
+    def from_connection(cls, conn):
+        ledger = cls()
+        ledger.rebuild(conn)
+        return ledger
+
+    def rebuild(self, conn):
+        """Full rebuild: one grouped query per table, merged by date.
+
+        Starts from the carryover of the last closed year (booked as room on
+        the next January 1st), so only open years are read.
+        """
+        daily = {}
+        trusted, _ = trusted_prefix(conn)
+        after = trusted[-1][0] if trusted else -1
+        if trusted:
+            daily[f"{after + 1:04d}-01-01"] = [0, 0, trusted[-1][4]]
+        self.start_year = after + 1 if trusted else None
+        self._conn = conn
+        self._frozen = trusted
+        self._closed = None
+        self._year_ends = None
+        self._load(conn, daily, "> ?", after)
+
+    def _closed_ledger(self):
+        """Ledger over the closed years, for dates before start_year."""
+        if self._closed is None:
+            self._closed = RoomLedger()
+            self._closed._load(self._conn, {}, "<= ?", self.start_year - 1)
+        return self._closed
+
+    def _load(self, conn, daily, years, bound):
+        """Adds the entries of the years matching `years` (e.g. "> ?") to daily and fills the lists."""
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT TransDate,
+                   SUM(CASE WHEN TransType = 'Deposit' THEN Amount ELSE 0 END),
+                   SUM(CASE WHEN TransType = 'Withdrawal' THEN Amount ELSE 0 END)
+            FROM Transactions
+            WHERE TransYear {years}
+            GROUP BY TransDate
+        """, (bound,))
+        for date, dep, wd in cursor.fetchall():
+            entry = daily.setdefault(date, [0, 0, 0])
+            entry[0] += to_cents(dep)
+            entry[1] += to_cents(wd)
+
+        # Archived years only keep yearly totals: booked on January 1st, which
+        # is exact for every date after the archived years
+        cursor.execute("SELECT Year, SUM(DepositCents), SUM(WithdrawalCents) FROM ArchivedYearTotals "
+                       f"WHERE Year {years} GROUP BY Year", (bound,))
+        for year, dep, wd in cursor.fetchall():
+            entry = daily.setdefault(f"{year:04d}-01-01", [0, 0, 0])
+            entry[0] += dep
+            entry[1] += wd
+
+        cursor.execute(f"SELECT YearFirstDay, SUM(NewRoom) FROM NewRoomPerYear WHERE RoomYear {years} "
+                       "GROUP BY YearFirstDay", (bound,))
+        for date, room in cursor.fetchall():
+            daily.setdefault(date, [0, 0, 0])[2] += to_cents(room)
+
+        self.dates = sorted(daily)
+        self.dep, self.wd, self.room = [0], [0], [0]
+        for date in self.dates:
+            dep, wd, room = daily[date]
+            self.dep.append(self.dep[-1] + dep)
+            self.wd.append(self.wd[-1] + wd)
+            self.room.append(self.room[-1] + room)
+
+    def apply(self, date, deposit=0.0, withdrawal=0.0, room=0.0):
+        """Adds (or with negative amounts, removes) one entry without a rebuild.
+
+        New entries are usually the most recent, so only the tail of the
+        prefix lists has to be shifted. An entry in a closed year means that
+        year no longer matches its stored totals: the ledger is rebuilt
+        (call this after the change is committed).
+        """
+        if self.start_year is not None and date < f"{self.start_year:04d}-01-01":
+            self.rebuild(self._conn)
+            return
+        deltas = (to_cents(deposit), to_cents(withdrawal), to_cents(room))
+        self._update_year_ends(date, *deltas)
+        i = bisect.bisect_left(self.dates, date)
+        if i == len(self.dates) or self.dates[i] != date:
+            self.dates.insert(i, date)
+            for prefix in (self.dep, self.wd, self.room):
+                prefix.insert(i + 1, prefix[i])
+
+        for prefix, delta in zip((self.dep, self.wd, self.room), deltas):
+            if delta:
+                for j in range(i + 1, len(prefix)):
+                    prefix[j] += delta
+
+    def apply_transaction(self, date, t_type, amount, sign=1):
+        if t_type == 'Deposit':
+            self.apply(date, deposit=sign * amount)
+        else:
+            self.apply(date, withdrawal=sign * amount)
+
+    def _room_cents(self, date, inclusive, lo=0):
+        # Grants dated on `date` are available that morning
+        granted_idx = bisect.bisect_right(self.dates, date, lo)
+        # Withdrawals only come back from the first day of the next year
+        credit_idx = bisect.bisect_left(self.dates, f"{date[:4]}-01-01", 0, granted_idx)
+        # Deposits on `date` count only if asked for ("after" vs "before" that day's activity)
+        spent_idx = granted_idx if inclusive else bisect.bisect_left(self.dates, date, credit_idx, granted_idx)
+
+        cents = self.room[granted_idx] + self.wd[credit_idx] - self.dep[spent_idx]
+        return cents, granted_idx
+
+    def _ledger_for(self, date):
+        if self.start_year is not None and date < f"{self.start_year:04d}-01-01":
+            return self._closed_ledger()
+        return self
+
+    def room_as_of(self, date, inclusive=False):
+        """Room available on `date`, before (default) or after that day's deposits."""
+        return self._ledger_for(date)._room_cents(date, inclusive)[0] / 100
+
+    def room_as_of_many(self, dates, inclusive=False):
+        """Batch variant: answers in input order.
+
+        Queries are visited in sorted order so each binary search starts
+        where the previous one ended (closed-year dates all come first).
+        """
+        results = [0.0] * len(dates)
+        lo = 0
+        previous = None
+        for k in sorted(range(len(dates)), key=dates.__getitem__):
+            ledger = self._ledger_for(dates[k])
+            if ledger is not previous:
+                lo, previous = 0, ledger
+            cents, lo = ledger._room_cents(dates[k], inclusive, lo)
+            results[k] = cents / 100
+        return results
+
+    # --- Over-contribution guard ---
+    def _year_end_rooms(self):
+        """Room left at the end of each year with data, after all its deposits.
+
+        Room is granted and given back on January 1st and only goes down
+        during the year, so a year's lowest point is its last day. A closed
+        year's comes from its stored totals: the carryover before that
+        year's withdrawals are given back.
+        """
+        if self._year_ends is None:
+            if not self.dates:
+                self._year_ends = (0, [])
+            else:
+                first, last = int(self.dates[0][:4]), int(self.dates[-1][:4])
+                ends = [self._room_cents(f"{y:04d}-12-31", True)[0] for y in range(first, last + 1)]
+                if self._frozen:
+                    first = self._frozen[0][0]
+                    ends = [row[4] - row[3] for row in self._frozen] + ends
+                self._year_ends = (first, ends)
+        return self._year_ends
+
+    def _update_year_ends(self, date, dep, wd, room):
+        """Keeps the year-end index current for an entry inside its year range."""
+        if self._year_ends is None:
+            return
+        first, ends = self._year_ends
+        year = int(date[:4])
+        if not ends or not first <= year < first + len(ends):
+            self._year_ends = None # The range grows: rebuild on next use
+            return
+        for i in range(year - first, len(ends)):
+            ends[i] += room - dep
+        # Withdrawals come back the next January 1st
+        for i in range(year - first + 1, len(ends)):
+            ends[i] += wd
+
+    def deposit_headroom(self, date, exclude=None):
+        """Largest deposit on `date` that keeps room at or above zero on that
+        day and every day after it, in dollars.
+
+        exclude is the (date, type, amount) of a transaction being edited,
+        which no longer counts. A date in a closed year is checked against
+        that year's stored year-end room and every year after it.
+        """
+        first, ends = self._year_end_rooms()
+        year = int(date[:4])
+        # The edited row's own effect, as a step from some year on
+        step_year, step = None, 0
+        if exclude:
+            old_date, old_type, old_amount = exclude
+            if old_type == 'Deposit':
+                step_year, step = int(old_date[:4]), to_cents(old_amount)
+            else:
+                step_year, step = int(old_date[:4]) + 1, -to_cents(old_amount)
+
+        lowest = None
+        for y in range(year, max(year, first + len(ends) - 1) + 1):
+            if first <= y < first + len(ends):
+                cents = ends[y - first]
+            else:
+                cents = self._room_cents(f"{y:04d}-12-31", True)[0]
+            if step_year is not None and y >= step_year:
+                cents += step
+            if lowest is None or cents < lowest:
+                lowest = cents
+        return lowest / 100
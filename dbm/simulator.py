@@ -0,0 +1,109 @@
+# dbm/simulator.py
+import re
+from .room_ledger import to_cents
+
+# One hypothetical transaction per line: "2025-06-01 Deposit 5000" or "2025 W 1200.50"
+_LINE_RE = re.compile(r"^\s*(\d{4})(?:-\d{2}-\d{2})?\s+(deposit|withdrawal|d|w)\s+\$?([\d,]+(?:\.\d{1,2})?)\s*$",
+                      re.IGNORECASE)
+
+def parse_scenarios(text):
+    """Parses the what-if text box.
+
+    Scenarios are separated by blank lines. Returns (scenarios, errors) where
+    each scenario is a list of (year, t_type, amount) and errors is a list of
+    (line_number, line) that could not be read.
+    """
+    scenarios = [[]]
+    errors = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            if scenarios[-1]:
+                scenarios.append([])
+            continue
+        match = _LINE_RE.match(line)
+        if not match:
+            errors.append((line_no, line))
+            continue
+        year, kind, amount = match.groups()
+        t_type = 'Deposit' if kind[0].lower() == 'd' else 'Withdrawal'
+        scenarios[-1].append((int(year), t_type, float(amount.replace(',', ''))))
+
+    if not scenarios[-1] and len(scenarios) > 1:
+        scenarios.pop()
+    return scenarios, errors
+
+class ContributionSimulator:
+    """Replays hypothetical transactions on top of get_annual_summary_data().
+
+    Nothing is written to the database. The baseline is turned into per-year
+    cent columns once; every scenario is then a sparse set of per-year deltas
+    and all scenarios are advanced together, one year column at a time.
+    """
+
+    def __init__(self, summary_rows):
+        self.base = {int(r['year']): (to_cents(r['new_room']), to_cents(r['deposits']), to_cents(r['withdrawals']))
+                     for r in summary_rows}
+
+    def years_for(self, scenarios):
+        """Baseline year range, widened to cover every hypothetical year."""
+        years = set(self.base)
+        for scenario in scenarios:
+            years.update(year for year, _, _ in scenario)
+        if not years:
+            return []
+        return list(range(min(years), max(years) + 1))
+
+    def simulate_batch(self, scenarios):
+        """Returns (years, remaining) where remaining[k][i] is the room left at
+        the end of years[i] under scenario k, in dollars."""
+        years = self.years_for(scenarios)
+        n = len(scenarios)
+
+        # 1. Sparse per-scenario deltas: {year: [deposit_cents, withdrawal_cents]}
+        deltas = []
+        for scenario in scenarios:
+            d = {}
+            for year, t_type, amount in scenario:
+                slot = d.setdefault(year, [0, 0])
+                slot[0 if t_type == 'Deposit' else 1] += to_cents(amount)
+            deltas.append(d)
+
+        # 2. Same recurrence as AnnualSummaryFrame, applied to whole columns
+        carry = [0] * n
+        columns = []
+        for year in years:
+            new_room, base_dep, base_wd = self.base.get(year, (0, 0, 0))
+            remaining = [0] * n
+            for k in range(n):
+                extra_dep, extra_wd = deltas[k].get(year, (0, 0))
+                remaining[k] = new_room + carry[k] - base_dep - extra_dep
+                carry[k] = remaining[k] + base_wd + extra_wd
+            columns.append(remaining)
+
+        remaining = [[columns[i][k] / 100 for i in range(len(years))] for k in range(n)]
+        return years, remaining
+
+    def simulate(self, scenario):
+        """Single scenario: per-year rows shaped like get_annual_summary_data() plus room."""
+        years, remaining = self.simulate_batch([scenario])
+        extra = {}
+        for year, t_type, amount in scenario:
+            slot = extra.setdefault(year, [0.0, 0.0])
+            slot[0 if t_type == 'Deposit' else 1] += amount
+
+        rows = []
+        for i, year in enumerate(years):
+            new_room, dep, wd = self.base.get(year, (0, 0, 0))
+            extra_dep, extra_wd = extra.get(year, (0.0, 0.0))
+            rows.append({
+                'year': str(year),
+                'new_room': new_room / 100,
+                'deposits': dep / 100 + extra_dep,
+                'withdrawals': wd / 100 + extra_wd,
+                'remaining_room': remaining[0][i]
+            })
+        return rows
+
+    @staticmethod
+    def over_contribution_years(years, remaining_row):
+        return [str(year) for year, room in zip(years, remaining_row) if room < 0]
@@ -0,0 +1,115 @@
+# dbm/snapshot.py
+import json
+import datetime
+from decimal import Decimal
+from .cra_report import CRAReportRow
+
+# Bump when the payload layout below changes; old snapshots are then ignored
+SNAPSHOT_FORMAT = 1
+
+# Tables whose edits invalidate every computed summary
+TRACKED_TABLES = ("Accounts", "Transactions", "NewRoomPerYear")
+
+def _snapshot_schema():
+    sql = """
+        CREATE TABLE IF NOT EXISTS ChangeCounter (
+          id integer PRIMARY KEY CHECK (id = 1),
+          Counter integer NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO ChangeCounter (id, Counter) VALUES (1, 0);
+
+        CREATE TABLE IF NOT EXISTS SummarySnapshot (
+          Name varchar(64) PRIMARY KEY,
+          SchemaVersion integer NOT NULL,
+          Fingerprint varchar(64) NOT NULL,
+          Payload text NOT NULL,
+          CreatedAt datetime NOT NULL
+        );
+    """
+    # Any writer (this app, another instance, a script) bumps the counter,
+    # so comparing it is an O(1) "has anything changed?" check.
+    for table in TRACKED_TABLES:
+        for op in ("INSERT", "UPDATE", "DELETE"):
+            sql += f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_{op.lower()}_counter AFTER {op} ON {table}
+        BEGIN
+          UPDATE ChangeCounter SET Counter = Counter + 1 WHERE id = 1;
+        END;"""
+    return sql
+
+def ensure_snapshot_schema(conn):
+    """Creates the counter, its triggers and the snapshot table if missing.
+
+    Returns False (and does nothing) if the file has no TFSAid tables yet.
+    """
+    placeholders = ", ".join("?" * len(TRACKED_TABLES))
+    found = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+                         TRACKED_TABLES).fetchone()[0]
+    if found < len(TRACKED_TABLES):
+        return False
+    conn.executescript(_snapshot_schema())
+    conn.commit()
+    return True
+
+def reset_snapshot(conn):
+    """After the data tables were recreated: restore triggers, forget old snapshots."""
+    if ensure_snapshot_schema(conn):
+        conn.execute("DELETE FROM SummarySnapshot")
+        conn.commit()
+
+def current_fingerprint(conn):
+    counter = conn.execute("SELECT Counter FROM ChangeCounter WHERE id = 1").fetchone()[0]
+    return f"{SNAPSHOT_FORMAT}:{counter}"
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+# --- (de)serializers for each cached artifact ---
+def _dump_cra(rows):
+    return [[r.kind, r.account, r.date, str(r.deposit), str(r.withdrawal), str(r.net)] for r in rows]
+
+def _load_cra(rows):
+    return [CRAReportRow(k, a, d, Decimal(dep), Decimal(wd), Decimal(net)) for k, a, d, dep, wd, net in rows]
+
+def _same(value):
+    return value
+
+ARTIFACTS = {
+    # cache key: (dump, load)
+    'annual_summary': (_same, _same),
+    'cra_subtotals': (_dump_cra, _load_cra),
+    'account_count': (_same, _same),
+}
+
+def load_snapshot(conn):
+    """Returns (entries, fresh).
+
+    entries maps cache keys to their stored values (possibly stale); fresh is
+    True only if every entry matches the current data fingerprint.
+    """
+    cursor = conn.execute("SELECT Name, Fingerprint, Payload FROM SummarySnapshot WHERE SchemaVersion = ?",
+                          (schema_version(conn),))
+    fingerprint = current_fingerprint(conn)
+    entries = {}
+    fresh = True
+    for name, stored_fingerprint, payload in cursor.fetchall():
+        if name not in ARTIFACTS or not stored_fingerprint.startswith(f"{SNAPSHOT_FORMAT}:"):
+            continue
+        entries[name] = ARTIFACTS[name][1](json.loads(payload))
+        fresh = fresh and stored_fingerprint == fingerprint
+    return entries, fresh and bool(entries)
+
+def save_snapshot(conn, cache, fingerprint):
+    """Stores the cached artifacts, stamped with schema version and the
+    fingerprint the data had when they were computed."""
+    version = schema_version(conn)
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    rows = [(name, version, fingerprint, json.dumps(dump(cache[name])), now)
+            for name, (dump, _) in ARTIFACTS.items() if name in cache]
+    if rows:
+        # Replace the whole snapshot so no entry from an older fingerprint survives
+        conn.execute("DELETE FROM SummarySnapshot")
+        conn.executemany("INSERT OR REPLACE INTO SummarySnapshot "
+                         "(Name, SchemaVersion, Fingerprint, Payload, CreatedAt) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    return len(rows)
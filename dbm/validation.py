@@ -0,0 +1,93 @@
+# dbm/validation.py
+"""Input rules shared by the entry forms and bulk importers.
+
+Everything works on whole columns: pass lists of raw strings, get back the
+parsed values plus one error list per row. An error is a (field, message)
+pair; a valid row has an empty list. Amounts are parsed straight to integer
+cents, never through float.
+"""
+import re
+
+TRANS_TYPES = ("Deposit", "Withdrawal")
+
+_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_YEAR_RE = re.compile(r"\d{4}")
+_AMOUNT_RE = re.compile(r"([+-]?)(\d*)(?:\.(\d*))?")
+
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+DATE_MESSAGE = "Date must be in YYYY-MM-DD format (e.g., 2025-01-01)."
+AMOUNT_EMPTY_MESSAGE = "Amount cannot be empty."
+AMOUNT_INVALID_MESSAGE = "Amount must be a valid number."
+AMOUNT_DECIMALS_MESSAGE = "Amount can have at most two decimal digits (e.g., 100.50)."
+AMOUNT_POSITIVE_MESSAGE = "Amount must be a positive number greater than zero."
+AMOUNT_NEGATIVE_MESSAGE = "Amount cannot be negative."
+TYPE_MESSAGE = "Transaction type must be Deposit or Withdrawal."
+YEAR_MESSAGE = "Year must be four digits (e.g., 2025)."
+
+def check_date(value):
+    """None if value is a real calendar date in YYYY-MM-DD form, else the message."""
+    m = _DATE_RE.fullmatch(value)
+    if not m:
+        return DATE_MESSAGE
+    year, month, day = int(m.group(1)), int(m.group(2)), int(m.group(3))
+    if not 1 <= month <= 12 or not 1 <= day <= _DAYS_IN_MONTH[month]:
+        return DATE_MESSAGE
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        return DATE_MESSAGE
+    return None
+
+def parse_cents(value, allow_zero=False):
+    """Returns (cents, None) or (None, message) for one amount string."""
+    value = value.strip()
+    if not value:
+        return None, AMOUNT_EMPTY_MESSAGE
+    m = _AMOUNT_RE.fullmatch(value)
+    if not m or not (m.group(2) or m.group(3)):
+        return None, AMOUNT_INVALID_MESSAGE
+    sign, whole, frac = m.group(1), m.group(2), m.group(3) or ""
+    if len(frac) > 2:
+        return None, AMOUNT_DECIMALS_MESSAGE
+    cents = int(whole or 0) * 100 + int(frac.ljust(2, "0"))
+    if sign == "-":
+        cents = -cents
+    if cents < 0 or (cents == 0 and not allow_zero):
+        return None, AMOUNT_NEGATIVE_MESSAGE if allow_zero else AMOUNT_POSITIVE_MESSAGE
+    return cents, None
+
+def validate_transactions(dates, types, amounts):
+    """Checks candidate transactions column by column.
+
+    Returns (cents, errors): cents[i] is row i's amount in cents (None if
+    invalid) and errors[i] its list of (field, message) pairs, with fields
+    'date', 'type' and 'amount'.
+    """
+    errors = [[] for _ in dates]
+    for i, value in enumerate(dates):
+        message = check_date(value.strip())
+        if message:
+            errors[i].append(('date', message))
+    for i, value in enumerate(types):
+        if value not in TRANS_TYPES:
+            errors[i].append(('type', TYPE_MESSAGE))
+    cents = []
+    for i, value in enumerate(amounts):
+        amount, message = parse_cents(value)
+        cents.append(amount)
+        if message:
+            errors[i].append(('amount', message))
+    return cents, errors
+
+def validate_room_years(years, amounts):
+    """Same for NewRoomPerYear rows; fields 'year' and 'amount'. Zero room is allowed."""
+    errors = [[] for _ in years]
+    for i, value in enumerate(years):
+        if not _YEAR_RE.fullmatch(value.strip()):
+            errors[i].append(('year', YEAR_MESSAGE))
+    cents = []
+    for i, value in enumerate(amounts):
+        amount, message = parse_cents(value, allow_zero=True)
+        cents.append(amount)
+        if message:
+            errors[i].append(('amount', message))
+    return cents, errors
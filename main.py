@@ -1,11 +1,22 @@
 # main.py
 import os
 import csv
+import time
+import sqlite3
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
 from dbm.database_manager import DatabaseManager
+from dbm.backup import RollingSnapshots, SNAPSHOT_INTERVAL_MINUTES, SNAPSHOT_KEEP
+from dbm.cra_report import write_csv, write_json
+from dbm.importer import read_statement, prepare_import
+from dbm.maintenance import MAINTENANCE_INTERVAL_MS, MAINTENANCE_IDLE_SECONDS
 from ui.main_window import MainWindowLayout
 from ui.menu_bar import AppMenuBar
+from ui.dialogs import BackupProgressDialog
+
+# Polling for commits from other TFSAid instances or scripts
+CHANGE_POLL_MS = 1000
+CHANGE_POLL_MAX_MS = 30 * 1000 # Backed off to this while the user is idle
 
 class TFSAid(tk.Tk):
     def __init__(self):
@@ -18,6 +29,10 @@ class TFSAid(tk.Tk):
 
         # 1. Initialize Logic
         self.db = DatabaseManager()
+        self.snapshots = None # RollingSnapshots while scheduled snapshots are on
+        self._snapshot_job = None
+        self._snapshot_worker = None
+        self.current_frame = None
 
         # 2. Setup Menu Bar
         self.menubar = AppMenuBar(self)
@@ -30,11 +45,13 @@ class TFSAid(tk.Tk):
         # a. Register the Frames
         from ui.frames import (WelcomeFrame, AccountsListFrame, TransactionsListFrame,
                               RoomYearsListFrame, NewAccountFrame, NewTransactionFrame,
-                              NewRoomYearFrame, AnnualSummaryFrame, CRAReportFrame) # Ensure this matches
+                              NewRoomYearFrame, AnnualSummaryFrame, CRAReportFrame,
+                              WhatIfFrame, PenaltyReportFrame, RecurringFrame) # Ensure this matches
         self.frames = {}
         frame_list = (WelcomeFrame, AccountsListFrame, TransactionsListFrame,
                       RoomYearsListFrame, NewAccountFrame, NewTransactionFrame,
-                      NewRoomYearFrame, AnnualSummaryFrame, CRAReportFrame)
+                      NewRoomYearFrame, AnnualSummaryFrame, CRAReportFrame,
+                      WhatIfFrame, PenaltyReportFrame, RecurringFrame)
 
         # Add all your frame classes to this tuple
         for F in frame_list:
@@ -46,11 +63,30 @@ class TFSAid(tk.Tk):
         # Initial State: Disable buttons until a file is opened
         self.update_ui_state()
 
+        # Closing the window saves the summary snapshot like File > Exit
+        self.protocol("WM_DELETE_WINDOW", self.exit_app)
+
+        # Database maintenance only runs once the user has been idle for a while
+        self._last_input = time.monotonic()
+        self.bind_all("<Key>", self._note_input, add="+")
+        self.bind_all("<Button>", self._note_input, add="+")
+        self.after(MAINTENANCE_INTERVAL_MS, self._maintenance_tick)
+
+        # Watch for commits made by other connections (PRAGMA data_version)
+        self._poll_ms = CHANGE_POLL_MS
+        self._poll_job = self.after(self._poll_ms, self._poll_external_changes)
+
     def show_frame(self, page_name):
+        # Navigating away stops any list that is still filling in
+        for other in self.frames.values():
+            if hasattr(other, "cancel_loading"):
+                other.cancel_loading()
+
         frame = self.frames[page_name]
         if hasattr(frame, "refresh"):
             frame.refresh() # This triggers the database fetch
         frame.tkraise()
+        self.current_frame = page_name
 
     def update_ui_state(self):
         """Logic to switch views based on connection status."""
@@ -109,11 +145,41 @@ class TFSAid(tk.Tk):
                 self.db.current_path = db_path # Keep track of path
                 self.update_ui_state()
                 self.show_frame("AccountsListFrame")
+                if self.db.archive_state == 'missing':
+                    messagebox.showwarning("Archive Not Found",
+                                           "The archive file of this database was not found next to it.\n"
+                                           "Totals still include archived years, but their individual "
+                                           "transactions are not listed.")
+                elif self.db.archive_state == 'foreign':
+                    messagebox.showwarning("Archive Not Used",
+                                           "The archive file next to this database belongs to another copy of it "
+                                           "and was left untouched.\n"
+                                           "Totals still include archived years, but their individual "
+                                           "transactions are not listed.")
+
+                # First paint used the saved snapshot; if the data moved on since,
+                # recompute once the window has been drawn.
+                if self.db.snapshot_stale:
+                    self.after_idle(self._refresh_stale_snapshot)
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open database: {e}")
 
+    def _refresh_stale_snapshot(self):
+        if not self.db.conn or not self.db.snapshot_stale:
+            return
+        self.db.refresh_snapshot()
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def exit_app(self):
+        """Closes the database (saving the summary snapshot) and quits."""
+        self.stop_rolling_snapshots()
+        self.db.close()
+        self.quit()
+
     def close_database(self):
         """Manually triggered from the Menu."""
+        self.stop_rolling_snapshots()
         self.db.close()
         self.update_ui_state() # This will now trigger the WelcomeFrame
         messagebox.showinfo("Database", "Database closed successfully.")
@@ -202,15 +268,24 @@ class TFSAid(tk.Tk):
     def prepare_edit_transaction(self, trans_id):
         # 1. Fetch the specific record
         trans_data = self.db.get_transaction_by_id(trans_id)
-        # 2. Fetch all accounts so the dropdown can be populated
-        accounts = self.db.get_accounts()
 
         if trans_data:
-            self.frames["NewTransactionFrame"].load_transaction_data(trans_id, trans_data, accounts)
+            # The form takes account names from the cached account directory
+            self.frames["NewTransactionFrame"].load_transaction_data(trans_id, trans_data)
             self.show_frame("NewTransactionFrame")
 
     def handle_save_transaction(self, trans_id, account_id, date, t_type, amount, notes):
         try:
+            # Over-contribution guard: checked against the room ledger before anything is written
+            if t_type == 'Deposit':
+                headroom = self.db.deposit_headroom(date, trans_id)
+                if amount > headroom and not messagebox.askyesno(
+                        "Over-contribution",
+                        f"This deposit exceeds the room available on {date} and after it "
+                        f"(${headroom:,.2f}) by ${amount - headroom:,.2f}.\n\n"
+                        "CRA charges 1% per month on the excess. Save anyway?"):
+                    return
+
             if trans_id:
                 self.db.update_transaction(trans_id, account_id, date, t_type, amount, notes)
             else:
@@ -221,14 +296,30 @@ class TFSAid(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", f"Save failed: {e}")
 
+    def handle_generate_recurring(self, through):
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            result = self.db.generate_recurring(through)
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not generate transactions: {e}")
+            return
+        finally:
+            self.config(cursor="")
+        messagebox.showinfo("Recurring Transactions",
+                            f"Booked {result['created']:,} transactions from {result['templates']} template(s).")
+        self.frames["RecurringFrame"].refresh()
+
     def export_cra_report_csv(self):
         if not self.db.conn:
             messagebox.showwarning("Warning", "Please open a database first.")
             return
 
+        year, date_range = self._cra_export_scope()
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
             filetypes=[("CSV Files", "*.csv")],
+            initialfile=f"CRA_Report_{year}.csv" if year else "",
             title="Export CRA Report (Semicolon Delimited)"
         )
 
@@ -236,63 +327,440 @@ class TFSAid(tk.Tk):
             return
 
         try:
-            data = self.db.get_cra_report_data()
+            rows = self.db.get_cra_report_rows(date_range)
             with open(file_path, mode='w', newline='', encoding='utf-8') as f:
-                # UPDATED: delimiter is now ';'
                 # AccountNameCRA will still be wrapped in double quotes for safety
                 writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-                # Write Header
-                writer.writerow(["CRA Account", "Date", "Deposit", "Withdrawal", "Net Change"])
-
-                current_account = None
-                acc_dep = 0.0
-                acc_wd = 0.0
-
-                for row in data:
-                    cra_name, date, t_type, amount, notes = row
-
-                    # Group Summary Logic
-                    if current_account is not None and cra_name != current_account:
-                        writer.writerow([
-                            f"TOTAL: {current_account}",
-                            "",
-                            f"{acc_dep:.2f}",
-                            f"{acc_wd:.2f}",
-                            f"{(acc_dep - acc_wd):.2f}"
-                        ])
-                        writer.writerow([]) # Spacer row
-                        acc_dep, acc_wd = 0.0, 0.0
-
-                    current_account = cra_name
-                    dep = amount if t_type == "Deposit" else 0.0
-                    wd = amount if t_type == "Withdrawal" else 0.0
-                    acc_dep += dep
-                    acc_wd += wd
-
-                    # Write individual transaction row
-                    writer.writerow([
-                        cra_name,
-                        date,
-                        f"{dep:.2f}" if dep else "",
-                        f"{wd:.2f}" if wd else "",
-                        ""
-                    ])
-
-                # Final Account Summary (last group in the loop)
-                if current_account:
-                    writer.writerow([
-                        f"TOTAL: {current_account}",
-                        "",
-                        f"{acc_dep:.2f}",
-                        f"{acc_wd:.2f}",
-                        f"{(acc_dep - acc_wd):.2f}"
-                    ])
+                write_csv(rows, writer)
 
             messagebox.showinfo("Export Successful", f"Report saved successfully using semicolon separators.")
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export CSV: {e}")
 
+    def export_cra_report_json(self):
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        year, date_range = self._cra_export_scope()
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON Files", "*.json")],
+            initialfile=f"CRA_Report_{year}.json" if year else "",
+            title="Export CRA Report (JSON)"
+        )
+
+        if not file_path:
+            return
+
+        try:
+            with open(file_path, mode='w', encoding='utf-8') as f:
+                write_json(self.db.get_cra_report_rows(date_range), f)
+            messagebox.showinfo("Export Successful", "Report saved successfully as JSON.")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to export JSON: {e}")
+
+    def _cra_export_scope(self):
+        """Exports cover the tax year picked on the CRA report page (all years by default)."""
+        selector = self.frames["CRAReportFrame"].year_selector
+        return selector.year, selector.date_range
+
+    # --- Backup / Save As (copies run on a background thread) ---
+    def save_database_as(self):
+        """Copies the open database to a new file and continues working on the copy."""
+        self._start_backup("Save Database As", switch_to_copy=True)
+
+    def backup_database(self):
+        """Copies the open database to a new file; the current file stays open."""
+        self._start_backup("Backup Database", switch_to_copy=False)
+
+    def _start_backup(self, title, switch_to_copy):
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        dest_path = filedialog.asksaveasfilename(
+            defaultextension=".db",
+            filetypes=[("SQLite DB", "*.db")],
+            title=title
+        )
+        if not dest_path:
+            return
+
+        source_path = self.db.current_path
+
+        def finished(worker):
+            if worker.error:
+                messagebox.showerror("Backup Error", f"Could not copy database: {worker.error}")
+                return
+            # Only switch if the user did not open another file in the meantime
+            if switch_to_copy and self.db.current_path == source_path:
+                self.stop_rolling_snapshots()
+                try:
+                    self.db.connect(dest_path)
+                except (sqlite3.Error, OSError) as e:
+                    # Keep working on the original rather than on no database at all
+                    message = f"The copy was written to:\n{dest_path}\n\nbut could not be opened: {e}"
+                    try:
+                        self.db.connect(source_path)
+                        message += f"\n\nStill working on:\n{source_path}"
+                    except (sqlite3.Error, OSError) as reopen_error:
+                        message += f"\n\nThe original could not be reopened either: {reopen_error}"
+                    self.update_ui_state()
+                    messagebox.showerror("Save As Error", message)
+                    return
+                self.update_ui_state()
+                messagebox.showinfo("Success", f"Database saved as:\n{dest_path}")
+            else:
+                messagebox.showinfo("Success", f"Backup written to:\n{dest_path}")
+
+        dialog = BackupProgressDialog(self, title, on_finished=finished)
+        try:
+            self.db.start_backup(dest_path, progress=dialog.report_progress, done=dialog.report_done)
+        except Exception as e:
+            dialog.destroy()
+            messagebox.showerror("Backup Error", f"Could not start backup: {e}")
+            return
+        dialog.follow()
+
+    def toggle_rolling_snapshots(self):
+        """Menu checkbutton: turns scheduled snapshots on or off."""
+        if not self.menubar.snapshots_var.get():
+            self.stop_rolling_snapshots()
+            return
+
+        if not self.db.conn:
+            self.menubar.snapshots_var.set(False)
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        minutes = simpledialog.askinteger("Rolling Snapshots", "Take a snapshot every N minutes:",
+                                          initialvalue=SNAPSHOT_INTERVAL_MINUTES, minvalue=1, parent=self)
+        keep = simpledialog.askinteger("Rolling Snapshots", "Number of snapshots to keep:",
+                                       initialvalue=SNAPSHOT_KEEP, minvalue=1, parent=self) if minutes else None
+        if not minutes or not keep:
+            self.menubar.snapshots_var.set(False)
+            return
+
+        self.snapshots = RollingSnapshots(self.db.current_path, keep=keep)
+        self._snapshot_interval_ms = minutes * 60 * 1000
+        self._take_snapshot()
+        messagebox.showinfo("Rolling Snapshots",
+                            f"Snapshots every {minutes} min, keeping the last {keep}, in:\n{self.snapshots.directory}")
+
+    def _take_snapshot(self):
+        self._snapshot_job = None
+        if not self.snapshots or self.db.current_path != self.snapshots.db_path:
+            self.stop_rolling_snapshots()
+            return
+
+        previous = self._snapshot_worker
+        if previous and previous.error:
+            self.stop_rolling_snapshots()
+            messagebox.showerror("Snapshot Error", f"Rolling snapshots stopped: {previous.error}")
+            return
+
+        # Skip this tick if the last snapshot is still copying
+        if previous is None or not previous.is_alive():
+            self._snapshot_worker = self.snapshots.take()
+
+        self._snapshot_job = self.after(self._snapshot_interval_ms, self._take_snapshot)
+
+    def stop_rolling_snapshots(self):
+        if self._snapshot_job:
+            self.after_cancel(self._snapshot_job)
+            self._snapshot_job = None
+        self.snapshots = None
+        self._snapshot_worker = None
+        self.menubar.snapshots_var.set(False)
+
+    def import_statement(self):
+        """Imports an OFX/QFX or bank CSV statement, skipping lines imported before."""
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Statements", "*.ofx *.qfx *.csv"), ("All Files", "*.*")],
+            title="Import Statement"
+        )
+        if not file_path:
+            return
+
+        account_number = None
+        if file_path.lower().endswith(".csv"):
+            account_number = simpledialog.askstring(
+                "Import Statement",
+                "Account number for rows without an Account column\n(leave blank if the file has one):",
+                parent=self)
+            if account_number is None:
+                return
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            rows, report = prepare_import(self.db.conn, read_statement(file_path, account_number), account_number)
+            self.db.import_transactions(rows)
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Failed to import statement: {e}")
+            return
+        finally:
+            self.config(cursor="")
+
+        lines = [f"Lines read: {report['read']:,}",
+                 f"Imported: {report['accepted']:,}",
+                 f"Already imported (skipped): {report['duplicates']:,}",
+                 f"Invalid (skipped): {report['invalid']:,}",
+                 f"Unknown account (skipped): {report['unknown_accounts']:,}"]
+        if report['unmatched']:
+            lines.append("\nNo account has Account Number: " + ", ".join(sorted(report['unmatched'])[:10]))
+        if report['errors']:
+            lines.append("\n" + "\n".join(report['errors'][:5]))
+        messagebox.showinfo("Import Statement", "\n".join(lines))
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def merge_database(self):
+        """Merges another TFSAid file (e.g. a colleague's copy) into the open one."""
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        file_path = filedialog.askopenfilename(
+            filetypes=[("SQLite Database", "*.db"), ("All Files", "*.*")],
+            title="Merge Database"
+        )
+        if not file_path:
+            return
+        if not messagebox.askyesno("Merge Database",
+                                   f"Copy the accounts, transactions and yearly room of\n{file_path}\n"
+                                   "into the open database?\n\nRows already present are skipped."):
+            return
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            report = self.db.merge_database(file_path)
+        except Exception as e:
+            messagebox.showerror("Merge Error", f"Failed to merge database: {e}")
+            return
+        finally:
+            self.config(cursor="")
+
+        lines = [f"Accounts matched: {report['accounts_matched']}",
+                 f"Accounts added: {report['accounts_added']}"
+                 + (f" ({report['accounts_renamed']} renamed with '(merged)')" if report['accounts_renamed'] else ""),
+                 f"Transactions added: {report['transactions_added']:,}",
+                 f"Transactions already present: {report['transactions_duplicate']:,}",
+                 f"Room years added: {report['room_years_added']}"]
+        if report['room_conflicts']:
+            lines.append("\nRoom kept for years that differ (this file / other file):")
+            lines += [f"  {day[:4]}: {mine} / {theirs}" for day, mine, theirs in report['room_conflicts']]
+        messagebox.showinfo("Merge Database", "\n".join(lines))
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def export_penalty_report_csv(self):
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv")],
+            title="Export Penalty Report (Semicolon Delimited)"
+        )
+
+        if not file_path:
+            return
+
+        try:
+            months, years = self.db.get_penalty_report()
+            with open(file_path, mode='w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                writer.writerow(["Month", "Highest Excess", "Penalty"])
+
+                for row in months:
+                    if row['highest_excess'] > 0:
+                        writer.writerow([row['month'], f"{row['highest_excess']:.2f}", f"{row['penalty']:.2f}"])
+
+                writer.writerow([]) # Spacer row
+                writer.writerow(["Year", "Months in Excess", "Highest Excess", "Penalty"])
+                for row in years:
+                    writer.writerow([row['year'], row['months_in_excess'],
+                                     f"{row['highest_excess']:.2f}", f"{row['penalty']:.2f}"])
+
+            messagebox.showinfo("Export Successful", "Penalty report saved successfully.")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to export CSV: {e}")
+
+    def toggle_memory_replica(self):
+        """Menu checkbutton: serve reports from an in-memory copy of the database."""
+        try:
+            self.db.set_replica_enabled(self.menubar.replica_var.get())
+        except Exception as e:
+            self.menubar.replica_var.set(False)
+            messagebox.showerror("Error", f"Could not create in-memory replica: {e}")
+
+    # --- External change detection ---
+    def _poll_external_changes(self):
+        try:
+            changed = self.db.check_external_change()
+        except Exception:
+            changed = False
+
+        if changed:
+            self._poll_ms = CHANGE_POLL_MS
+            frame = self.frames.get(self.current_frame)
+            # Only lists and reports reload; forms keep what the user typed
+            if frame is not None and hasattr(frame, "refresh_external"):
+                frame.refresh_external()
+        elif time.monotonic() - self._last_input >= MAINTENANCE_IDLE_SECONDS:
+            self._poll_ms = min(self._poll_ms * 2, CHANGE_POLL_MAX_MS)
+
+        self._poll_job = self.after(self._poll_ms, self._poll_external_changes)
+
+    # --- Database maintenance ---
+    def _note_input(self, event=None):
+        self._last_input = time.monotonic()
+        # Back to quick polling as soon as the user is active again
+        if self._poll_ms != CHANGE_POLL_MS:
+            self._poll_ms = CHANGE_POLL_MS
+            self.after_cancel(self._poll_job)
+            self._poll_job = self.after(self._poll_ms, self._poll_external_changes)
+
+    def _maintenance_tick(self):
+        idle = time.monotonic() - self._last_input >= MAINTENANCE_IDLE_SECONDS
+        if self.db.conn and idle:
+            try:
+                self.db.run_maintenance()
+            except Exception:
+                pass # Maintenance is best-effort; try again next tick
+        self.after(MAINTENANCE_INTERVAL_MS, self._maintenance_tick)
+
+    def compact_database(self):
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+        msg = ("Compacting rewrites the whole database file and may take a while "
+               "for large files.\n\nContinue?")
+        if not messagebox.askyesno("Compact Database", msg):
+            return
+        try:
+            report = self.db.compact_database()
+            messagebox.showinfo("Compact Database",
+                                f"Reclaimed {report['bytes_reclaimed'] / 1024:,.0f} KB "
+                                f"in {report['seconds']:.2f} s.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not compact database: {e}")
+
+    def close_tax_years(self):
+        """Freezes the totals and carryover of filed years (Annual Summary stops recomputing them)."""
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+        closed = self.db.get_closed_years()
+        year = simpledialog.askinteger("Close Tax Years", "Close every tax year up to and including:",
+                                       initialvalue=time.localtime().tm_year - 1, parent=self)
+        if year is None:
+            return
+        if closed and year <= closed[-1][0]:
+            messagebox.showinfo("Close Tax Years", f"Years up to {closed[-1][0]} are already closed.")
+            return
+        try:
+            years = self.db.close_years_through(year)
+        except Exception as e:
+            messagebox.showerror("Close Tax Years", f"Could not close the years: {e}")
+            return
+        if years:
+            messagebox.showinfo("Close Tax Years", f"Closed {years[0]}–{years[-1]}." if len(years) > 1
+                                else f"Closed {years[0]}.")
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def reopen_tax_years(self):
+        """Unfreezes closed years, e.g. after a late correction to a filed year."""
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+        closed = self.db.get_closed_years()
+        if not closed:
+            messagebox.showinfo("Reopen Tax Years", "No tax year is closed.")
+            return
+        edited = [int(row['year']) for row in self.db.get_annual_summary_data() if row.get('edited')]
+        year = simpledialog.askinteger("Reopen Tax Years", "Reopen every closed year from:",
+                                       initialvalue=edited[0] if edited else closed[-1][0],
+                                       minvalue=closed[0][0], maxvalue=closed[-1][0], parent=self)
+        if year is None:
+            return
+        try:
+            count = self.db.reopen_years_from(year)
+        except Exception as e:
+            messagebox.showerror("Reopen Tax Years", f"Could not reopen the years: {e}")
+            return
+        messagebox.showinfo("Reopen Tax Years", f"Reopened {count} year(s).")
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def archive_closed_years(self):
+        """Moves the transactions of old, closed years to the archive file."""
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+        years = self.db.get_transaction_years()
+        if not years:
+            messagebox.showinfo("Archive Closed Years", "There are no transactions to archive.")
+            return
+        last_closed = time.localtime().tm_year - 2
+        year = simpledialog.askinteger("Archive Closed Years",
+                                       "Archive all transactions up to and including year:",
+                                       initialvalue=min(last_closed, years[0]), parent=self)
+        if year is None:
+            return
+        if not messagebox.askyesno("Archive Closed Years",
+                                   f"Move every transaction dated {year} or earlier to the archive file?\n\n"
+                                   "Reports and totals are unchanged; archived transactions are "
+                                   "listed but can no longer be edited."):
+            return
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            result = self.db.archive_through(year)
+        except Exception as e:
+            messagebox.showerror("Archive Error", f"Failed to archive transactions: {e}")
+            return
+        finally:
+            self.config(cursor="")
+        messagebox.showinfo("Archive Closed Years",
+                            f"Moved {result['moved']:,} transactions to\n{result['path']}\n\n"
+                            f"Archived through: {result['through']}")
+        if self.current_frame:
+            self.show_frame(self.current_frame)
+
+    def show_maintenance_report(self):
+        if not self.db.conn:
+            messagebox.showwarning("Warning", "Please open a database first.")
+            return
+        st = self.db.maintenance.status()
+        messagebox.showinfo("Maintenance Report", (
+            f"Auto-vacuum mode: {st['auto_vacuum']}\n"
+            f"File size: {st['file_bytes'] / 1024:,.0f} KB ({st['free_pages']:,} free pages)\n\n"
+            f"Maintenance runs this session: {st['runs']}\n"
+            f"Statistics refreshed (ANALYZE): {st['analyzes']}\n"
+            f"Space reclaimed: {st['bytes_reclaimed'] / 1024:,.0f} KB ({st['pages_freed']:,} pages)\n"
+            f"Time spent: {st['seconds']:.2f} s"
+        ))
+
+    def confirm_delete_recurring(self, recurring_id, account, amount):
+        if messagebox.askyesno("Confirm Delete", f"Delete the recurring {amount} template of {account}?\n\n"
+                                                 "Transactions it already booked are kept."):
+            try:
+                self.db.delete_recurring(recurring_id)
+                self.frames["RecurringFrame"].refresh()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to delete: {e}")
+
     def confirm_delete_room_year(self, room_id, year):
         if messagebox.askyesno("Confirm Delete", f"Delete the contribution limit for {year}?"):
             try:
@@ -1,11 +1,17 @@
 DROP TABLE IF EXISTS NewRoomPerYear;
 DROP TABLE IF EXISTS Accounts;
 DROP TABLE IF EXISTS Transactions;
+DROP TABLE IF EXISTS ImportFingerprint;
+DROP TABLE IF EXISTS ArchivedYearTotals;
+DROP TABLE IF EXISTS ArchiveInfo;
+DROP TABLE IF EXISTS FrozenYear;
+DROP TABLE IF EXISTS RecurringTransaction;
 
 CREATE TABLE NewRoomPerYear (
   id integer PRIMARY KEY,
   YearFirstDay date UNIQUE NOT NULL,
-  NewRoom decimal(20, 2) NOT NULL DEFAULT 0
+  NewRoom decimal(20, 2) NOT NULL DEFAULT 0,
+  RoomYear integer GENERATED ALWAYS AS (CAST(substr(YearFirstDay, 1, 4) AS integer)) STORED
 );
 
 CREATE TABLE Accounts (
@@ -27,6 +33,56 @@ CREATE TABLE Transactions (
   TransType varchar(32) CHECK( TransType IN ('Deposit', 'Withdrawal') ) NOT NULL DEFAULT 'Deposit',
   Amount decimal(20, 2) NOT NULL DEFAULT 0,
   Notes varchar(512),
+  TransYear integer GENERATED ALWAYS AS (CAST(substr(TransDate, 1, 4) AS integer)) STORED,
+  FOREIGN KEY (Account_id) REFERENCES Accounts(id)
+);
+
+-- 64-bit hash of (account, date, amount, memo, occurrence) per imported line
+CREATE TABLE ImportFingerprint (
+  Hash integer PRIMARY KEY
+);
+
+-- Per-account yearly totals of transactions moved to the archive file
+CREATE TABLE ArchivedYearTotals (
+  Account_id integer NOT NULL,
+  Year integer NOT NULL,
+  DepositCents integer NOT NULL DEFAULT 0,
+  WithdrawalCents integer NOT NULL DEFAULT 0,
+  Rows integer NOT NULL DEFAULT 0,
+  PRIMARY KEY (Account_id, Year)
+);
+
+CREATE TABLE ArchiveInfo (
+  id integer PRIMARY KEY CHECK (id = 1),
+  Path varchar(512) NOT NULL,
+  ThroughYear integer NOT NULL,
+  Batch integer NOT NULL DEFAULT 0,
+  ArchiveId varchar(32)
+);
+
+-- Closed tax years: totals and room carried into the next year, in cents
+CREATE TABLE FrozenYear (
+  Year integer PRIMARY KEY,
+  NewRoomCents integer NOT NULL,
+  DepositCents integer NOT NULL,
+  WithdrawalCents integer NOT NULL,
+  CarryoverCents integer NOT NULL,
+  Checksum integer NOT NULL,
+  Dirty integer NOT NULL DEFAULT 0,
+  FrozenAt datetime NOT NULL
+);
+
+-- Recurring transaction templates; NextIndex is the next occurrence to generate
+CREATE TABLE RecurringTransaction (
+  id integer PRIMARY KEY,
+  Account_id integer NOT NULL,
+  TransType varchar(32) CHECK( TransType IN ('Deposit', 'Withdrawal') ) NOT NULL DEFAULT 'Deposit',
+  Amount decimal(20, 2) NOT NULL,
+  Cadence varchar(16) CHECK( Cadence IN ('weekly', 'biweekly', 'monthly', 'quarterly', 'annually') ) NOT NULL,
+  StartDate date NOT NULL,
+  EndDate date,
+  Notes varchar(512),
+  NextIndex integer NOT NULL DEFAULT 0,
   FOREIGN KEY (Account_id) REFERENCES Accounts(id)
 );
 
@@ -36,4 +92,45 @@ CREATE INDEX ACCTNAMECRA ON Accounts (AccountNameCRA);
 
 CREATE INDEX ACCT ON Transactions (Account_id);
 
-CREATE INDEX TRANSTYPE ON Transactions (TransType);
\ No newline at end of file
+CREATE INDEX TRANSTYPE ON Transactions (TransType);
+
+CREATE INDEX TRANSYEAR ON Transactions (TransYear, TransType, Amount);
+
+CREATE INDEX TRANSDATE ON Transactions (TransDate);
+
+CREATE INDEX ROOMYEAR ON NewRoomPerYear (RoomYear, NewRoom);
+
+-- A write to a closed year flags it for a checksum check
+CREATE TRIGGER Transactions_insert_frozen AFTER INSERT ON Transactions
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(NEW.TransDate, 1, 4) AS integer));
+END;
+
+CREATE TRIGGER Transactions_update_frozen AFTER UPDATE ON Transactions
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(OLD.TransDate, 1, 4) AS integer),
+                                                 CAST(substr(NEW.TransDate, 1, 4) AS integer));
+END;
+
+CREATE TRIGGER Transactions_delete_frozen AFTER DELETE ON Transactions
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(OLD.TransDate, 1, 4) AS integer));
+END;
+
+CREATE TRIGGER NewRoomPerYear_insert_frozen AFTER INSERT ON NewRoomPerYear
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(NEW.YearFirstDay, 1, 4) AS integer));
+END;
+
+CREATE TRIGGER NewRoomPerYear_update_frozen AFTER UPDATE ON NewRoomPerYear
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(OLD.YearFirstDay, 1, 4) AS integer),
+                                                 CAST(substr(NEW.YearFirstDay, 1, 4) AS integer));
+END;
+
+CREATE TRIGGER NewRoomPerYear_delete_frozen AFTER DELETE ON NewRoomPerYear
+BEGIN
+  UPDATE FrozenYear SET Dirty = 1 WHERE Year IN (CAST(substr(OLD.YearFirstDay, 1, 4) AS integer));
+END;
+
+PRAGMA user_version = 6;
\ No newline at end of file
@@ -0,0 +1,65 @@
+# ui/dialogs.py
+import queue
+import tkinter as tk
+from tkinter import ttk
+
+class BackupProgressDialog(tk.Toplevel):
+    """Small non-modal window that follows a BackupWorker.
+
+    The worker reports progress from its own thread, so values are passed
+    through a queue and picked up here with after() on the Tk thread.
+    """
+    POLL_MS = 100
+
+    def __init__(self, parent, title, on_finished=None):
+        super().__init__(parent, bg='white')
+        self.title(title)
+        self.resizable(False, False)
+        self.transient(parent)
+        self.on_finished = on_finished
+        self.events = queue.Queue()
+
+        container = tk.Frame(self, bg='white', padx=20, pady=15)
+        container.pack(fill="both", expand=True)
+
+        self.status_label = tk.Label(container, text="Starting backup...", bg='white', anchor='w')
+        self.status_label.pack(fill='x', pady=(0, 10))
+
+        self.progress = ttk.Progressbar(container, length=320, mode='determinate')
+        self.progress.pack(fill='x')
+
+        # Closing the window only hides the progress; the copy keeps running
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    # --- Called from the worker thread ---
+    def report_progress(self, done_pages, total_pages):
+        self.events.put(("progress", done_pages, total_pages))
+
+    def report_done(self, worker):
+        self.events.put(("done", worker))
+
+    # --- Tk thread ---
+    def follow(self):
+        self.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        finished = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "progress":
+                _, done_pages, total_pages = event
+                self.progress.config(maximum=max(total_pages, 1), value=done_pages)
+                self.status_label.config(text=f"Copied {done_pages:,} of {total_pages:,} pages")
+            else:
+                finished = event[1]
+
+        if finished is None:
+            self.after(self.POLL_MS, self._poll)
+            return
+
+        self.destroy()
+        if self.on_finished:
+            self.on_finished(finished)
@@ -3,6 +3,53 @@ import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox
 from .styles import ROW_COLOR_LIGHT, ROW_COLOR_DARK # Import your colors
+from .tree_loader import ProgressiveTreeLoader
+from dbm.simulator import ContributionSimulator, parse_scenarios
+from dbm.cra_report import year_range
+from dbm.validation import validate_transactions, validate_room_years, check_date, parse_cents
+from dbm.recurring import CADENCES
+from dbm.forecast import FORECAST_YEARS, DEFAULT_INFLATION
+from dbm.archive import ArchiveUnavailable
+
+ARCHIVED_ACTION = "Archived" # Actions cell of rows that live in the archive file
+
+def refresh_keeping_scroll(frame):
+    """Reloads a frame's tree after an outside change without jumping to the top."""
+    top = frame.tree.yview()[0]
+    frame.refresh()
+    frame.tree.yview_moveto(top)
+
+class YearSelector(tk.Frame):
+    """'Tax year: [All years / 2024 / 2023 ...]' picker shared by the list views."""
+    ALL = "All years"
+
+    def __init__(self, parent, controller, on_change):
+        super().__init__(parent, bg='white')
+        self.controller = controller
+        self.on_change = on_change
+
+        tk.Label(self, text="Tax year:", bg='white').pack(side="left", padx=(0, 5))
+        self.combo = ttk.Combobox(self, state="readonly", width=12, values=(self.ALL,))
+        self.combo.set(self.ALL)
+        self.combo.pack(side="left")
+        self.combo.bind("<<ComboboxSelected>>", lambda e: self.on_change())
+
+    def reload_years(self):
+        """Refills the list from the open database, keeping the choice if it still exists."""
+        years = [str(y) for y in self.controller.db.get_transaction_years()]
+        self.combo['values'] = [self.ALL] + years
+        if self.combo.get() not in years:
+            self.combo.set(self.ALL)
+
+    @property
+    def year(self):
+        value = self.combo.get()
+        return None if value == self.ALL else int(value)
+
+    @property
+    def date_range(self):
+        """Inclusive date range for the DatabaseManager queries; None means all history."""
+        return None if self.year is None else year_range(self.year)
 
 class WelcomeFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -65,7 +112,10 @@ class AccountsListFrame(tk.Frame):
             font=('Arial', 18, 'bold'),
             bg='white',
             fg='#333333'
-        ).pack(pady=(0, 15))
+        ).pack(pady=(0, 5))
+
+        self.loading_label = tk.Label(container, text="", font=('Arial', 10, 'italic'), bg='white', fg='#666666')
+        self.loading_label.pack(pady=(0, 10))
 
         self.columns = ("ID", "Account Name", "Account Name in CRA", "Type", "Institution", "Account Number", "Opening Date", "Actions")
         self.tree = ttk.Treeview(container, columns=self.columns, show='headings', height=20)
@@ -104,6 +154,8 @@ class AccountsListFrame(tk.Frame):
         # Interaction
         self.tree.bind("<Button-1>", self._on_click)
 
+        self.loader = ProgressiveTreeLoader(self.tree, self.loading_label)
+
     def _on_click(self, event):
         region = self.tree.identify_region(event.x, event.y)
         if region == "cell":
@@ -128,24 +180,31 @@ class AccountsListFrame(tk.Frame):
                     # Clicked right half (Delete)
                     self.controller.confirm_delete_account(acc_id, acc_name)
 
-    def refresh(self):
+    def refresh(self, keep=None):
         """Clears the current list and re-populates it from the database."""
-        # 1. FIX: Clear ALL existing items in the Treeview first
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        # Clears the Treeview and stops any load still in progress
+        self.loader.cancel()
+        self.tree.delete(*self.tree.get_children())
 
-        # 2. FIX: Only use ONE loop and ensure there is an active connection
         if self.controller.db.conn:
-            accounts = self.controller.db.get_accounts()
+            db = self.controller.db
+            self.loader.start(db.get_accounts_cursor(), self._format_row, total=db.count_accounts(), keep=keep)
 
-            for i, row in enumerate(accounts):
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+    def cancel_loading(self):
+        self.loader.cancel()
+
+    def refresh_external(self):
+        # Refilled progressively, keeping the first visible row and the selection
+        self.refresh(keep=self.loader.view_state())
 
-                # 3. FIX: Create a unified 'Edit | Delete' action for every row
-                # row[0] is the ID, row[1] is the Account Name, etc.
-                display_row = list(row) + ["Edit | Delete"]
+    @staticmethod
+    def _format_row(i, row):
+        tag = 'evenrow' if i % 2 == 0 else 'oddrow'
 
-                self.tree.insert('', tk.END, values=display_row, tags=(tag,))
+        # Create a unified 'Edit | Delete' action for every row
+        # row[0] is the ID, row[1] is the Account Name, etc.
+        display_row = list(row) + ["Edit | Delete"]
+        return display_row, (tag,)
 
 class NewAccountFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -316,7 +375,13 @@ class TransactionsListFrame(tk.Frame):
             font=('Arial', 18, 'bold'),
             bg='white',
             fg='#333333'
-        ).pack(pady=(0, 15))
+        ).pack(pady=(0, 5))
+
+        self.year_selector = YearSelector(container, self.controller, self.refresh)
+        self.year_selector.pack(pady=(0, 5))
+
+        self.loading_label = tk.Label(container, text="", font=('Arial', 10, 'italic'), bg='white', fg='#666666')
+        self.loading_label.pack(pady=(0, 10))
 
         # Define columns (ID is hidden)
         self.columns = ("ID", "Account", "Date", "Deposit", "Withdrawal", "Notes", "Actions")
@@ -355,6 +420,8 @@ class TransactionsListFrame(tk.Frame):
         # Interaction
         self.tree.bind("<Button-1>", self._on_click)
 
+        self.loader = ProgressiveTreeLoader(self.tree, self.loading_label)
+
     def _on_click(self, event):
         """Identifies if Edit or Delete was clicked based on cell horizontal position."""
         region = self.tree.identify_region(event.x, event.y)
@@ -367,7 +434,7 @@ class TransactionsListFrame(tk.Frame):
                 return
 
             # Verify we are clicking in the 'Actions' column
-            if self.tree.heading(column, "text") == "Actions":
+            if self.tree.heading(column, "text") == "Actions" and values[6] != ARCHIVED_ACTION:
                 # Get the cell's bounding box: (x, y, width, height)
                 bbox = self.tree.bbox(item_id, column)
                 if not bbox:
@@ -388,23 +455,39 @@ class TransactionsListFrame(tk.Frame):
                 else:
                     self.controller.confirm_delete_transaction(trans_id, date, amount)
 
-    def refresh(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+    def refresh(self, keep=None):
+        self.loader.cancel()
+        self.tree.delete(*self.tree.get_children())
 
         if self.controller.db.conn:
-            transactions = self.controller.db.get_transactions()
-            for i, row in enumerate(transactions):
-                t_id, name, date, t_type, amount, notes = row
+            db = self.controller.db
+            self.year_selector.reload_years()
+            date_range = self.year_selector.date_range
+            try:
+                cursor = db.get_transactions_cursor(date_range)
+            except ArchiveUnavailable as e:
+                self.loading_label.config(text=f"⚠️ {e}")
+                return
+            self.loader.start(cursor, self._format_row, total=db.count_transactions(date_range), keep=keep)
 
-                dep = f"{amount:.2f}" if t_type == 'Deposit' else ""
-                wd = f"{amount:.2f}" if t_type == 'Withdrawal' else ""
-                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+    def cancel_loading(self):
+        self.loader.cancel()
 
-                # Ensure "Edit | Delete" is the 7th value (index 6)
-                self.tree.insert('', tk.END,
-                                 values=(t_id, name, date, dep, wd, notes, "Edit | Delete"),
-                                 tags=(tag,))
+    def refresh_external(self):
+        # Refilled progressively, keeping the first visible row and the selection
+        self.refresh(keep=self.loader.view_state())
+
+    @staticmethod
+    def _format_row(i, row):
+        t_id, name, date, t_type, amount, notes = row
+
+        dep = f"{amount:.2f}" if t_type == 'Deposit' else ""
+        wd = f"{amount:.2f}" if t_type == 'Withdrawal' else ""
+        tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+
+        # Ensure "Edit | Delete" is the 7th value (index 6); archived rows have negative ids
+        action = ARCHIVED_ACTION if t_id < 0 else "Edit | Delete"
+        return (t_id, name, date, dep, wd, notes, action), (tag,)
 
 class NewTransactionFrame(tk.Frame):
     def __init__(self, parent, controller):
@@ -412,7 +495,7 @@ class NewTransactionFrame(tk.Frame):
         self.controller = controller
         self.edit_id = None
         self._is_loading_edit = False
-        self.account_map = {} # To map Name -> ID for the combobox
+        self.directory = None # AccountDirectory: name <-> id and type-ahead
         self._setup_ui()
 
     def _setup_ui(self):
@@ -424,9 +507,11 @@ class NewTransactionFrame(tk.Frame):
         self.lbl_title.grid(row=0, column=0, columnspan=2, pady=(0, 20))
 
         # 1. Account Dropdown
+        # Type the start of a name to narrow the list
         tk.Label(container, text="Select Account:", bg='white').grid(row=1, column=0, sticky="w", pady=5)
-        self.combo_account = ttk.Combobox(container, state="readonly")
+        self.combo_account = ttk.Combobox(container)
         self.combo_account.grid(row=1, column=1, sticky="ew", padx=10)
+        self.combo_account.bind("<KeyRelease>", self._filter_accounts)
 
         # 2. Date
         tk.Label(container, text="Date (YYYY-MM-DD):", bg='white').grid(row=2, column=0, sticky="w", pady=5)
@@ -441,48 +526,69 @@ class NewTransactionFrame(tk.Frame):
         radio_frame.grid(row=3, column=1, sticky="w", padx=10)
 
         tk.Radiobutton(radio_frame, text="Deposit", variable=self.trans_type_var,
-                       value="Deposit", bg='white').pack(side="left")
+                       value="Deposit", bg='white', command=self._update_room_hint).pack(side="left")
         tk.Radiobutton(radio_frame, text="Withdrawal", variable=self.trans_type_var,
-                       value="Withdrawal", bg='white').pack(side="left", padx=15)
+                       value="Withdrawal", bg='white', command=self._update_room_hint).pack(side="left", padx=15)
 
         # 4. Amount
         tk.Label(container, text="Amount:", bg='white').grid(row=4, column=0, sticky="w", pady=5)
         self.entry_amount = ttk.Entry(container)
         self.entry_amount.grid(row=4, column=1, sticky="ew", padx=10)
 
+        # Live room check for deposits, updated as the date and amount are typed
+        self.room_hint = tk.Label(container, text="", bg='white', font=('Arial', 9, 'italic'))
+        self.room_hint.grid(row=5, column=1, sticky="w", padx=10)
+        self.entry_trans_date.bind("<KeyRelease>", self._update_room_hint, add="+")
+        self.entry_amount.bind("<KeyRelease>", self._update_room_hint, add="+")
+
         # 5. Notes
-        tk.Label(container, text="Notes:", bg='white').grid(row=5, column=0, sticky="nw", pady=5)
+        tk.Label(container, text="Notes:", bg='white').grid(row=6, column=0, sticky="nw", pady=5)
         self.text_trans_notes = tk.Text(container, width=40, height=4)
-        self.text_trans_notes.grid(row=5, column=1, sticky="ew", padx=10)
+        self.text_trans_notes.grid(row=6, column=1, sticky="ew", padx=10)
 
         self.save_btn = ttk.Button(container, text="Save Transaction", command=self.save)
-        self.save_btn.grid(row=6, column=1, sticky="e", pady=20, padx=10)
+        self.save_btn.grid(row=7, column=1, sticky="e", pady=20, padx=10)
 
     def refresh(self):
         if self._is_loading_edit:
             self._is_loading_edit = False
             return
         self.clear_form()
-        # Populate account dropdown
-        accounts = self.controller.db.get_accounts()
-        self.account_map = {acc[1]: acc[0] for acc in accounts}
-        self.combo_account['values'] = list(self.account_map.keys())
+        self._load_directory()
+
+    def _load_directory(self):
+        # Cached by DatabaseManager until an account is added, renamed or deleted
+        self.directory = self.controller.db.get_account_directory()
+        self.combo_account['values'] = self.directory.matching("")
 
-    def load_transaction_data(self, trans_id, data, accounts):
+    def _filter_accounts(self, event):
+        if self.directory is None or event.keysym in ("Up", "Down", "Return", "Tab", "Escape"):
+            return
+        self.combo_account['values'] = self.directory.matching(self.combo_account.get())
+
+    def _update_room_hint(self, event=None):
+        """Shows the room left for a deposit on the typed date (a few bisects, no query)."""
+        date = self.entry_trans_date.get().strip()
+        if self.trans_type_var.get() != "Deposit" or check_date(date) or not self.controller.db.conn:
+            self.room_hint.config(text="")
+            return
+        headroom = self.controller.db.deposit_headroom(date, self.edit_id)
+        cents, _ = parse_cents(self.entry_amount.get())
+        if cents is not None and cents / 100 > headroom:
+            self.room_hint.config(text=f"⚠️ Exceeds available room (${headroom:,.2f}) by ${cents / 100 - headroom:,.2f}",
+                                  fg="red")
+        else:
+            self.room_hint.config(text=f"Room available for this deposit: ${headroom:,.2f}", fg="gray")
+
+    def load_transaction_data(self, trans_id, data):
         """Pre-fills form for editing and sets the edit flag."""
         self.clear_form()
         self.edit_id = trans_id
         self._is_loading_edit = True # Prevents refresh() from clearing the form immediately
 
         # data: (id, Account_id, TransDate, TransType, Amount, Notes)
-        self.account_map = {acc[1]: acc[0] for acc in accounts}
-        self.combo_account['values'] = list(self.account_map.keys())
-
-        # Select Account
-        for name, acc_id in self.account_map.items():
-            if acc_id == data[1]:
-                self.combo_account.set(name)
-                break
+        self._load_directory()
+        self.combo_account.set(self.directory.id_to_name.get(data[1], ''))
 
         self.entry_trans_date.insert(0, data[2])
         self.trans_type_var.set(data[3]) # Updates Radio Buttons
@@ -491,6 +597,7 @@ class NewTransactionFrame(tk.Frame):
 
         self.lbl_title.config(text="Edit Transaction")
         self.save_btn.config(text="Update Transaction")
+        self._update_room_hint()
 
     def clear_form(self):
         self.edit_id = None
@@ -501,57 +608,32 @@ class NewTransactionFrame(tk.Frame):
         self.trans_type_var.set("Deposit")
         self.entry_amount.delete(0, tk.END)
         self.text_trans_notes.delete("1.0", tk.END)
+        self.room_hint.config(text="")
 
     def save(self):
         # 1. Validate Account Selection
         acc_name = self.combo_account.get()
-        if not acc_name:
+        acc_id = self.directory.name_to_id.get(acc_name) if self.directory else None
+        if acc_id is None:
             messagebox.showwarning("Input Error", "Please select an account.")
             self.combo_account.focus_set()
             return
 
-        # 2. Date Validation (Format: YYYY-MM-DD)
+        # 2. Date and amount, by the same rules the importers use
         date_str = self.entry_trans_date.get().strip()
-        try:
-            datetime.datetime.strptime(date_str, '%Y-%m-%d')
-        except ValueError:
-            messagebox.showwarning("Input Error", "Date must be in YYYY-MM-DD format (e.g., 2025-01-01).")
-            self.entry_trans_date.focus_set()
+        cents, errors = validate_transactions([date_str], [self.trans_type_var.get()],
+                                              [self.entry_amount.get()])
+        if errors[0]:
+            field, message = errors[0][0]
+            messagebox.showwarning("Input Error", message)
+            {'date': self.entry_trans_date, 'amount': self.entry_amount}.get(field, self.entry_amount).focus_set()
             return
+        amount_val = cents[0] / 100
 
-        # 3. Amount Validation
-        amount_str = self.entry_amount.get().strip()
-        if not amount_str:
-            messagebox.showwarning("Input Error", "Amount cannot be empty.")
-            self.entry_amount.focus_set()
-            return
-
-        try:
-            amount_val = float(amount_str)
-
-            # Rule: Cannot be 0 or negative
-            if amount_val <= 0:
-                messagebox.showwarning("Input Error", "Amount must be a positive number greater than zero.")
-                self.entry_amount.focus_set()
-                return
-
-            # Rule: At most two decimal digits
-            if '.' in amount_str:
-                decimals = amount_str.split('.')[-1]
-                if len(decimals) > 2:
-                    messagebox.showwarning("Input Error", "Amount can have at most two decimal digits (e.g., 100.50).")
-                    self.entry_amount.focus_set()
-                    return
-
-        except ValueError:
-            messagebox.showwarning("Input Error", "Amount must be a valid number.")
-            self.entry_amount.focus_set()
-            return
-
-        # 4. Proceed to Save if all checks pass
+        # 3. Proceed to Save if all checks pass
         self.controller.handle_save_transaction(
             self.edit_id,
-            self.account_map[acc_name],
+            acc_id,
             date_str,
             self.trans_type_var.get(),
             amount_val,
@@ -638,6 +720,9 @@ class RoomYearsListFrame(tk.Frame):
                     "Delete"
                 ), tags=(tag,))
 
+    def refresh_external(self):
+        refresh_keeping_scroll(self)
+
 class NewRoomYearFrame(tk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent, bg='white')
@@ -673,10 +758,15 @@ class NewRoomYearFrame(tk.Frame):
             messagebox.showwarning("Input Error", "Both fields are required.")
             return
 
+        cents, errors = validate_room_years([year], [amount])
+        if errors[0]:
+            messagebox.showwarning("Input Error", errors[0][0][1])
+            return
+
         try:
             # Prepare date as first day of the year for DB consistency
             db_date = f"{year}-01-01"
-            amount_val = float(amount)
+            amount_val = cents[0] / 100
 
             self.controller.db.save_room_year(db_date, amount_val)
             messagebox.showinfo("Success", f"Room for {year} saved.")
@@ -686,15 +776,168 @@ class NewRoomYearFrame(tk.Frame):
             self.entry_amount.delete(0, tk.END)
             self.controller.show_frame("RoomYearsListFrame") # Ensure redirect target is correct
 
-        except ValueError:
-            messagebox.showerror("Error", "Amount must be a valid number.")
         except Exception as e:
             messagebox.showerror("Error", f"Could not save: {e}")
 
+class RecurringFrame(tk.Frame):
+    """Recurring transaction templates and the generator that books them."""
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg='white')
+        self.controller = controller
+        self.directory = None
+        self._setup_ui()
+
+    def _setup_ui(self):
+        container = tk.Frame(self, bg='white', padx=20, pady=20)
+        container.pack(fill="both", expand=True)
+
+        tk.Label(container, text="Recurring Transactions",
+                 font=('Arial', 18, 'bold'), bg='white').pack(pady=(0, 10))
+
+        # 1. Template list (ID is hidden but used for deletion)
+        list_frame = tk.Frame(container, bg='white')
+        list_frame.pack(fill="both", expand=True)
+        self.columns = ("ID", "Account", "Type", "Amount", "Cadence", "Start", "End", "Next #", "Notes", "Actions")
+        self.tree = ttk.Treeview(list_frame, columns=self.columns, show='headings', height=10)
+        for col in self.columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=90, anchor='center')
+        self.tree.column("ID", width=0, stretch=tk.NO)
+        self.tree.column("Account", width=150, anchor='w')
+        self.tree.column("Notes", width=150, anchor='w')
+
+        vsb = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vsb.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        vsb.pack(side="right", fill="y")
+
+        self.tree.tag_configure('oddrow', background=ROW_COLOR_LIGHT)
+        self.tree.tag_configure('evenrow', background=ROW_COLOR_DARK)
+        self.tree.bind("<Button-1>", self._on_click)
+
+        # 2. New template form
+        form = tk.LabelFrame(container, text="New Template", bg='white', padx=10, pady=10)
+        form.pack(fill="x", pady=(15, 0))
+
+        tk.Label(form, text="Account:", bg='white').grid(row=0, column=0, sticky="e")
+        self.combo_account = ttk.Combobox(form, width=25)
+        self.combo_account.grid(row=0, column=1, padx=5, pady=3)
+        self.combo_account.bind("<KeyRelease>", self._filter_accounts)
+
+        tk.Label(form, text="Type:", bg='white').grid(row=0, column=2, sticky="e")
+        self.combo_type = ttk.Combobox(form, state="readonly", width=12, values=("Deposit", "Withdrawal"))
+        self.combo_type.set("Deposit")
+        self.combo_type.grid(row=0, column=3, padx=5, pady=3)
+
+        tk.Label(form, text="Amount:", bg='white').grid(row=0, column=4, sticky="e")
+        self.entry_amount = ttk.Entry(form, width=12)
+        self.entry_amount.grid(row=0, column=5, padx=5, pady=3)
+
+        tk.Label(form, text="Cadence:", bg='white').grid(row=1, column=0, sticky="e")
+        self.combo_cadence = ttk.Combobox(form, state="readonly", width=12, values=tuple(CADENCES))
+        self.combo_cadence.set("monthly")
+        self.combo_cadence.grid(row=1, column=1, sticky="w", padx=5, pady=3)
+
+        tk.Label(form, text="Start (YYYY-MM-DD):", bg='white').grid(row=1, column=2, sticky="e")
+        self.entry_start = ttk.Entry(form, width=12)
+        self.entry_start.grid(row=1, column=3, padx=5, pady=3)
+
+        tk.Label(form, text="End (optional):", bg='white').grid(row=1, column=4, sticky="e")
+        self.entry_end = ttk.Entry(form, width=12)
+        self.entry_end.grid(row=1, column=5, padx=5, pady=3)
+
+        tk.Label(form, text="Notes:", bg='white').grid(row=2, column=0, sticky="e")
+        self.entry_notes = ttk.Entry(form, width=60)
+        self.entry_notes.grid(row=2, column=1, columnspan=4, sticky="ew", padx=5, pady=3)
+        ttk.Button(form, text="Add Template", command=self.save).grid(row=2, column=5, padx=5, pady=3)
+
+        # 3. Generator
+        gen = tk.Frame(container, bg='white')
+        gen.pack(fill="x", pady=(15, 0))
+        tk.Label(gen, text="Book all occurrences through:", bg='white').pack(side="left")
+        self.entry_through = ttk.Entry(gen, width=12)
+        self.entry_through.pack(side="left", padx=5)
+        ttk.Button(gen, text="Generate Transactions", command=self.generate).pack(side="left", padx=5)
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return
+        column = self.tree.identify_column(event.x)
+        values = self.tree.item(self.tree.identify_row(event.y), 'values')
+        if values and self.tree.heading(column, "text") == "Actions":
+            self.controller.confirm_delete_recurring(values[0], values[1], values[3])
+
+    def refresh(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        if not self.controller.db.conn:
+            return
+
+        self.directory = self.controller.db.get_account_directory()
+        self.combo_account['values'] = self.directory.matching("")
+        if not self.entry_through.get():
+            self.entry_through.insert(0, datetime.date.today().isoformat())
+
+        for i, row in enumerate(self.controller.db.get_recurring()):
+            r_id, name, t_type, amount, cadence, start, end, notes, next_index = row
+            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+            self.tree.insert('', tk.END, values=(
+                r_id, name, t_type, f"${amount:,.2f}", cadence, start, end or "", next_index, notes or "", "Delete"
+            ), tags=(tag,))
+
+    def refresh_external(self):
+        refresh_keeping_scroll(self)
+
+    def _filter_accounts(self, event):
+        if self.directory is None or event.keysym in ("Up", "Down", "Return", "Tab", "Escape"):
+            return
+        self.combo_account['values'] = self.directory.matching(self.combo_account.get())
+
+    def save(self):
+        acc_id = self.directory.name_to_id.get(self.combo_account.get()) if self.directory else None
+        if acc_id is None:
+            messagebox.showwarning("Input Error", "Please select an account.")
+            return
+
+        start = self.entry_start.get().strip()
+        end = self.entry_end.get().strip()
+        cents, errors = validate_transactions([start], [self.combo_type.get()], [self.entry_amount.get()])
+        if errors[0]:
+            messagebox.showwarning("Input Error", errors[0][0][1])
+            return
+        if end and (check_date(end) or end < start):
+            messagebox.showwarning("Input Error", "End date must be a valid date on or after the start date.")
+            return
+
+        try:
+            self.controller.db.save_recurring(acc_id, self.combo_type.get(), cents[0] / 100,
+                                              self.combo_cadence.get(), start, end, self.entry_notes.get().strip())
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not save: {e}")
+            return
+        for entry in (self.entry_amount, self.entry_start, self.entry_end, self.entry_notes):
+            entry.delete(0, tk.END)
+        self.refresh()
+
+    def generate(self):
+        through = self.entry_through.get().strip()
+        if check_date(through):
+            messagebox.showwarning("Input Error", check_date(through))
+            return
+        self.controller.handle_generate_recurring(through)
+
 class CRAReportFrame(tk.Frame):
+    """CRA report as one collapsible node per AccountNameCRA.
+
+    Collapsed nodes only show their subtotal. Transactions are fetched when a
+    node is expanded and released again when it is collapsed.
+    """
+    PLACEHOLDER = "Loading..."
+
     def __init__(self, parent, controller):
         super().__init__(parent, bg='white')
         self.controller = controller
+        self._accounts = {} # tree node -> AccountNameCRA
         self._setup_ui()
 
     def _setup_ui(self):
@@ -702,15 +945,20 @@ class CRAReportFrame(tk.Frame):
         container.pack(fill="both", expand=True)
 
         tk.Label(container, text="TFSA Report (CRA Format)",
-                 font=('Arial', 18, 'bold'), bg='white').pack(pady=(0, 10))
+                 font=('Arial', 18, 'bold'), bg='white').pack(pady=(0, 5))
 
-        # UPDATED: Removed Notes, Added Net Change to header/columns
-        # We use 'Net Change' as the 5th column header
-        self.columns = ("Account Name in CRA", "Date", "Deposit", "Withdrawal", "Net Change")
-        self.tree = ttk.Treeview(container, columns=self.columns, show='headings', height=25)
+        # Also scopes File > Export
+        self.year_selector = YearSelector(container, self.controller, self.refresh)
+        self.year_selector.pack(pady=(0, 10))
+
+        # The tree column (#0) holds the account name so nodes can expand
+        self.columns = ("Date", "Deposit", "Withdrawal", "Net Change")
+        self.tree = ttk.Treeview(container, columns=self.columns, show='tree headings', height=25)
+
+        self.tree.heading("#0", text="Account Name in CRA")
+        self.tree.column("#0", width=250, anchor='w')
 
         column_configs = {
-            "Account Name in CRA": 250,
             "Date": 120,
             "Deposit": 150,
             "Withdrawal": 150,
@@ -733,78 +981,78 @@ class CRAReportFrame(tk.Frame):
         self.tree.tag_configure('summary', background='#e8f4f8', font=('Arial', 10, 'bold'))
         self.tree.tag_configure('grand_total', background='#d1e7dd', font=('Arial', 11, 'bold'))
 
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_close)
+
     def refresh(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.tree.delete(*self.tree.get_children())
+        self._accounts.clear()
 
         if not self.controller.db.conn:
             return
 
-        data = self.controller.db.get_cra_report_data()
-        if not data:
+        self.year_selector.reload_years()
+        for row in self.controller.db.get_cra_subtotals(self.year_selector.date_range):
+            if row.kind == 'subtotal':
+                node = self.tree.insert('', tk.END, text=row.account, values=(
+                    "",
+                    f"{row.deposit:.2f}",
+                    f"{row.withdrawal:.2f}",
+                    f"{row.net:.2f}"
+                ), tags=('summary',))
+                # Dummy child so the node shows an expand arrow
+                self.tree.insert(node, tk.END, text=self.PLACEHOLDER)
+                self._accounts[node] = row.account
+            else:
+                # Grand Total for the entire report
+                self.tree.insert('', tk.END, text="REPORT TOTALS", values=(
+                    "All Accounts" if self.year_selector.year is None else str(self.year_selector.year),
+                    f"{row.deposit:.2f}",
+                    f"{row.withdrawal:.2f}",
+                    f"{row.net:.2f}"
+                ), tags=('grand_total',))
+
+    def refresh_external(self):
+        """Reloads subtotals, re-expanding the accounts that were open."""
+        expanded = {account for node, account in self._accounts.items() if self.tree.item(node, 'open')}
+        top = self.tree.yview()[0]
+        self.refresh()
+        for node, account in self._accounts.items():
+            if account in expanded:
+                self._load_children(node, account)
+                self.tree.item(node, open=True)
+        self.tree.yview_moveto(top)
+
+    def _on_open(self, event):
+        node = self.tree.focus()
+        account = self._accounts.get(node)
+        if account is None:
             return
+        self._load_children(node, account)
 
-        current_account = None
-        acc_dep_total = 0.0
-        acc_wd_total = 0.0
-
-        grand_dep = 0.0
-        grand_wd = 0.0
-
-        for row in data:
-            cra_name, date, t_type, amount, notes = row
-
-            # Grouping logic: Detect when account name changes
-            if current_account is not None and cra_name != current_account:
-                self._insert_summary(current_account, acc_dep_total, acc_wd_total)
-                acc_dep_total = 0.0
-                acc_wd_total = 0.0
-
-            current_account = cra_name
-
-            dep_str = ""
-            wd_str = ""
+    def _load_children(self, node, account):
+        self.tree.delete(*self.tree.get_children(node))
+        try:
+            rows = self.controller.db.get_cra_account_rows(account, self.year_selector.date_range)
+        except ArchiveUnavailable as e:
+            self.tree.insert(node, tk.END, values=(str(e), "", "", ""))
+            return
+        for row in rows:
+            self.tree.insert(node, tk.END, values=(
+                row.date,
+                f"{row.deposit:.2f}" if row.deposit else "",
+                f"{row.withdrawal:.2f}" if row.withdrawal else "",
+                ""
+            ))
+
+    def _on_close(self, event):
+        node = self.tree.focus()
+        if node not in self._accounts:
+            return
 
-            if t_type == "Deposit":
-                dep_str = f"{amount:.2f}"
-                acc_dep_total += amount
-                grand_dep += amount
-            else:
-                wd_str = f"{amount:.2f}"
-                acc_wd_total += amount
-                grand_wd += amount
-
-            self.tree.insert('', tk.END, values=(cra_name, date, dep_str, wd_str, ""))
-
-        # Final account summary
-        if current_account:
-            self._insert_summary(current_account, acc_dep_total, acc_wd_total)
-
-        # Grand Total for the entire report
-        net_grand = grand_dep - grand_wd
-        self.tree.insert('', tk.END, values=("", "", "", "", ""), tags=()) # Spacer
-        self.tree.insert('', tk.END, values=(
-            "REPORT TOTALS",
-            "All Accounts",
-            f"{grand_dep:.2f}",
-            f"{grand_wd:.2f}",
-            f"{net_grand:.2f}"
-        ), tags=('grand_total',))
-
-    def _insert_summary(self, name, dep_total, wd_total):
-        net_change = dep_total - wd_total
-
-        # Insert Summary Row
-        self.tree.insert('', tk.END, values=(
-            f"TOTALS: {name}",
-            "",
-            f"{dep_total:.2f}",
-            f"{wd_total:.2f}",
-            f"{net_change:.2f}"
-        ), tags=('summary',))
-
-        # Empty row for visual spacing between account groups
-        self.tree.insert('', tk.END, values=("", "", "", "", ""))
+        # Release the transaction rows; keep a placeholder for the arrow
+        self.tree.delete(*self.tree.get_children(node))
+        self.tree.insert(node, tk.END, text=self.PLACEHOLDER)
 
 # ui/frames.py
 
@@ -836,6 +1084,26 @@ class AnnualSummaryFrame(tk.Frame):
         )
         self.status_label.pack(pady=(0, 15))
 
+        # Projection controls: extra rows after the last year of data
+        projection = tk.Frame(container, bg='white')
+        projection.pack(fill="x", pady=(0, 10))
+        self.project_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(projection, text="Project", variable=self.project_var, bg='white',
+                       command=self.refresh).pack(side="left")
+        self.spin_years = tk.Spinbox(projection, from_=1, to=60, width=4)
+        self.spin_years.delete(0, tk.END)
+        self.spin_years.insert(0, str(FORECAST_YEARS))
+        self.spin_years.pack(side="left")
+        tk.Label(projection, text="years, limits indexed at", bg='white').pack(side="left", padx=5)
+        self.entry_inflation = ttk.Entry(projection, width=5)
+        self.entry_inflation.insert(0, f"{DEFAULT_INFLATION * 100:g}")
+        self.entry_inflation.pack(side="left")
+        tk.Label(projection, text="% a year, plus a yearly deposit of $", bg='white').pack(side="left", padx=5)
+        self.entry_planned = ttk.Entry(projection, width=10)
+        self.entry_planned.insert(0, "0")
+        self.entry_planned.pack(side="left")
+        ttk.Button(projection, text="Update", command=self.refresh).pack(side="left", padx=10)
+
         # 3. Table Setup
         cols = ("Year", "New Room", "Total Start Room", "Deposit", "Withdrawal", "Remaining Room")
         self.tree = ttk.Treeview(container, columns=cols, show='headings', height=20)
@@ -856,6 +1124,18 @@ class AnnualSummaryFrame(tk.Frame):
         self.tree.tag_configure('neg_text', foreground='red')
         self.tree.tag_configure('zero_text', foreground='#b8860b')
         self.tree.tag_configure('pos_text', foreground='green')
+        self.tree.tag_configure('projected', font=('Arial', 9, 'italic'))
+
+    def _projection(self):
+        """Forecast rows for the current settings; recurring templates are included."""
+        try:
+            years = int(self.spin_years.get())
+            inflation = float(self.entry_inflation.get()) / 100
+            planned = float(self.entry_planned.get() or 0)
+        except ValueError:
+            messagebox.showwarning("Input Error", "Projection years, inflation and deposit must be numbers.")
+            return []
+        return self.controller.db.get_room_forecast(years, inflation, planned)
 
     def refresh(self):
         for item in self.tree.get_children():
@@ -864,8 +1144,11 @@ class AnnualSummaryFrame(tk.Frame):
         if not self.controller.db.conn: return
 
         data = self.controller.db.get_annual_summary_data()
+        if self.project_var.get():
+            data = data + self._projection()
         running_carryover = 0.0
         overcontribution_years = [] # List to track problem years
+        edited_years = [] # Closed years whose transactions changed since
 
         for i, row in enumerate(data):
             year = row['year']
@@ -875,10 +1158,13 @@ class AnnualSummaryFrame(tk.Frame):
 
             total_start_room = new_room + running_carryover
             remaining_room = total_start_room - deposits
-            running_carryover = remaining_room + withdrawals
+            # Closed years carry their stored ending room forward
+            running_carryover = row.get('carryover', remaining_room + withdrawals)
+            if row.get('edited'):
+                edited_years.append(year)
 
-            # Check for overcontribution
-            if remaining_room < 0:
+            # Check for overcontribution (projected years are not history)
+            if remaining_room < 0 and not row.get('projected'):
                 overcontribution_years.append(year)
 
             bg_tag = 'evenrow' if i % 2 == 0 else 'oddrow'
@@ -886,17 +1172,25 @@ class AnnualSummaryFrame(tk.Frame):
             # Text color tag (only visually relevant for the last column calculation)
             status_tag = 'neg_text' if remaining_room < 0 else ('zero_text' if remaining_room == 0 else 'pos_text')
 
+            label = f"{year} (edited)" if row.get('edited') else (f"{year} (closed)" if row.get('closed') else year)
+            if row.get('projected'):
+                label = f"{year} (projected)"
             self.tree.insert('', tk.END, values=(
-                year,
+                label,
                 f"${new_room:,.2f}",
                 f"${total_start_room:,.2f}",
                 f"${deposits:,.2f}",
                 f"${withdrawals:,.2f}",
                 f"${remaining_room:,.2f}"
-            ), tags=(bg_tag, status_tag))
+            ), tags=(bg_tag, status_tag) + (('projected',) if row.get('projected') else ()))
 
         # Update the Status Label Line
-        if overcontribution_years:
+        if edited_years:
+            self.status_label.config(
+                text=f"⚠️ Closed year changed after closing: {', '.join(edited_years)} (Options > Reopen Tax Years)",
+                fg="red"
+            )
+        elif overcontribution_years:
             years_str = ", ".join(overcontribution_years)
             self.status_label.config(
                 text=f"⚠️ You have overcontribution in year: {years_str}",
@@ -907,3 +1201,217 @@ class AnnualSummaryFrame(tk.Frame):
                 text="✅ You have no overcontribution in any of the years.",
                 fg="green"
             )
+
+    def refresh_external(self):
+        refresh_keeping_scroll(self)
+
+class WhatIfFrame(tk.Frame):
+    """Interactive what-if panel: hypothetical transactions never touch the database."""
+    HELP_TEXT = ("One transaction per line, e.g. '2026-03-01 Deposit 7000' or '2027 W 1500'.\n"
+                 "Separate alternative scenarios with a blank line.")
+
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg='white')
+        self.controller = controller
+        self.simulator = None
+        self.baseline_room = {} # year -> remaining room without any what-if rows
+        self.scenarios = []
+        self._pending = None
+        self._setup_ui()
+
+    def _setup_ui(self):
+        container = tk.Frame(self, bg='white', padx=20, pady=20)
+        container.pack(fill="both", expand=True)
+        container.grid_columnconfigure(1, weight=1)
+        container.grid_rowconfigure(3, weight=1)
+
+        tk.Label(container, text="What-If Contribution Simulator",
+                 font=('Arial', 18, 'bold'), bg='white', fg='#333333').grid(row=0, column=0, columnspan=2, pady=(0, 5))
+
+        self.status_label = tk.Label(container, text="", font=('Arial', 11, 'italic'), bg='white')
+        self.status_label.grid(row=1, column=0, columnspan=2, pady=(0, 10))
+
+        # Left: scenario input
+        tk.Label(container, text=self.HELP_TEXT, bg='white', fg='#666666',
+                 justify='left').grid(row=2, column=0, sticky="w")
+        self.text_scenarios = tk.Text(container, width=40)
+        self.text_scenarios.grid(row=3, column=0, sticky="ns", padx=(0, 15))
+        self.text_scenarios.bind("<KeyRelease>", self._on_key)
+
+        # Right: one line per scenario, and the year-by-year view of the selected one
+        right = tk.Frame(container, bg='white')
+        right.grid(row=2, column=1, rowspan=2, sticky="nsew")
+
+        scen_cols = ("Scenario", "Transactions", "Lowest Room", "Over-contribution Years")
+        self.scenario_tree = ttk.Treeview(right, columns=scen_cols, show='headings', height=5)
+        for col in scen_cols:
+            self.scenario_tree.heading(col, text=col)
+            self.scenario_tree.column(col, width=140, anchor='center' if col != "Over-contribution Years" else 'w')
+        self.scenario_tree.pack(fill='x', pady=(0, 10))
+        self.scenario_tree.bind("<<TreeviewSelect>>", lambda e: self._show_selected())
+
+        year_cols = ("Year", "New Room", "Deposit", "Withdrawal", "Remaining (Current)", "Remaining (What-If)")
+        self.tree = ttk.Treeview(right, columns=year_cols, show='headings', height=15)
+        for col in year_cols:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=140, anchor='center' if col == "Year" else 'e')
+        scrollbar = ttk.Scrollbar(right, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.tree.tag_configure('oddrow', background=ROW_COLOR_LIGHT, foreground='black')
+        self.tree.tag_configure('evenrow', background=ROW_COLOR_DARK, foreground='black')
+        self.tree.tag_configure('neg_text', foreground='red')
+        self.tree.tag_configure('pos_text', foreground='green')
+        self.scenario_tree.tag_configure('neg_text', foreground='red')
+
+    def refresh(self):
+        """Loads the baseline once; keystrokes only re-run the simulation."""
+        if not self.controller.db.conn:
+            return
+        summary = self.controller.db.get_annual_summary_data()
+        self.simulator = ContributionSimulator(summary)
+        years, remaining = self.simulator.simulate_batch([[]])
+        self.baseline_room = dict(zip(years, remaining[0]))
+        self._recompute()
+
+    def refresh_external(self):
+        # New baseline; the typed scenarios stay as they are
+        self.refresh()
+
+    def _on_key(self, event=None):
+        # Several keystrokes in one event-loop turn only cost one recompute
+        if self._pending is None:
+            self._pending = self.after_idle(self._recompute)
+
+    def _recompute(self):
+        self._pending = None
+        if self.simulator is None:
+            return
+
+        self.scenarios, errors = parse_scenarios(self.text_scenarios.get("1.0", tk.END))
+        self.years, self.remaining = self.simulator.simulate_batch(self.scenarios)
+
+        selected = self.scenario_tree.selection()
+        for item in self.scenario_tree.get_children():
+            self.scenario_tree.delete(item)
+
+        for k, scenario in enumerate(self.scenarios):
+            row = self.remaining[k]
+            over = self.simulator.over_contribution_years(self.years, row)
+            lowest = min(row) if row else 0.0
+            self.scenario_tree.insert('', tk.END, iid=str(k), values=(
+                k + 1, len(scenario), f"${lowest:,.2f}", ", ".join(over) or "None"
+            ), tags=('neg_text',) if over else ())
+
+        keep = selected[0] if selected and self.scenario_tree.exists(selected[0]) else "0"
+        if self.scenario_tree.exists(keep):
+            self.scenario_tree.selection_set(keep)
+        self._show_selected()
+
+        if errors:
+            line_numbers = ", ".join(str(line_no) for line_no, _ in errors)
+            self.status_label.config(text=f"Could not read line(s): {line_numbers}", fg="red")
+        else:
+            self.status_label.config(text=f"{len(self.scenarios)} scenario(s) simulated.", fg="green")
+
+    def _show_selected(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        selected = self.scenario_tree.selection()
+        if not selected or not self.scenarios:
+            return
+        k = int(selected[0])
+
+        for i, row in enumerate(self.simulator.simulate(self.scenarios[k])):
+            what_if = row['remaining_room']
+            current = self.baseline_room.get(int(row['year']))
+            bg_tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+            status_tag = 'neg_text' if what_if < 0 else 'pos_text'
+            self.tree.insert('', tk.END, values=(
+                row['year'],
+                f"${row['new_room']:,.2f}",
+                f"${row['deposits']:,.2f}",
+                f"${row['withdrawals']:,.2f}",
+                f"${current:,.2f}" if current is not None else "",
+                f"${what_if:,.2f}"
+            ), tags=(bg_tag, status_tag))
+
+class PenaltyReportFrame(tk.Frame):
+    """Month-by-month over-contribution penalty (1% of the highest excess each month)."""
+    def __init__(self, parent, controller):
+        super().__init__(parent, bg='white')
+        self.controller = controller
+        self._setup_ui()
+
+    def _setup_ui(self):
+        container = tk.Frame(self, bg='white', padx=20, pady=20)
+        container.pack(fill="both", expand=True)
+
+        tk.Label(container, text="Over-contribution Penalty",
+                 font=('Arial', 18, 'bold'), bg='white', fg='#333333').pack(pady=(0, 5))
+
+        self.status_label = tk.Label(container, text="", font=('Arial', 11, 'italic'), bg='white')
+        self.status_label.pack(pady=(0, 15))
+
+        cols = ("Period", "Months in Excess", "Highest Excess", "Penalty (1%/month)")
+        self.tree = ttk.Treeview(container, columns=cols, show='headings', height=20)
+        for col in cols:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=180, anchor='center' if col in ("Period", "Months in Excess") else 'e')
+
+        scrollbar = ttk.Scrollbar(container, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.tree.tag_configure('oddrow', background=ROW_COLOR_LIGHT)
+        self.tree.tag_configure('evenrow', background=ROW_COLOR_DARK)
+        self.tree.tag_configure('summary', background='#e8f4f8', font=('Arial', 10, 'bold'))
+
+    def refresh(self):
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        if not self.controller.db.conn:
+            return
+
+        try:
+            months, years = self.controller.db.get_penalty_report()
+        except ArchiveUnavailable as e:
+            # Penalties carry over from month to month: no partial history
+            self.status_label.config(text=f"⚠️ {e}", fg="red")
+            return
+        by_year = {}
+        for row in months:
+            if row['highest_excess'] > 0:
+                by_year.setdefault(row['month'][:4], []).append(row)
+
+        total = 0.0
+        for year_row in years:
+            if not year_row['months_in_excess']:
+                continue
+            total += year_row['penalty']
+
+            # Year subtotal first, then the months that had an excess
+            self.tree.insert('', tk.END, values=(
+                year_row['year'],
+                year_row['months_in_excess'],
+                f"${year_row['highest_excess']:,.2f}",
+                f"${year_row['penalty']:,.2f}"
+            ), tags=('summary',))
+            for i, row in enumerate(by_year[year_row['year']]):
+                tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+                self.tree.insert('', tk.END, values=(
+                    row['month'], "", f"${row['highest_excess']:,.2f}", f"${row['penalty']:,.2f}"
+                ), tags=(tag,))
+
+        if total > 0:
+            self.status_label.config(text=f"⚠️ Estimated penalty owed: ${total:,.2f}", fg="red")
+        else:
+            self.status_label.config(text="✅ No over-contribution penalty.", fg="green")
+
+    def refresh_external(self):
+        refresh_keeping_scroll(self)
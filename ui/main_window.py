@@ -37,8 +37,11 @@ class MainWindowLayout:
             ("New Account", "NewAccountFrame"),
             ("New Transaction", "NewTransactionFrame"),
             ("New Room/Year", "NewRoomYearFrame"),
+            ("Recurring", "RecurringFrame"),
             ("Annual Summary", "AnnualSummaryFrame"),
-            ("Report (CRA Format)", "CRAReportFrame")
+            ("Report (CRA Format)", "CRAReportFrame"),
+            ("What-If Simulator", "WhatIfFrame"),
+            ("Penalty Report", "PenaltyReportFrame")
         ]
 
         for text, frame_name in nav_items:
@@ -6,20 +6,43 @@ class AppMenuBar(tk.Menu):
     def __init__(self, controller):
         super().__init__(controller)
         self.controller = controller
+        self.snapshots_var = tk.BooleanVar(value=False)
+        self.replica_var = tk.BooleanVar(value=False)
         
         # --- File Menu ---
         file_menu = tk.Menu(self, tearoff=0)
         file_menu.add_command(label="New Database", command=self.controller.new_database)
         file_menu.add_command(label="Open Database", command=self.controller.open_database)
+        file_menu.add_command(label="Save Database As...", command=self.controller.save_database_as)
+        file_menu.add_command(label="Merge Database...", command=self.controller.merge_database)
+        file_menu.add_separator()
+        file_menu.add_command(label="Backup Copy...", command=self.controller.backup_database)
+        file_menu.add_checkbutton(label="Rolling Snapshots", variable=self.snapshots_var,
+                                  command=self.controller.toggle_rolling_snapshots)
         file_menu.add_separator()
         file_menu.add_command(label="Close DB", command=self.controller.close_database)
         # Inside the File Menu setup:
         file_menu.add_separator()
+        file_menu.add_command(label="Import Statement (OFX/QFX/CSV)...", command=self.controller.import_statement)
         file_menu.add_command(label="Export to CSV file...", command=self.controller.export_cra_report_csv)
+        file_menu.add_command(label="Export to JSON file...", command=self.controller.export_cra_report_json)
+        file_menu.add_command(label="Export Penalty Report...", command=self.controller.export_penalty_report_csv)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.controller.quit)
+        file_menu.add_command(label="Exit", command=self.controller.exit_app)
         self.add_cascade(label="File", menu=file_menu)
 
+        # --- Options Menu ---
+        options_menu = tk.Menu(self, tearoff=0)
+        options_menu.add_checkbutton(label="Run Reports from In-Memory Copy", variable=self.replica_var,
+                                     command=self.controller.toggle_memory_replica)
+        options_menu.add_separator()
+        options_menu.add_command(label="Compact Database...", command=self.controller.compact_database)
+        options_menu.add_command(label="Close Tax Years...", command=self.controller.close_tax_years)
+        options_menu.add_command(label="Reopen Tax Years...", command=self.controller.reopen_tax_years)
+        options_menu.add_command(label="Archive Closed Years...", command=self.controller.archive_closed_years)
+        options_menu.add_command(label="Maintenance Report", command=self.controller.show_maintenance_report)
+        self.add_cascade(label="Options", menu=options_menu)
+
         # --- Help Menu ---
         help_menu = tk.Menu(self, tearoff=0)
         help_menu.add_command(label="Help Index", command=self._placeholder)
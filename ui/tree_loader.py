@@ -0,0 +1,111 @@
+# ui/tree_loader.py
+import time
+import tkinter as tk
+
+class ProgressiveTreeLoader:
+    """Fills a Treeview from a cursor a few hundred rows at a time.
+
+    Each step inserts rows for at most SLICE_MS and then hands control back
+    to the event loop, so the window stays responsive while a long list
+    loads. Starting a new load (or calling cancel) stops the previous one.
+
+    A reload can keep the user's place: view_state() before it, then
+    start(..., keep=state). Rows are recognized by their first value (the
+    hidden ID column), so the first visible row and the selection come back
+    as soon as those rows are inserted again.
+    """
+    FETCH_ROWS = 200
+    SLICE_MS = 15
+
+    def __init__(self, tree, status_label=None):
+        self.tree = tree
+        self.status_label = status_label
+        self._cursor = None
+        self._job = None
+        self._keep = None
+
+    @property
+    def loading(self):
+        return self._cursor is not None
+
+    def view_state(self):
+        """(scroll fraction, key of the first visible row, keys of the selected rows)."""
+        items = self.tree.get_children()
+        top = self.tree.yview()[0]
+        first = str(self.tree.item(items[min(round(top * len(items)), len(items) - 1)], 'values')[0]) if items else None
+        selected = {str(self.tree.item(item, 'values')[0]) for item in self.tree.selection()}
+        return top, first, selected
+
+    def start(self, cursor, format_row, total=None, keep=None):
+        """format_row(index, row) must return (values, tags) for tree.insert.
+        keep is a view_state() to restore while the rows come back."""
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+
+        self._cursor = cursor
+        self._format_row = format_row
+        self._total = total
+        self._count = 0
+        self._keep = None
+        if keep and (keep[1] is not None or keep[2]):
+            top, first, selected = keep
+            self._keep = {'top': top, 'first': first, 'selected': set(selected)}
+        self._show_status()
+        self._job = self.tree.after_idle(self._step)
+
+    def cancel(self):
+        if self._job:
+            self.tree.after_cancel(self._job)
+            self._job = None
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+        if self.status_label:
+            self.status_label.config(text="")
+
+    def _step(self):
+        self._job = None
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+
+        while time.perf_counter() < deadline:
+            rows = self._cursor.fetchmany(self.FETCH_ROWS)
+            if not rows:
+                self._finish_keep()
+                self.cancel()
+                return
+            for row in rows:
+                values, tags = self._format_row(self._count, row)
+                item = self.tree.insert('', tk.END, values=values, tags=tags)
+                if self._keep:
+                    self._restore(item, str(values[0]))
+                self._count += 1
+
+        self._show_status()
+        self._job = self.tree.after(0, self._step)
+
+    def _restore(self, item, key):
+        keep = self._keep
+        if key == keep['first']:
+            # Rows are only appended below from here on, so the view stays put
+            self.tree.yview_moveto(self._count / (self._count + 1))
+            keep['first'] = None
+        if key in keep['selected']:
+            self.tree.selection_add(item)
+            keep['selected'].discard(key)
+        if keep['first'] is None and not keep['selected']:
+            self._keep = None
+
+    def _finish_keep(self):
+        # The first visible row is gone: fall back to the old scroll position
+        if self._keep and self._keep['first'] is not None:
+            self.tree.yview_moveto(self._keep['top'])
+        self._keep = None
+
+    def _show_status(self):
+        if not self.status_label:
+            return
+        if self._total is not None:
+            text = f"Loading {self._total:,} rows… ({self._count:,} shown)"
+        else:
+            text = f"Loading rows… ({self._count:,} shown)"
+        self.status_label.config(text=text)